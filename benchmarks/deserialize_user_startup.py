@@ -0,0 +1,131 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Measures what it costs a freshly started process to deserialize the user it
+was handed, with and without the session cache.
+
+Each run is a new process, like a farm task, deserializing a user from a
+payload stored in the environment. The session cache holds a number of other
+users, as it would on a shared workstation::
+
+    python benchmarks/deserialize_user_startup.py --runs 30 --users 20
+
+The first deserialization includes importing and setting up the yaml parser
+when the session cache is read, which every such process pays for. A second
+deserialization in the same process is also timed. File system accesses are
+counted with an audit hook during the first deserialization.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "python")
+)
+
+HOST = "https://bench.shotgunstudio.com"
+PAYLOAD_ENV_VAR = "SGTK_BENCHMARK_USER"
+# Audit events that touch the file system.
+FILE_SYSTEM_EVENTS = ("open", "os.listdir", "os.scandir", "os.rename", "os.replace")
+
+
+def _child(cache):
+    """
+    Deserializes the user from the environment twice and prints how long it
+    took each time and how many file system accesses were made the first time.
+    """
+    from tank.authentication import deserialize_user
+
+    # Imported on first use by deserialize_user, regardless of the cache.
+    from tank.authentication import user_impl  # noqa
+
+    accesses = []
+
+    def audit(event, args):
+        if event in FILE_SYSTEM_EVENTS:
+            accesses.append(event)
+
+    sys.addaudithook(audit)
+    start = time.perf_counter()
+    deserialize_user(os.environ[PAYLOAD_ENV_VAR], cache=cache)
+    first = time.perf_counter() - start
+    first_accesses = len(accesses)
+
+    start = time.perf_counter()
+    deserialize_user(os.environ[PAYLOAD_ENV_VAR], cache=cache)
+    second = time.perf_counter() - start
+    print("%f %f %d" % (first, second, first_accesses))
+
+
+def _run(cache, runs):
+    """
+    :returns: A list of (first seconds, second seconds, file system accesses)
+        tuples, one per run.
+    """
+    results = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), "--child", str(cache)]
+        )
+        first, second, accesses = output.split()
+        results.append((float(first), float(second), int(accesses)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument(
+        "--users", type=int, default=20, help="Other users in the session cache."
+    )
+    parser.add_argument("--child", choices=["True", "False"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child == "True")
+        return
+
+    with tempfile.TemporaryDirectory() as shotgun_home:
+        # Inherited by the child processes.
+        os.environ["SHOTGUN_HOME"] = shotgun_home
+
+        from tank.authentication import session_cache, serialize_user, user, user_impl
+
+        with session_cache.transaction(HOST) as txn:
+            for index in range(args.users):
+                txn.cache_session_data("user%d" % index, "token%d" % index)
+
+        worker = user.ShotgunUser(
+            user_impl.SessionUser(HOST, "worker", "worker-token", None, cache=False)
+        )
+        os.environ[PAYLOAD_ENV_VAR] = serialize_user(worker, use_json=True)
+
+        for cache in (True, False):
+            results = _run(cache, args.runs)
+            print(
+                "cache=%s: first %.3f ms, second %.3f ms (medians), "
+                "%d file system accesses"
+                % (
+                    cache,
+                    statistics.median(result[0] for result in results) * 1000,
+                    statistics.median(result[1] for result in results) * 1000,
+                    max(result[2] for result in results),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
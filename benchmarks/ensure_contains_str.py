@@ -0,0 +1,130 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Measures converting multi-MB payloads with ensure_contains_str, and loading
+JSON documents with tank.util.json::
+
+    python benchmarks/ensure_contains_str.py --entities 20000 --runs 3
+
+The payload is a list of entities, like a ShotgunModel cache. It is converted
+as decoded by the json module, which only produces str, and as unpickled from
+a payload holding bytes. Deeply nested payloads are also converted. Only the
+conversion is timed, not the decoding.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "python")
+)
+
+
+def _make_payload(entities, value_type):
+    """
+    :returns: A payload of ``entities`` entities, with their strings of the
+        given type.
+    """
+    return {
+        value_type(b"entities"): [
+            {
+                value_type(b"id"): index,
+                value_type(b"type"): value_type(b"Shot"),
+                value_type(b"code"): value_type(b"sh%04d" % index),
+                value_type(b"sg_status_list"): value_type(b"ip"),
+                value_type(b"tags"): [value_type(b"a"), value_type(b"b")],
+                value_type(b"project"): {
+                    value_type(b"id"): 1,
+                    value_type(b"type"): value_type(b"Project"),
+                    value_type(b"name"): value_type(b"Big Buck Bunny"),
+                },
+                value_type(b"description"): value_type(b"x" * 50),
+            }
+            for index in range(entities)
+        ]
+    }
+
+
+def _best_time(func, runs, setup=None):
+    """
+    :returns: The shortest duration of ``func`` over ``runs`` calls, in seconds.
+        If ``setup`` is given, ``func`` is called with its result, which
+        isn't timed.
+    """
+    best = None
+    for _ in range(runs):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+def _report(name, func, runs, setup=None):
+    try:
+        print("%s: %.1f ms" % (name, _best_time(func, runs, setup) * 1000))
+    except RecursionError:
+        print("%s: RecursionError" % name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--entities", type=int, default=20000)
+    parser.add_argument("--depth", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    from tank.util import json as tank_json
+    from tank.util.unicode import ensure_contains_str
+
+    document = json.dumps(_make_payload(args.entities, lambda value: value.decode()))
+    pickled = pickle.dumps(_make_payload(args.entities, bytes))
+    print("%.1f MB JSON document" % (len(document) / 1e6))
+
+    _report("json.loads", lambda: json.loads(document), args.runs)
+    _report(
+        "ensure_contains_str on the JSON document",
+        ensure_contains_str,
+        args.runs,
+        lambda: json.loads(document),
+    )
+    _report("tank.util.json.loads", lambda: tank_json.loads(document), args.runs)
+    _report(
+        "ensure_contains_str on the payload with bytes",
+        ensure_contains_str,
+        args.runs,
+        lambda: pickle.loads(pickled),
+    )
+
+    def make_nested():
+        nested = []
+        current = nested
+        for _ in range(args.depth):
+            child = [b"x"]
+            current.append(child)
+            current = child
+        return nested
+
+    _report(
+        "ensure_contains_str on %d nested lists" % args.depth,
+        ensure_contains_str,
+        1,
+        make_nested,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Compares the size and the encode and decode times of the payloads stored in
+environment variables, in the legacy protocol 0 format and in the current
+format::
+
+    python benchmarks/env_payload.py --entities 50 --runs 2000
+
+The data looks like a serialized context handed to a child process, with a
+number of additional entities. A small payload is measured as well.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "python")
+)
+
+
+def _make_context(entities):
+    """
+    :returns: Data like a serialized context, with ``entities`` additional
+        entities.
+    """
+    return {
+        "project": {"type": "Project", "id": 122, "name": "Big Buck Bunny"},
+        "entity": {"type": "Shot", "id": 1234, "code": "bunny_010_0010"},
+        "step": {"type": "Step", "id": 5, "name": "Animation"},
+        "task": {"type": "Task", "id": 98765, "content": "Animation"},
+        "user": {"type": "HumanUser", "id": 42, "name": "Jérôme Doe"},
+        "additional_entities": [
+            {"type": "Asset", "id": index, "code": "asset_%03d" % index}
+            for index in range(entities)
+        ],
+        "source_entity": None,
+    }
+
+
+def _average_time(func, runs):
+    """
+    :returns: The average duration of ``func`` over ``runs`` calls, in
+        microseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - start) / runs * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--entities", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    from tank.util import pickle
+
+    formats = [
+        ("legacy", pickle.dumps, pickle.loads),
+        ("current", pickle.dumps_env_payload, pickle.loads_env_payload),
+    ]
+    for name, data in (
+        ("context", _make_context(args.entities)),
+        ("small", {"a": 1, "b": "x"}),
+    ):
+        for label, dumps, loads in formats:
+            # The legacy format adds a key to the data it can't encode in
+            # utf-8, so always give it a copy.
+            payload = dumps(dict(data))
+            encode = _average_time(lambda: dumps(dict(data)), args.runs)
+            decode = _average_time(lambda: loads(payload), args.runs)
+            print(
+                "%s %s: %d chars, encode %.1f us, decode %.1f us"
+                % (name, label, len(payload), encode, decode)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Stress test for concurrent writers of the session cache.
+
+Spawns processes that all cache sessions for distinct users of the same site
+at the same time, then counts the users missing from the session cache file
+once they are done::
+
+    python benchmarks/session_cache_stress.py --processes 32 --updates 20
+
+Use ``--lock-timeout 0`` to make every writer that finds the file locked
+write without the lock, which exercises the merge and verify path.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "python")
+)
+
+HOST = "https://stress.shotgunstudio.com"
+
+
+def _worker(worker_id, updates, lock_timeout, barrier):
+    """
+    Caches sessions for ``updates`` users, all owned by this worker.
+
+    :returns: The number of seconds spent writing.
+    """
+    from tank.authentication import session_cache
+
+    if lock_timeout is not None:
+        session_cache.LOCK_TIMEOUT = lock_timeout
+
+    barrier.wait()
+    start = time.perf_counter()
+    for index in range(updates):
+        session_cache.cache_session_data(
+            HOST,
+            "user-%d-%d" % (worker_id, index),
+            "token-%d-%d" % (worker_id, index),
+        )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--processes", type=int, default=16)
+    parser.add_argument("--updates", type=int, default=20, help="Updates per process.")
+    parser.add_argument(
+        "--lock-timeout",
+        type=float,
+        default=None,
+        help="Overrides session_cache.LOCK_TIMEOUT in the writers.",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as shotgun_home:
+        # Inherited by the workers, so they all write to the same cache.
+        os.environ["SHOTGUN_HOME"] = shotgun_home
+
+        manager = multiprocessing.Manager()
+        barrier = manager.Barrier(args.processes)
+        with multiprocessing.Pool(args.processes) as pool:
+            start = time.perf_counter()
+            durations = pool.starmap(
+                _worker,
+                [
+                    (worker_id, args.updates, args.lock_timeout, barrier)
+                    for worker_id in range(args.processes)
+                ],
+            )
+            elapsed = time.perf_counter() - start
+
+        from tank.authentication import session_cache
+
+        session_cache.clear_document_cache()
+        cached = set(
+            user["login"]
+            for user in session_cache._try_load_site_authentication_file(
+                session_cache._get_site_authentication_file_location(HOST)
+            )["users"]
+        )
+
+    expected = args.processes * args.updates
+    lost = sum(
+        1
+        for worker_id in range(args.processes)
+        for index in range(args.updates)
+        if "user-%d-%d" % (worker_id, index) not in cached
+    )
+    print(
+        "%d processes x %d updates: %.0f updates/s, slowest writer %.2fs, "
+        "%d/%d updates lost"
+        % (
+            args.processes,
+            args.updates,
+            expected / elapsed,
+            max(durations),
+            lost,
+            expected,
+        )
+    )
+    return 1 if lost else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Measures reading and writing a large session cache file with the pure Python
+yaml implementation and with the libyaml C bindings.
+
+The document has the layout of a site authentication file holding the sessions
+of many users, as found on shared workstations::
+
+    python benchmarks/session_cache_yaml.py --users 4000 --runs 5
+
+Both implementations are used through ``tank.util.yaml``, the way the session
+cache uses them.
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "python")
+)
+
+
+def _make_document(users):
+    """
+    :returns: A site authentication file document with ``users`` sessions.
+    """
+    return {
+        "current_user": "user0",
+        "users": [
+            {
+                "login": "user%d" % index,
+                "session_token": "%032x" % (index * 7919),
+                "session_metadata": "%0128x" % (index * 104729),
+            }
+            for index in range(users)
+        ],
+    }
+
+
+def _time(func, runs):
+    """
+    :returns: The median duration of ``func`` over ``runs`` calls, in seconds.
+    """
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--users", type=int, default=4000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    from tank.util import yaml
+
+    document = _make_document(args.users)
+    selections = [("pure Python", yaml._get_pure_python_selection())]
+    libyaml_selection = yaml._get_libyaml_selection()
+    if libyaml_selection:
+        selections.append(("libyaml", libyaml_selection))
+    else:
+        print("libyaml is not available or was rejected by the probe.")
+
+    text = yaml._dump_with(selections[0][1], document, default_flow_style=False)
+    print("%d users, %d KB document" % (args.users, len(text) // 1024))
+
+    for name, selection in selections:
+        if yaml._dump_with(selection, document, default_flow_style=False) != text:
+            print("%s: output differs from the pure Python implementation" % name)
+            return 1
+        load = _time(lambda: yaml._load_with(selection, text), args.runs)
+        dump = _time(
+            lambda: yaml._dump_with(
+                selection, document, io.StringIO(), default_flow_style=False
+            ),
+            args.runs,
+        )
+        print("%s: load %.1f ms, dump %.1f ms" % (name, load * 1000, dump * 1000))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Compares parsing session cache files with the pure Python yaml reader and
+scanner of tank_vendor and with the original ones, kept by the tests in
+tests/core_tests/yaml_baseline::
+
+    python benchmarks/yaml_scanner.py --users 200 --runs 5
+
+Documents are parsed from a string and from a file object, for a large file
+holding the sessions of many users and for a small one.
+"""
+
+import argparse
+import base64
+import importlib.util
+import io
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, os.path.join(ROOT, "python"))
+
+BASELINE_ROOT = os.path.join(ROOT, "tests", "core_tests", "yaml_baseline")
+
+
+def _import_baseline(name):
+    """
+    Imports a baseline module as part of the vendored yaml package, so its
+    relative imports resolve to the vendored modules.
+    """
+    spec = importlib.util.spec_from_file_location(
+        "tank_vendor.yaml._baseline_%s" % name,
+        os.path.join(BASELINE_ROOT, "%s.py" % name),
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _get_baseline_loader_class():
+    """
+    :returns: A safe loader class using the original reader and scanner.
+    """
+    from tank_vendor.yaml.composer import Composer
+    from tank_vendor.yaml.constructor import SafeConstructor
+    from tank_vendor.yaml.parser import Parser
+    from tank_vendor.yaml.resolver import Resolver
+
+    reader = _import_baseline("reader")
+    scanner = _import_baseline("scanner")
+
+    class BaselineSafeLoader(
+        reader.Reader, scanner.Scanner, Parser, Composer, SafeConstructor, Resolver
+    ):
+        def __init__(self, stream):
+            reader.Reader.__init__(self, stream)
+            scanner.Scanner.__init__(self)
+            Parser.__init__(self)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+
+    return BaselineSafeLoader
+
+
+def _best_time(func, runs):
+    """
+    :returns: The shortest duration of ``func`` over ``runs`` calls, in seconds.
+    """
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    from tank_vendor import yaml
+
+    rng = random.Random(1)
+    large = yaml.safe_dump(
+        {
+            "current_user": "user0",
+            "recent_users": ["user%d" % index for index in range(10)],
+            "users": [
+                {
+                    "login": "user%d" % index,
+                    "session_token": "%032x" % rng.getrandbits(128),
+                    "session_metadata": base64.b64encode(
+                        rng.getrandbits(3000 * 8).to_bytes(3000, "little")
+                    ).decode(),
+                }
+                for index in range(args.users)
+            ],
+        }
+    )
+    small = yaml.safe_dump(
+        {
+            "current_host": "https://bench.shotgunstudio.com",
+            "recent_hosts": ["https://bench.shotgunstudio.com"] * 3,
+            "users": [{"login": "bob", "session_token": "abc" * 10}],
+        }
+    )
+
+    loaders = [("before", _get_baseline_loader_class()), ("after", yaml.SafeLoader)]
+    for name, text in (("%d KB" % (len(large) // 1024), large), ("small", small)):
+        for label, loader in loaders:
+            from_string = _best_time(lambda: yaml.load(text, Loader=loader), args.runs)
+            from_file = _best_time(
+                lambda: yaml.load(io.StringIO(text), Loader=loader), args.runs
+            )
+            print(
+                "%s %s: string %.2f ms, file %.2f ms"
+                % (name, label, from_string * 1000, from_file * 1000)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -29,10 +29,8 @@ __version__ = "HEAD"
 # configuration has its python sgtk/tank module imported directly, it will associate
 # itself with the primary config rather than with the config where the code is located.
 
-import inspect
 import os
 import sys
-import uuid
 import warnings
 
 if sys.version_info < (3, 7):
@@ -70,6 +68,10 @@ def __fix_tank_vendor():
     if "tank_vendor" not in sys.modules:
         return
 
+    # Only imported when needed, since they are slow to import.
+    import inspect
+    import uuid
+
     # Figure out where our tank_vendor is.
     our_tank_vendor = os.path.normpath(
         os.path.join(os.path.dirname(os.path.dirname(__file__)), "tank_vendor")
@@ -110,3 +112,21 @@ del __fix_tank_vendor
 # first import the log manager since a lot of modules require this.
 from .log import LogManager
 
+
+def __getattr__(name):
+    """
+    Imports the authentication and util subpackages on first access (PEP 562),
+    so that ``import tank`` only loads the log manager.
+
+    :param str name: Name of the attribute.
+
+    :returns: The subpackage.
+
+    :raises AttributeError: If the attribute doesn't exist.
+    """
+    if name not in ("authentication", "util"):
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    import importlib
+
+    return importlib.import_module("." + name, __name__)
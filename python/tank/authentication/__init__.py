@@ -25,6 +25,7 @@ from .errors import (  # noqa
     ConsoleLoginNotSupportedError,
     IncompleteCredentials,
     ShotgunAuthenticationError,
+    SiteInfoBackoffError,
     UnresolvableHumanUser,
     UnresolvableScriptUser,
 )
@@ -32,13 +33,47 @@ from .web_login_support import (
     get_shotgun_authenticator_support_web_login,
     set_shotgun_authenticator_support_web_login,
 )
-from .shotgun_authenticator import ShotgunAuthenticator
-from .defaults_manager import DefaultsManager
-from .core_defaults_manager import CoreDefaultsManager
-from .user import (  # noqa
-    deserialize_user,
-    serialize_user,
-    ShotgunSamlUser,
-    ShotgunUser,
-    ShotgunWebUser,
-)
+
+# The rest of the public interface is imported on first access (PEP 562), so
+# that importing this package doesn't pull in shotgun_api3, the session cache
+# and the login UI until they are actually needed.
+_LAZY_ATTRIBUTES = {
+    "ShotgunAuthenticator": "shotgun_authenticator",
+    "DefaultsManager": "defaults_manager",
+    "CoreDefaultsManager": "core_defaults_manager",
+    "BrokerDefaultsManager": "broker_defaults_manager",
+    "deserialize_user": "user",
+    "serialize_user": "user",
+    "ShotgunSamlUser": "user",
+    "ShotgunUser": "user",
+    "ShotgunWebUser": "user",
+}
+
+
+def __getattr__(name):
+    """
+    Imports the module defining a public attribute on first access.
+
+    :param str name: Name of the attribute.
+
+    :returns: The attribute.
+
+    :raises AttributeError: If the attribute doesn't exist.
+    """
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    import importlib
+
+    value = getattr(importlib.import_module("." + module_name, __name__), name)
+    # Cache the attribute so this function isn't called again for it.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """
+    Lists the attributes of the package, including the ones not imported yet.
+    """
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
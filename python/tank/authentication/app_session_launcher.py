@@ -8,12 +8,17 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
+import asyncio
+import email.utils
+import functools
 import http.client
+import io
 import json
 import platform
 import random
 import ssl
 import sys
+import threading
 import time
 import urllib.error
 import urllib.parse
@@ -34,6 +39,19 @@ logger = LogManager.get_logger(__name__)
 
 PRODUCT_DEFAULT = "Flow Production Tracking Toolkit"
 
+# The approval of the authentication request is polled quickly at first, since
+# the user may approve it right away, and then less and less often.
+POLL_INITIAL_INTERVAL = 0.5  # Seconds
+POLL_MAX_INTERVAL = 5  # Seconds
+POLL_BACKOFF_FACTOR = 1.5
+POLL_TIMEOUT = 180  # Seconds
+
+# Requests not answered within this delay are considered failed.
+HTTP_TIMEOUT = 30  # Seconds
+
+# How often keep_waiting_callback is checked while waiting between requests.
+_CANCELLATION_CHECK_INTERVAL = 0.1  # Seconds
+
 
 class AuthenticationError(errors.AuthenticationError):
     def __init__(self, msg, asl_errno=None, payload=None, parent_exception=None):
@@ -82,20 +100,24 @@ def process(
     assert callable(browser_open_callback)
     assert callable(keep_waiting_callback)
 
-    url_handlers = [urllib.request.HTTPHandler]
+    # The connections to the site are kept alive between the requests, so
+    # that all the polls go through the same connection.
+    url_handlers = [_KeepAliveHTTPHandler()]
 
     ca_certs = shotgun_api3.Shotgun._get_certs_file(None)
     if ca_certs:
         logger.debug(f"Set CaCert handler to {ca_certs}")
 
-        url_handlers.append(
-            urllib.request.HTTPSHandler(
-                context = ssl.create_default_context(
-                    cafile=ca_certs,
-                ),
+    url_handlers.append(
+        _KeepAliveHTTPSHandler(
+            context=ssl.create_default_context(
+                cafile=ca_certs,
             ),
-        )
+        ),
+    )
 
+    # Without an explicit proxy, the opener's default ProxyHandler uses the
+    # proxies of the environment, honoring no_proxy.
     if http_proxy:
         proxy_addr = _build_proxy_addr(http_proxy)
         sg_url_parsed = urllib.parse.urlparse(sg_url)
@@ -116,7 +138,62 @@ def process(
         )
 
     url_opener = urllib.request.build_opener(*url_handlers)
+    try:
+        return _process(
+            sg_url,
+            url_opener,
+            product,
+            browser_open_callback,
+            keep_waiting_callback,
+        )
+    finally:
+        for handler in url_handlers:
+            if isinstance(handler, _KeepAliveMixin):
+                handler.close()
+
+
+async def aprocess(
+    sg_url,
+    *,
+    http_proxy=None,
+    product=None,
+    browser_open_callback,
+    keep_waiting_callback=lambda: True,
+):
+    """
+    Awaitable counterpart of :func:`process`.
+
+    The authentication request is processed in the default executor of the
+    running event loop, so waiting for its approval doesn't block the loop.
+    Cancelling the awaiting task stops the polling right away. Note that
+    browser_open_callback and keep_waiting_callback are called from the
+    executor thread.
+    """
+    cancelled = threading.Event()
 
+    def keep_waiting():
+        return not cancelled.is_set() and keep_waiting_callback()
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            None,
+            functools.partial(
+                process,
+                sg_url,
+                http_proxy=http_proxy,
+                product=product,
+                browser_open_callback=browser_open_callback,
+                keep_waiting_callback=keep_waiting,
+            ),
+        )
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+
+
+def _process(
+    sg_url, url_opener, product, browser_open_callback, keep_waiting_callback
+):
     user_agent = build_user_agent()
 
     request = urllib.request.Request(
@@ -209,33 +286,50 @@ def process(
 
     logger.debug("Awaiting request approval from the browser...")
 
-    sleep_time = 2
-    request_timeout = 180  # 5 minutes
     request_url = urllib.parse.urljoin(
         sg_url,
         "/internal_api/app_session_request/{session_id}".format(
             session_id=session_id,
         ),
     )
+    request = urllib.request.Request(
+        request_url,
+        method="PUT",
+        headers={
+            "User-Agent": user_agent,
+        },
+    )
 
     approved = False
-    t0 = time.time()
+    poll_interval = POLL_INITIAL_INTERVAL
+    deadline = time.monotonic() + POLL_TIMEOUT
     while (
         approved is False
         and keep_waiting_callback()
-        and time.time() - t0 < request_timeout
+        and time.monotonic() < deadline
     ):
-        time.sleep(sleep_time)
-
-        request = urllib.request.Request(
-            request_url,
-            method="PUT",
-            headers={
-                "User-Agent": user_agent,
-            },
+        if not _wait(
+            min(poll_interval, deadline - time.monotonic()), keep_waiting_callback
+        ):
+            break
+
+        response = http_request(
+            url_opener, request, keep_waiting_callback=keep_waiting_callback
         )
 
-        response = http_request(url_opener, request)
+        retry_after = _get_retry_after(response)
+        if response.code in (
+            http.client.TOO_MANY_REQUESTS,
+            http.client.SERVICE_UNAVAILABLE,
+        ) and retry_after is not None:
+            logger.debug(
+                "HTTP response {code}: polling again in {delay} seconds".format(
+                    code=response.code,
+                    delay=retry_after,
+                )
+            )
+            poll_interval = retry_after
+            continue
 
         response_code_major = response.code // 100
         if response_code_major == 5:
@@ -306,6 +400,11 @@ def process(
 
         approved = response.json.get("approved", False)
 
+        if retry_after is not None:
+            poll_interval = retry_after
+        else:
+            poll_interval = min(poll_interval * POLL_BACKOFF_FACTOR, POLL_MAX_INTERVAL)
+
     if not approved:
         raise AuthenticationError("The request has never been approved")
 
@@ -341,20 +440,28 @@ def get_product_name():
     return PRODUCT_DEFAULT
 
 
-def http_request(opener, req, max_attempts=4):
+def http_request(opener, req, max_attempts=4, keep_waiting_callback=None):
     attempt = 0
     backoff = 0.75  # Seconds to wait before retry, times the attempt number
+    retry_after = None
 
     response = None
     while response is None and attempt < max_attempts:
         if attempt:
-            time.sleep(float(attempt) * backoff * random.uniform(1, 3))
+            if retry_after is None:
+                delay = float(attempt) * backoff * random.uniform(1, 3)
+            else:
+                delay = retry_after
+            if not _wait(delay, keep_waiting_callback):
+                raise AuthenticationError("The request has been cancelled")
 
         attempt += 1
+        retry_after = None
         try:
-            response = opener.open(req)
+            response = opener.open(req, timeout=HTTP_TIMEOUT)
         except urllib.error.HTTPError as exc:
             if attempt < max_attempts and exc.code // 100 == 5:
+                retry_after = _get_retry_after(exc)
                 logger.debug(
                     "HTTP request returned a {code} code on attempt {attempt}/{max_attempts}".format(
                         attempt=attempt,
@@ -369,7 +476,10 @@ def http_request(opener, req, max_attempts=4):
             response.exception = exc
 
         except urllib.error.URLError as exc:
-            if attempt < max_attempts and isinstance(exc.reason, ConnectionError):
+            # Stalled requests are retried like failed connections.
+            if attempt < max_attempts and isinstance(
+                exc.reason, (ConnectionError, TimeoutError)
+            ):
                 logger.debug(
                     "HTTP request failed to reach the server on attempt {attempt}/{max_attempts}".format(
                         attempt=attempt,
@@ -413,6 +523,207 @@ def http_request(opener, req, max_attempts=4):
     return response
 
 
+def _wait(delay, keep_waiting_callback=None):
+    """
+    Waits for the given delay, unless keep_waiting_callback says otherwise.
+
+    :param float delay: Number of seconds to wait.
+    :param callable keep_waiting_callback: Returns False when waiting should
+        stop. Checked every few milliseconds.
+
+    :returns: True if the whole delay elapsed, False if the wait was cancelled.
+    """
+    if keep_waiting_callback is None:
+        time.sleep(max(delay, 0))
+        return True
+
+    deadline = time.monotonic() + delay
+    while keep_waiting_callback():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        time.sleep(min(remaining, _CANCELLATION_CHECK_INTERVAL))
+    return False
+
+
+def _get_retry_after(response):
+    """
+    Reads the Retry-After hint of a response.
+
+    :param response: HTTP response, or HTTPError.
+
+    :returns: Number of seconds to wait before the next request, or None if
+        the server didn't provide a hint.
+    """
+    value = response.headers.get("Retry-After") if response.headers else None
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    # The hint can also be a HTTP date.
+    try:
+        retry_time = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        logger.debug("Invalid Retry-After header: {value}".format(value=value))
+        return None
+    return max(retry_time - time.time(), 0)
+
+
+class _BufferedResponse(io.BytesIO):
+    """
+    HTTP response whose body has been read entirely, so that the connection
+    it came from can be reused right away.
+    """
+
+    def __init__(self, url, response):
+        """
+        :param str url: URL of the request.
+        :param response: http.client.HTTPResponse instance.
+        """
+        super().__init__(response.read())
+        self.url = url
+        self.code = response.status
+        self.status = response.status
+        self.reason = response.reason
+        # urllib clients expect the reason in msg, see
+        # urllib.request.AbstractHTTPHandler.do_open.
+        self.msg = response.reason
+        self.headers = response.headers
+        self.will_close = response.will_close
+
+    def getcode(self):
+        return self.code
+
+    def geturl(self):
+        return self.url
+
+    def info(self):
+        return self.headers
+
+
+class _KeepAliveMixin(object):
+    """
+    Implementation of the urllib HTTP and HTTPS handlers keeping the
+    connections alive between requests.
+
+    urllib.request.AbstractHTTPHandler.do_open closes the connection after
+    every request. This is a copy of it that keeps one connection per host
+    and proxy tunnel instead, and reads the response entirely so the
+    connection can be reused right away. Everything else, like proxies and
+    redirections, is still handled by the other handlers of the opener.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Maps a (host, tunnel host) tuple to an idle connection.
+        self._connections = {}
+
+    def close(self):
+        """
+        Closes the idle connections.
+        """
+        connections = list(self._connections.values())
+        self._connections.clear()
+        for connection in connections:
+            connection.close()
+
+    def _keep_alive_open(self, http_class, req, **http_conn_args):
+        """
+        Sends a request, reusing the connection to the host if there is one.
+
+        :param http_class: http.client.HTTPConnection derived class.
+        :param req: urllib.request.Request instance.
+
+        :returns: The _BufferedResponse instance.
+
+        :raises urllib.error.URLError: If the site can't be reached.
+        """
+        host = req.host
+        if not host:
+            raise urllib.error.URLError("no host given")
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update({k: v for k, v in req.headers.items() if k not in headers})
+        headers["Connection"] = "keep-alive"
+        headers = {name.title(): val for name, val in headers.items()}
+
+        tunnel_headers = {}
+        proxy_auth_hdr = "Proxy-Authorization"
+        if req._tunnel_host and proxy_auth_hdr in headers:
+            # Proxy-Authorization should not be sent to origin server.
+            tunnel_headers[proxy_auth_hdr] = headers.pop(proxy_auth_hdr)
+
+        key = (host, req._tunnel_host)
+        h = self._connections.pop(key, None)
+        reused = h is not None
+        if not reused:
+            h = self._connect(http_class, req, tunnel_headers, http_conn_args)
+
+        try:
+            try:
+                response = self._send(h, req, headers)
+            except (ConnectionError, http.client.BadStatusLine):
+                if not reused:
+                    raise
+                # The site closed the connection while it was idle. This is
+                # expected, so simply reconnect.
+                logger.debug("Connection to the site was closed, reconnecting.")
+                h.close()
+                h = self._connect(http_class, req, tunnel_headers, http_conn_args)
+                response = self._send(h, req, headers)
+        except (OSError, http.client.HTTPException) as err:
+            h.close()
+            raise urllib.error.URLError(err)
+
+        if response.will_close:
+            h.close()
+        else:
+            self._connections[key] = h
+        return response
+
+    def _connect(self, http_class, req, tunnel_headers, http_conn_args):
+        """
+        :returns: A new, not yet connected, http_class instance.
+        """
+        h = http_class(req.host, timeout=req.timeout, **http_conn_args)
+        h.set_debuglevel(self._debuglevel)
+        if req._tunnel_host:
+            h.set_tunnel(req._tunnel_host, headers=tunnel_headers)
+        return h
+
+    def _send(self, h, req, headers):
+        """
+        Sends a request on a connection and reads its response.
+
+        :returns: The _BufferedResponse instance.
+        """
+        h.request(
+            req.get_method(),
+            req.selector,
+            req.data,
+            headers,
+            encode_chunked=req.has_header("Transfer-encoding"),
+        )
+        # Read the body right away, the connection can't be reused otherwise.
+        return _BufferedResponse(req.get_full_url(), h.getresponse())
+
+
+class _KeepAliveHTTPHandler(_KeepAliveMixin, urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self._keep_alive_open(http.client.HTTPConnection, req)
+
+
+class _KeepAliveHTTPSHandler(_KeepAliveMixin, urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self._keep_alive_open(
+            http.client.HTTPSConnection, req, context=self._context
+        )
+
+
 def _build_proxy_addr(http_proxy):
     # Expected format: foo:bar@123.456.789.012:3456
 
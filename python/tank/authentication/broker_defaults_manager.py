@@ -0,0 +1,102 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Provides defaults for authentication from the local credential broker, falling
+back on the session cache when no broker is running.
+"""
+
+from . import credential_broker
+from .defaults_manager import DefaultsManager
+
+
+class BrokerDefaultsManager(DefaultsManager):
+    """
+    This defaults manager implementation asks the local credential broker for
+    the current user before looking into the session cache.
+
+    The broker holds the session of the users in memory and validates them with
+    the site, so processes using this defaults manager neither read nor write
+    the session cache and don't validate the session token themselves. When no
+    broker is running, or when the broker can't provide a valid session, the
+    behavior is the same as the :class:`DefaultsManager`.
+
+    :param str fixed_host: Allows to specify the host that will be used for authentication.
+        Defaults to ``None``, in which case the current host of the broker is used.
+    :param str socket_path: Location of the broker's socket. Defaults to the
+        ``SGTK_CREDENTIAL_BROKER_SOCKET`` environment variable or to a socket in the
+        global cache folder.
+    """
+
+    def __init__(self, fixed_host=None, socket_path=None):
+        super().__init__(fixed_host)
+        self._socket_path = socket_path
+        self._broker_session = None
+        self._broker_queried = False
+
+    def _get_broker_session(self):
+        """
+        Asks the broker for the session of the current user, once.
+
+        :returns: Dictionary with the ``host``, ``login``, ``session_token`` and
+                  ``session_metadata`` of the user, or None if the broker
+                  couldn't provide them.
+        """
+        if not self._broker_queried:
+            self._broker_queried = True
+            self._broker_session = credential_broker.request_session(
+                host=self._fixed_host, socket_path=self._socket_path
+            )
+        return self._broker_session
+
+    def get_host(self):
+        """
+        Returns the host of the user provided by the broker, if any.
+
+        :returns: A string containing the default host name.
+        """
+        broker_session = self._get_broker_session()
+        if broker_session:
+            return broker_session["host"]
+        return super().get_host()
+
+    def get_login(self):
+        """
+        Returns the login of the user provided by the broker, if any.
+
+        :returns: The default login.
+        """
+        broker_session = self._get_broker_session()
+        if broker_session:
+            return broker_session["login"]
+        return super().get_login()
+
+    def get_user_credentials(self):
+        """
+        Returns the credentials of the user provided by the broker, if any.
+
+        :returns: A dictionary with keys login and session_token, or None in
+                  case no credentials could be established. The credentials
+                  provided by the broker are flagged so that the user is
+                  created without accessing the session cache.
+        """
+        broker_session = self._get_broker_session()
+        if not broker_session:
+            return super().get_user_credentials()
+
+        credentials = {
+            "host": broker_session["host"],
+            "login": broker_session["login"],
+            "session_token": broker_session["session_token"],
+            "cache": False,
+        }
+        if broker_session.get("session_metadata") is not None:
+            credentials["session_metadata"] = broker_session["session_metadata"]
+        return credentials
@@ -0,0 +1,191 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Pool of Shotgun connections shared by the users of a process.
+
+A Shotgun instance keeps its HTTP connection to the site open between
+requests, but it is not thread-safe. Connections in this pool are therefore
+confined to the thread that requested them: each thread gets its own
+connection per host, proxy and user, which is handed back every time that same
+thread asks for it again. This saves the TCP and TLS handshakes that creating
+a new connection for every request would incur.
+
+--------------------------------------------------------------------------------
+NOTE! This module is part of the authentication library internals and should
+not be called directly. Interfaces and implementation of this module may change
+at any point.
+--------------------------------------------------------------------------------
+"""
+
+import collections
+import threading
+import time
+
+from .. import LogManager
+
+logger = LogManager.get_logger(__name__)
+
+# Maximum number of connections kept in the pool. When the pool is full, the
+# least recently used connection is dropped.
+MAX_POOL_SIZE = 32
+
+# Number of seconds a connection can stay unused before being dropped from
+# the pool.
+IDLE_TIMEOUT = 300
+
+# Minimum number of seconds between two sweeps of the idle connections.
+_SWEEP_INTERVAL = 30
+
+
+class _ConnectionPool(object):
+    """
+    Thread-confined pool of Shotgun connections.
+
+    Connections are keyed by the key provided by the caller and the identity
+    of the requesting thread, so a connection is never handed to two threads
+    at once. Connections dropped from the pool are closed only when their
+    thread is gone or is the current thread. Otherwise the thread might still
+    be holding on to it and closing it under its feet could interrupt a
+    request, so the connection is only dropped from the pool and its sockets
+    are closed when it is garbage collected, once the thread is done with it.
+    """
+
+    def __init__(self, max_size=MAX_POOL_SIZE, idle_timeout=IDLE_TIMEOUT):
+        """
+        :param int max_size: Maximum number of connections kept in the pool.
+        :param int idle_timeout: Number of seconds after which an unused
+            connection is dropped from the pool.
+        """
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        # Maps (key, thread ident) to a (connection, thread, last used) tuple,
+        # in least recently used order.
+        self._connections = collections.OrderedDict()
+        self._last_sweep = time.monotonic()
+
+    def acquire(self, key, factory):
+        """
+        Retrieves the connection for the given key and the current thread,
+        creating one if required.
+
+        :param tuple key: Identifies the host, proxy and credentials the
+            connection is for.
+        :param callable factory: Creates a new connection when there is none
+            available in the pool.
+
+        :returns: A Shotgun instance.
+        """
+        thread = threading.current_thread()
+        pool_key = (key, thread.ident)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._connections.pop(pool_key, None)
+            if entry is not None and entry[1] is thread:
+                self._connections[pool_key] = (entry[0], thread, now)
+                return entry[0]
+
+        # Either there was no connection or it belonged to a thread which
+        # terminated and whose identity got recycled.
+        if entry is not None:
+            self._close(entry[0])
+
+        connection = factory()
+        logger.debug("Adding new connection to the pool for %s", key[0])
+
+        with self._lock:
+            self._connections[pool_key] = (connection, thread, now)
+            dropped = self._evict(now)
+
+        for connection_to_drop, owner in dropped:
+            if owner is thread or not owner.is_alive():
+                self._close(connection_to_drop)
+
+        return connection
+
+    def clear(self):
+        """
+        Drops every connection from the pool. Only the connections of the
+        current thread or of terminated threads are closed.
+        """
+        with self._lock:
+            entries = list(self._connections.values())
+            self._connections.clear()
+
+        current_thread = threading.current_thread()
+        for connection, owner, _ in entries:
+            if owner is current_thread or not owner.is_alive():
+                self._close(connection)
+
+    def _evict(self, now):
+        """
+        Removes connections from the pool when it is over capacity and,
+        every once in a while, the ones that have been idle for too long
+        or whose thread has terminated.
+
+        This must be called with the lock held.
+
+        :param float now: Current value of the monotonic clock.
+
+        :returns: List of (connection, thread) tuples that were dropped.
+        """
+        dropped = []
+
+        if now - self._last_sweep >= _SWEEP_INTERVAL:
+            self._last_sweep = now
+            for pool_key, (connection, owner, last_used) in list(
+                self._connections.items()
+            ):
+                if now - last_used > self._idle_timeout or not owner.is_alive():
+                    del self._connections[pool_key]
+                    dropped.append((connection, owner))
+
+        while len(self._connections) > self._max_size:
+            _, (connection, owner, _) = self._connections.popitem(last=False)
+            dropped.append((connection, owner))
+
+        return dropped
+
+    def _close(self, connection):
+        """
+        Closes a connection, ignoring any error.
+
+        :param connection: Shotgun instance to close.
+        """
+        try:
+            connection.close()
+        except Exception:
+            logger.debug("Could not close pooled connection.", exc_info=True)
+
+
+_connection_pool = _ConnectionPool()
+
+
+def acquire(key, factory):
+    """
+    Retrieves a pooled connection for the current thread.
+
+    :param tuple key: Identifies the host, proxy and credentials the
+        connection is for. The first item must be the host.
+    :param callable factory: Creates a new connection when there is none
+        available in the pool.
+
+    :returns: A Shotgun instance.
+    """
+    return _connection_pool.acquire(key, factory)
+
+
+def clear_connection_pool():
+    """
+    Drops every connection from the pool.
+    """
+    _connection_pool.clear()
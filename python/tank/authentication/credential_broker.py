@@ -0,0 +1,463 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Local credential broker.
+
+The broker is a long-lived process that holds validated session users in
+memory and hands their session token to the processes of the same machine
+over a Unix domain socket. Processes asking the broker for credentials don't
+have to read the session cache and validate the session token themselves,
+and the session is renewed by the broker only once for all of them.
+
+The protocol is line based. Each request is a single line holding a JSON
+object, which is answered by a single line holding a JSON object. Requests
+have an ``op`` key:
+
+- ``{"op": "ping"}`` is answered with ``{"ok": true}``.
+- ``{"op": "get", "host": ..., "login": ..., "rejected_token": ...}`` is
+  answered with the ``host``, ``login``, ``session_token`` and
+  ``session_metadata`` of the user. The host and login are optional and
+  default to the current host and user of the broker. ``rejected_token`` is
+  also optional and tells the broker that the given token was rejected by the
+  site, so it must be validated again.
+
+Failures are answered with ``{"error": <message>}``. When the session of the
+user has expired, the broker doesn't renew it, since nobody would answer the
+credentials prompt. It answers with ``{"error": <message>, "expired": true}``
+instead and clients renew the session themselves.
+
+The broker can be started with ``python -m tank.authentication.credential_broker``.
+
+--------------------------------------------------------------------------------
+NOTE! This module is part of the authentication library internals and should
+not be called directly. Interfaces and implementation of this module may change
+at any point.
+--------------------------------------------------------------------------------
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from . import session_cache, user_impl
+from .errors import IncompleteCredentials, ShotgunAuthenticationError
+from .. import LogManager
+from ..util import LocalFileStorageManager
+
+logger = LogManager.get_logger(__name__)
+
+# Environment variable that overrides the location of the broker's socket.
+SOCKET_PATH_ENV = "SGTK_CREDENTIAL_BROKER_SOCKET"
+
+# Number of seconds after which the broker checks again with the site that a
+# session token is still valid.
+VALIDATION_INTERVAL = 300
+
+# Number of seconds a client waits for the broker before giving up.
+CLIENT_TIMEOUT = 2
+
+# Maximum size of a message, in bytes.
+_MAX_MESSAGE_SIZE = 64 * 1024
+
+
+def get_socket_path():
+    """
+    Retrieves the location of the broker's socket.
+
+    :returns: Path to the socket.
+    """
+    return os.environ.get(SOCKET_PATH_ENV) or os.path.join(
+        LocalFileStorageManager.get_global_root(LocalFileStorageManager.CACHE),
+        "credential_broker.sock",
+    )
+
+
+class _SessionExpired(ShotgunAuthenticationError):
+    """
+    Raised when the session of a user has expired and has to be renewed
+    interactively.
+    """
+
+
+class _BrokeredUser(object):
+    """
+    Session user held by the broker.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.user = None
+        # Monotonic time at which the session token was last validated.
+        self.validated_at = None
+
+
+class CredentialBroker(object):
+    """
+    Serves the session tokens of validated users over a Unix domain socket.
+    """
+
+    def __init__(self, authenticator, socket_path=None):
+        """
+        :param authenticator: ShotgunAuthenticator used to create the users.
+        :param str socket_path: Location of the socket. Defaults to
+            :func:`get_socket_path`.
+        """
+        self._authenticator = authenticator
+        self._socket_path = socket_path or get_socket_path()
+        self._lock = threading.Lock()
+        # Maps (host, login) to _BrokeredUser instances.
+        self._users = {}
+        self._server = None
+
+    @property
+    def socket_path(self):
+        """
+        Location of the socket the broker listens on.
+        """
+        return self._socket_path
+
+    def get_session(self, host=None, login=None, rejected_token=None):
+        """
+        Retrieves the session of a user, validating it and renewing it if needed.
+
+        :param str host: Host of the user. Defaults to the current host.
+        :param str login: Login of the user. Defaults to the current user of
+            the host.
+        :param str rejected_token: Session token that was rejected by the site,
+            if any.
+
+        :returns: Dictionary with the ``host``, ``login``, ``session_token``
+            and ``session_metadata`` of the user.
+
+        :raises IncompleteCredentials: If there are no credentials for the user.
+        :raises _SessionExpired: If the session of the user has expired.
+        """
+        host = host or self._authenticator.get_default_host()
+        if not host:
+            raise IncompleteCredentials("missing host")
+        login = login or session_cache.get_current_user(host)
+        if not login:
+            raise IncompleteCredentials("missing login")
+
+        with self._lock:
+            brokered_user = self._users.setdefault((host, login), _BrokeredUser())
+
+        with brokered_user.lock:
+            if brokered_user.user is None:
+                brokered_user.user = self._create_user(host, login)
+            impl = brokered_user.user.impl
+
+            if rejected_token is not None and rejected_token == impl.get_session_token():
+                logger.debug("Session token of %s was rejected by a client.", impl)
+                brokered_user.validated_at = None
+                user_impl._invalidate_credentials_check(
+                    impl._get_credentials_check_key()
+                )
+
+            if (
+                brokered_user.validated_at is None
+                or time.monotonic() - brokered_user.validated_at > VALIDATION_INTERVAL
+            ):
+                self._validate(impl)
+                brokered_user.validated_at = time.monotonic()
+
+            return {
+                "host": host,
+                "login": login,
+                "session_token": impl.get_session_token(),
+                "session_metadata": impl.get_session_metadata(),
+            }
+
+    def start(self):
+        """
+        Starts serving requests from a background thread.
+        """
+        self._bind()
+        thread = threading.Thread(
+            target=self._server.serve_forever, name="CredentialBroker"
+        )
+        thread.daemon = True
+        thread.start()
+
+    def serve_forever(self):
+        """
+        Serves requests until :meth:`shutdown` is called.
+        """
+        self._bind()
+        self._server.serve_forever()
+
+    def shutdown(self):
+        """
+        Stops serving requests and removes the socket.
+        """
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        try:
+            os.remove(self._socket_path)
+        except OSError:
+            pass
+
+    def _create_user(self, host, login):
+        """
+        Creates a user from the session cache.
+
+        :returns: A ShotgunUser derived instance.
+
+        :raises IncompleteCredentials: If the user is not in the session cache.
+        """
+        session_data = session_cache.get_session_data(host, login)
+        if not session_data:
+            raise IncompleteCredentials("no session for %s on %s" % (login, host))
+
+        # The session data was just read from the cache, there is no need to
+        # write it back.
+        user = self._authenticator.create_session_user(
+            login,
+            session_token=session_data["session_token"],
+            host=host,
+            session_metadata=session_data.get("session_metadata"),
+            cache=False,
+        )
+        # Keep the SAML claims of the users we hold fresh.
+        if hasattr(user, "start_claims_renewal"):
+            user.start_claims_renewal()
+        return user
+
+    def _validate(self, impl):
+        """
+        Makes sure the session token of a user is valid, picking up the token
+        of the session cache if it isn't.
+
+        The broker never renews the session itself. Renewing it requires
+        the user to enter credentials, which a daemon can't prompt for, and it
+        would keep the other clients of that user waiting.
+
+        :param impl: SessionUser instance.
+
+        :raises _SessionExpired: If the session has expired.
+        """
+        if not impl.are_credentials_expired():
+            return
+
+        # Another process may have renewed the session already.
+        session_data = session_cache.get_session_data(
+            impl.get_host(), impl.get_login()
+        )
+        if session_data and session_data["session_token"] != impl.get_session_token():
+            impl.set_session_token(session_data["session_token"], cache=False)
+            impl.set_session_metadata(session_data.get("session_metadata"))
+            if not impl.are_credentials_expired():
+                return
+
+        logger.info("Session for %s has expired.", impl)
+        raise _SessionExpired("The session for %s has expired." % impl)
+
+    def _handle(self, request):
+        """
+        Answers a request.
+
+        :param dict request: Decoded request.
+
+        :returns: Dictionary with the response.
+        """
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True}
+        if op == "get":
+            try:
+                return self.get_session(
+                    request.get("host"),
+                    request.get("login"),
+                    request.get("rejected_token"),
+                )
+            except _SessionExpired as e:
+                return {"error": str(e), "expired": True}
+        return {"error": "unknown operation %r" % (op,)}
+
+    def _bind(self):
+        """
+        Creates the server and binds it to the socket. Only the current user
+        can connect to the socket: it is created in a folder only the current
+        user can access, with a umask that gives no access to anyone else.
+
+        :raises RuntimeError: If another broker is already listening on the socket.
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("Unix domain sockets are not supported on this platform.")
+
+        if os.path.exists(self._socket_path):
+            if ping(self._socket_path):
+                raise RuntimeError(
+                    "A credential broker is already listening on %s" % self._socket_path
+                )
+            # Left over by a broker that didn't shut down properly.
+            os.remove(self._socket_path)
+
+        if os.path.dirname(self._socket_path):
+            session_cache._ensure_folder_for_file(self._socket_path)
+
+        server = _BrokerServer(self._socket_path, self)
+        try:
+            # The umask is process wide, so only hold it while the socket is
+            # created.
+            old_umask = os.umask(0o077)
+            try:
+                server.server_bind()
+            finally:
+                os.umask(old_umask)
+            os.chmod(self._socket_path, 0o600)
+            server.server_activate()
+        except Exception:
+            server.server_close()
+            raise
+        self._server = server
+        logger.debug("Credential broker listening on %s", self._socket_path)
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class _BrokerServer(socketserver.ThreadingUnixStreamServer):
+        """
+        Server handling each client connection in its own thread.
+        """
+
+        daemon_threads = True
+
+        def __init__(self, socket_path, broker):
+            self.broker = broker
+            # Bound and activated by CredentialBroker._bind.
+            super().__init__(socket_path, _RequestHandler, bind_and_activate=False)
+
+    class _RequestHandler(socketserver.StreamRequestHandler):
+        """
+        Answers the requests of a client connection, one per line.
+        """
+
+        def handle(self):
+            while True:
+                line = self.rfile.readline(_MAX_MESSAGE_SIZE)
+                if not line:
+                    return
+                try:
+                    response = self.server.broker._handle(json.loads(line))
+                # pylint: disable=broad-except
+                except Exception as e:
+                    logger.debug("Credential broker request failed: %s", e)
+                    response = {"error": str(e)}
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+                self.wfile.flush()
+
+
+def _request(request, socket_path=None, timeout=None):
+    """
+    Sends a request to the broker.
+
+    :param dict request: Request to send.
+    :param str socket_path: Location of the broker's socket. Defaults to
+        :func:`get_socket_path`.
+    :param float timeout: Number of seconds to wait for the broker. Defaults
+        to ``CLIENT_TIMEOUT``.
+
+    :returns: The decoded response, or None if the broker couldn't be reached.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+
+    timeout = CLIENT_TIMEOUT if timeout is None else timeout
+
+    socket_path = socket_path or get_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(socket_path)
+            client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with client.makefile("rb") as stream:
+                line = stream.readline(_MAX_MESSAGE_SIZE)
+        return json.loads(line)
+    except (OSError, ValueError) as e:
+        logger.debug("Unable to reach the credential broker at %s: %s", socket_path, e)
+        return None
+
+
+def ping(socket_path=None):
+    """
+    Checks if a broker is listening.
+
+    :param str socket_path: Location of the broker's socket. Defaults to
+        :func:`get_socket_path`.
+
+    :returns: True if a broker answered, False otherwise.
+    """
+    response = _request({"op": "ping"}, socket_path)
+    return bool(response and response.get("ok"))
+
+
+def request_session(host=None, login=None, rejected_token=None, socket_path=None):
+    """
+    Asks the broker for the session of a user.
+
+    :param str host: Host of the user. Defaults to the broker's current host.
+    :param str login: Login of the user. Defaults to the broker's current user
+        for the host.
+    :param str rejected_token: Session token that was rejected by the site, if
+        any, so the broker validates the session again.
+    :param str socket_path: Location of the broker's socket. Defaults to
+        :func:`get_socket_path`.
+
+    :returns: Dictionary with the ``host``, ``login``, ``session_token`` and
+        ``session_metadata`` of the user, or None if the broker couldn't
+        provide them.
+    """
+    response = _request(
+        {
+            "op": "get",
+            "host": host,
+            "login": login,
+            "rejected_token": rejected_token,
+        },
+        socket_path,
+    )
+    if not response:
+        return None
+    if "error" in response:
+        logger.debug("Credential broker couldn't provide a session: %s", response["error"])
+        return None
+    return response
+
+
+if __name__ == "__main__":
+    import argparse
+    import logging
+
+    from .shotgun_authenticator import ShotgunAuthenticator
+
+    parser = argparse.ArgumentParser(description="Serves session tokens to local processes.")
+    parser.add_argument("--socket", help="Location of the socket to listen on.")
+    args = parser.parse_args()
+
+    LogManager().initialize_custom_handler(logging.StreamHandler())
+
+    broker = CredentialBroker(ShotgunAuthenticator(), args.socket)
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.shutdown()
@@ -160,6 +160,9 @@ class DefaultsManager(object):
         :returns: A dictionary either with keys login and session_token in the case
                   of a normal Shotgun User, keys api_script and api_key in the case of a Script
                   User or None in case no credentials could be established.
+                  A normal Shotgun User's dictionary can also have a cache key set to
+                  False if the user must be created without reading or writing the
+                  session cache.
         """
         if self.get_host() and self.get_login():
             return session_cache.get_session_data(self.get_host(), self.get_login())
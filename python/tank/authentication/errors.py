@@ -110,5 +110,24 @@ class ConsoleLoginNotSupportedError(ShotgunAuthenticationError):
         )
 
 
+class SiteInfoBackoffError(ShotgunAuthenticationError):
+    """
+    Thrown when the infos of a site are requested while the site is not
+    queried because it could not be reached recently.
+    """
+
+    def __init__(self, url, retry_in):
+        """
+        :param str url: Url of the site.
+        :param float retry_in: Number of seconds before the site is queried again.
+        """
+        super().__init__(
+            "Site '%s' could not be reached recently, it will not be queried "
+            "again for %d seconds." % (url, retry_in)
+        )
+        self.url = url
+        self.retry_in = retry_in
+
+
 # For backward compatibility.
 ConsoleLoginWithSSONotSupportedError = ConsoleLoginNotSupportedError
@@ -24,13 +24,15 @@ at any point.
 
 # Using "with" with the lock to make sure it is always released.
 
+from . import session_cache
 from .errors import AuthenticationCancelled
-from .console_authentication import ConsoleLoginHandler, ConsoleRenewSessionHandler
 
 from .. import LogManager
 
 import threading
 import os
+import time
+from concurrent.futures import Future
 from tank.util import is_windows
 
 
@@ -83,25 +85,22 @@ class SessionRenewal(object):
     Handles multi-threaded session renewal. This class handles the use case when
     multiple threads simultaneously try to ask the user for a password.
 
+    Renewals are coordinated per (host, login): only one thread at a time renews
+    the session of a given user, while the renewals of unrelated users and sites
+    can happen concurrently.
+
     Use this class by calling the static method renew_session(). Please see this method
     for more details.
     """
 
-    # Lock the assures only one thread at a time can execute the authentication logic.
-    _renew_session_internal_lock = threading.Lock()
-
-    # List of possible states for session renewal.
-    WAITING, CANCELLED, SUCCESS = range(3)
+    # Makes access to the renewals in flight and the statistics thread safe.
+    _lock = threading.Lock()
 
-    # When a thread cancels session renewal, this flag is set so other threads know
-    # to raise an exception as well.
-    _auth_state = WAITING
+    # Maps (host, login) to the future of the renewal in flight for that user.
+    _renewals = {}
 
-    # Makes access to the thread count and executing logic based on it thread
-    # safe.
-    _renew_session_lock = threading.Lock()
-    # Number of threads who are trying to renew the session.
-    _renew_session_thread_count = 0
+    # Maps (host, login) to the renewal statistics of that user.
+    _stats = {}
 
     @staticmethod
     def _renew_session_internal(user, credentials_handler):
@@ -120,33 +119,23 @@ class SessionRenewal(object):
 
         :raises AuthenticationCancelled: Raised if the authentication is cancelled.
         """
-        logger.debug("About to take the authentication lock.")
-        with SessionRenewal._renew_session_internal_lock:
-
-            logger.debug("Took the authentication lock.")
-
-            # When authentication is cancelled, every thread who enter the authentication
-            # critical section should throw as well.
-            if SessionRenewal._auth_state == SessionRenewal.CANCELLED:
-                raise AuthenticationCancelled()
-            # If authentication was successful, simply return.
-            elif SessionRenewal._auth_state == SessionRenewal.SUCCESS:
-                return
-
-            # We're the first thread, so authenticate.
-            try:
-                if user.get_session_metadata() is not None:
-                    from .user import ShotgunSamlUser
-
-                    if isinstance(user, ShotgunSamlUser):
-                        logger.debug("Attempting to renew our SSO session.")
-                    else:
-                        logger.debug("Attempting to renew our Web session.")
-                else:
-                    logger.debug("Not authenticated, requesting user input.")
+        try:
+            if user.get_session_metadata() is not None:
+                from .user import ShotgunSamlUser
 
-                # @TODO: Refactor the authenticate methods to return a struct-like
-                #        object instead of a 4 elements tuple.
+                if isinstance(user, ShotgunSamlUser):
+                    logger.debug("Attempting to renew our SSO session.")
+                else:
+                    logger.debug("Attempting to renew our Web session.")
+            else:
+                logger.debug("Not authenticated, requesting user input.")
+
+            # @TODO: Refactor the authenticate methods to return a struct-like
+            #        object instead of a 4 elements tuple.
+            # The preferred method and the new session token are written
+            # to the session cache in one go. The session is renewed even if
+            # they can't be written.
+            with session_cache.transaction(user.get_host(), best_effort=True):
                 (
                     hostname,
                     login,
@@ -155,24 +144,22 @@ class SessionRenewal(object):
                 ) = credentials_handler.authenticate(
                     user.get_host(), user.get_login(), user.get_http_proxy()
                 )
-                SessionRenewal._auth_state = SessionRenewal.SUCCESS
                 logger.debug("Renewal successful!")
                 user.set_session_token(session_token)
                 user.set_session_metadata(session_metadata)
-            except AuthenticationCancelled:
-                SessionRenewal._auth_state = SessionRenewal.CANCELLED
-                logger.debug("Renewal cancelled")
-                raise
+        except AuthenticationCancelled:
+            logger.debug("Renewal cancelled")
+            raise
 
     @staticmethod
     def renew_session(user, credentials_handler):
         """
         Prompts the user for the password. This method is thread-safe, meaning if
-        multiple users call this method at the same time, it will keep track of
-        how many threads are currently running inside it and all threads waiting
-        for the authentication to complete will return with the same result
-        as the thread that actually did the authentication, either returning or
-        raising an exception.
+        multiple threads call this method at the same time for the same user, only
+        the first one will actually do the authentication. All the other threads
+        will wait for the authentication to complete and will return with the same
+        result as the thread that actually did the authentication, either returning
+        or raising an exception.
 
         :param user: SessionUser we are re-authenticating.
         :param credentials_handler: Object that actually prompts the user for
@@ -181,24 +168,123 @@ class SessionRenewal(object):
         :raises AuthenticationCancelled: If the user cancels the authentication,
                                          this exception is raised.
         """
-        # One more renewer.
-        with SessionRenewal._renew_session_lock:
-            SessionRenewal._renew_session_thread_count += 1
+        key = (user.get_host(), user.get_login())
+
+        with SessionRenewal._lock:
+            stats = SessionRenewal._stats.get(key)
+            if stats is None:
+                stats = SessionRenewal._stats[key] = {
+                    "renewals": 0,
+                    "failures": 0,
+                    "cancellations": 0,
+                    "waiters": 0,
+                    "current_waiters": 0,
+                    "max_waiters": 0,
+                    "total_duration": 0.0,
+                    "max_duration": 0.0,
+                    "last_duration": None,
+                }
+            renewal = SessionRenewal._renewals.get(key)
+            if renewal is None:
+                renewal = SessionRenewal._renewals[key] = Future()
+                is_renewer = True
+            else:
+                is_renewer = False
+                stats["waiters"] += 1
+                stats["current_waiters"] += 1
+                stats["max_waiters"] = max(
+                    stats["max_waiters"], stats["current_waiters"]
+                )
+
+        if is_renewer:
+            SessionRenewal._renew(user, credentials_handler, key, renewal, stats)
+            return
+
+        logger.debug("Waiting for the session renewal of %s in flight.", user)
+        try:
+            session_token, session_metadata = renewal.result()
+        finally:
+            with SessionRenewal._lock:
+                stats["current_waiters"] -= 1
+
+        # The renewal may have been done through another instance of the same
+        # user, in which case we need to catch up. The session cache has already
+        # been updated by the renewer.
+        if user.get_session_token() != session_token:
+            user.set_session_token(session_token, cache=False)
+            user.set_session_metadata(session_metadata)
+
+    @staticmethod
+    def is_renewing(user):
+        """
+        Checks if the session of a user is being renewed.
+
+        :param user: SessionUser instance.
+
+        :returns: True if a renewal is in flight for the user, False otherwise.
+        """
+        with SessionRenewal._lock:
+            return (user.get_host(), user.get_login()) in SessionRenewal._renewals
+
+    @staticmethod
+    def _renew(user, credentials_handler, key, renewal, stats):
+        """
+        Renews the session and publishes the outcome to the threads waiting on it.
 
+        :param user: SessionUser we are re-authenticating.
+        :param credentials_handler: Object that actually prompts the user for
+                                    credentials.
+        :param tuple key: (host, login) of the user.
+        :param renewal: Future of the renewal, waited upon by the other threads.
+        :param dict stats: Renewal statistics for the user.
+
+        :raises AuthenticationCancelled: If the user cancels the authentication,
+                                         this exception is raised.
+        """
+        start = time.monotonic()
+        error = None
         try:
-            # Renew the session
             SessionRenewal._renew_session_internal(user, credentials_handler)
+        except BaseException as e:
+            error = e
+            raise
         finally:
-            # We're leaving the method somehow, cleanup!
-            with SessionRenewal._renew_session_lock:
-                # Decrement the thread count
-                SessionRenewal._renew_session_thread_count -= 1
-                # If we're the last one, clear the cancel flag.
-                if SessionRenewal._renew_session_thread_count == 0:
-                    SessionRenewal._auth_state = SessionRenewal.WAITING
-                # At this point, if the method _renew_session_internal simply
-                # returned, this method returns. If the method raised an exception,
-                # it will keep being propagated.
+            duration = time.monotonic() - start
+            with SessionRenewal._lock:
+                # Unregister the renewal before publishing the outcome so that
+                # threads failing with the new token start a new renewal instead
+                # of getting this one's outcome.
+                del SessionRenewal._renewals[key]
+                stats["renewals"] += 1
+                stats["total_duration"] += duration
+                stats["max_duration"] = max(stats["max_duration"], duration)
+                stats["last_duration"] = duration
+                if isinstance(error, AuthenticationCancelled):
+                    stats["cancellations"] += 1
+                elif error is not None:
+                    stats["failures"] += 1
+
+            if error is not None:
+                renewal.set_exception(error)
+            else:
+                renewal.set_result(
+                    (user.get_session_token(), user.get_session_metadata())
+                )
+
+    @staticmethod
+    def get_stats():
+        """
+        Retrieves the renewal statistics of every user a renewal was attempted for.
+
+        :returns: Dictionary keyed by (host, login) tuples. Each value is a dictionary
+            with the number of ``renewals`` attempted, of ``failures`` and of
+            ``cancellations``, the total number of ``waiters`` that waited on
+            another thread's renewal, the number of ``current_waiters``, the
+            ``max_waiters`` waiting on a single renewal, and the ``total_duration``,
+            ``max_duration`` and ``last_duration`` of the renewals in seconds.
+        """
+        with SessionRenewal._lock:
+            return {key: dict(stats) for key, stats in SessionRenewal._stats.items()}
 
 
 ###############################################################################################
@@ -224,10 +310,24 @@ def renew_session(user):
             is_session_renewal=True, session_metadata=user.get_session_metadata()
         )
     else:
+        from .console_authentication import ConsoleRenewSessionHandler
+
         authenticator = ConsoleRenewSessionHandler()
     SessionRenewal.renew_session(user, authenticator)
 
 
+def get_renewal_stats():
+    """
+    Retrieves the session renewal statistics of every user a renewal was
+    attempted for.
+
+    See :meth:`SessionRenewal.get_stats` for details.
+
+    :returns: Dictionary keyed by (host, login) tuples.
+    """
+    return SessionRenewal.get_stats()
+
+
 def authenticate(default_host, default_login, http_proxy, fixed_host):
     """
     Prompts the user for his user name and password. If the host is not fixed,
@@ -262,5 +362,7 @@ def authenticate(default_host, default_login, http_proxy, fixed_host):
             is_session_renewal=False, fixed_host=fixed_host
         )
     else:
+        from .console_authentication import ConsoleLoginHandler
+
         authenticator = ConsoleLoginHandler(fixed_host=fixed_host)
     return authenticator.authenticate(default_host, default_login, http_proxy)
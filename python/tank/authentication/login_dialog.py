@@ -186,6 +186,9 @@ class LoginDialog(QtGui.QDialog):
         self.ui.site.set_recent_items(recent_hosts)
         self.ui.site.set_selection(hostname)
 
+        # Start retrieving the infos of the sites the user is likely to pick.
+        site_info.prefetch_site_infos(recent_hosts, http_proxy)
+
         # Apply the stylesheet manually, Qt doesn't see it otherwise...
         completer_style = self.styleSheet() + ("\n\nQWidget {" "font-size: 12px;" "}")
         self.ui.site.set_style_sheet(completer_style)
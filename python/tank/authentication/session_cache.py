@@ -19,23 +19,37 @@ at any point.
 --------------------------------------------------------------------------------
 """
 
+import collections
+import contextlib
+import copy
+import errno
+import glob
+import hashlib
+import hmac
+import json
 import os
 import random
 import socket
-from shotgun_api3 import (
-    Shotgun,
-    AuthenticationFault,
-    MissingTwoFactorAuthenticationFault,
-)
-from shotgun_api3.lib import httplib2
-from xmlrpc.client import ProtocolError
-
-from tank_vendor import yaml
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# shotgun_api3 is imported when first needed. Most processes only read the
+# session cache and never generate a session token.
 from . import constants
 from .errors import AuthenticationError
 from .. import LogManager
 from ..util.shotgun import connection
 from ..util import LocalFileStorageManager
+from ..util import yaml
 
 logger = LogManager.get_logger(__name__)
 
@@ -50,7 +64,144 @@ _SESSION_METADATA = "session_metadata"
 _SESSION_TOKEN = "session_token"
 _SESSION_CACHE_FILE_NAME = "authentication.yml"
 
+# Formats in which the session cache files can be written. Whatever the format
+# picked, files written in any of these formats can be read back.
+FILE_FORMAT_YAML = "yaml"
+# JSON documents are also valid YAML documents, so older cores can still read
+# files written in that format.
+FILE_FORMAT_JSON = "json"
+
+# How long, in seconds, a writer waits for another one to finish updating a
+# session cache file before logging a warning and trying again.
+LOCK_TIMEOUT = 30
+# Number of times a writer waits LOCK_TIMEOUT seconds for the lock before
+# writing without it.
+_LOCK_ATTEMPTS = 3
+# Errors raised when trying to lock a file that is already locked. Any other
+# error means the file system doesn't support locks.
+_LOCK_CONTENTION_ERRNOS = (errno.EAGAIN, errno.EWOULDBLOCK, errno.EACCES)
+# Number of times a writer that couldn't take the lock reloads the file and
+# reapplies its modifications until they are found in the file.
+_UNLOCKED_WRITE_ATTEMPTS = 5
+# Temporary files older than this many seconds were left behind by a writer
+# that died before renaming them.
+_STALE_TEMP_FILE_AGE = 60
+# Number of decrypted session tokens remembered per encryption key.
+_DECRYPTED_TOKENS_CACHE_SIZE = 64
+
 _encryption = (None, None)
+_file_format = FILE_FORMAT_YAML
+
+
+class _DocumentCache(object):
+    """
+    Process-wide cache of the documents parsed from the session cache files.
+
+    Documents are keyed by file path and are only considered valid for as long
+    as the file's modification time, size and inode are unchanged. Since files
+    are always rewritten through a rename, any update from this or another
+    process will be detected on the next read.
+
+    Callers routinely modify the documents they get back, so copies are
+    handed out and stored.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, file_path, signature):
+        """
+        Retrieves a document from the cache.
+
+        :param file_path: Path of the file the document was loaded from.
+        :param signature: Current signature of the file on disk.
+
+        :returns: A copy of the cached document or None if the document is
+            not cached or is out of date.
+        """
+        with self._lock:
+            entry = self._documents.get(file_path)
+            if entry is None or entry[0] != signature:
+                self._misses += 1
+                return None
+            self._hits += 1
+            return copy.deepcopy(entry[1])
+
+    def set(self, file_path, signature, document):
+        """
+        Caches a document.
+
+        :param file_path: Path of the file the document was loaded from.
+        :param signature: Signature of the file when the document was loaded.
+        :param document: Dictionary that was loaded.
+        """
+        with self._lock:
+            self._documents[file_path] = (signature, copy.deepcopy(document))
+
+    def invalidate(self, file_path=None):
+        """
+        Removes a document from the cache.
+
+        :param file_path: Path of the document to remove. If None, every
+            document is removed.
+        """
+        with self._lock:
+            if file_path is None:
+                self._documents.clear()
+            else:
+                self._documents.pop(file_path, None)
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of ``hits``, ``misses`` and
+            currently cached ``documents``.
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "documents": len(self._documents),
+            }
+
+
+_document_cache = _DocumentCache()
+
+
+def _get_file_signature(file_path):
+    """
+    Returns what identifies a given revision of a file on disk.
+
+    :param file_path: Path to the file.
+
+    :returns: A (mtime, size, inode) tuple or None if the file doesn't exist.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def clear_document_cache():
+    """
+    Discards every session cache document held in memory. The next read of
+    any session cache file will be done from disk.
+    """
+    _document_cache.invalidate()
+
+
+def get_document_cache_stats():
+    """
+    Returns statistics about the in-memory session cache documents.
+
+    :returns: Dictionary with the number of ``hits``, ``misses`` and
+        currently cached ``documents``.
+    """
+    return _document_cache.get_stats()
+
 
 def set_encryption(encryption_suffix, encryption_key):
     """
@@ -64,6 +215,170 @@ def set_encryption(encryption_suffix, encryption_key):
     global _encryption
     _encryption = (encryption_suffix, encryption_key)
 
+
+def set_file_format(file_format):
+    """
+    Sets the format used when writing the session cache files.
+    For best results, call this function whenever accessing any authentication functionality.
+
+    Files are always read regardless of the format they were written in, so
+    existing files are migrated to the selected format the next time they are
+    updated.
+
+    :param file_format: One of ``FILE_FORMAT_YAML`` or ``FILE_FORMAT_JSON``.
+
+    :raises ValueError: Raised if the format is unknown.
+    """
+    global _file_format
+    if file_format not in (FILE_FORMAT_YAML, FILE_FORMAT_JSON):
+        raise ValueError("Unknown session cache file format: %s" % file_format)
+    _file_format = file_format
+
+
+class _CryptoContext(object):
+    """
+    Encrypts and decrypts session tokens with a given Fernet key.
+
+    Building a Fernet instance and decrypting a token both have a cost, so a
+    context is only built once per key and remembers the plaintext of the
+    most recent tokens it encrypted or decrypted. Tokens are compared through
+    a digest keyed with the encryption key.
+    """
+
+    def __init__(self, key):
+        """
+        :param key: The Fernet key to use.
+        """
+        from cryptography.fernet import Fernet
+
+        self._fernet = Fernet(key)
+        if isinstance(key, str):
+            key = key.encode()
+        self._digest_key = hmac.new(
+            key, b"session_token_digest", hashlib.sha256
+        ).digest()
+        self._lock = threading.Lock()
+        # Maps an encrypted token to its (plaintext, digest) tuple, from the
+        # least to the most recently used.
+        self._decrypted = collections.OrderedDict()
+
+    def _digest(self, session_token):
+        """
+        :param str session_token: Plaintext session token.
+
+        :returns: The keyed digest of the token.
+        """
+        return hmac.new(
+            self._digest_key, session_token.encode(), hashlib.sha256
+        ).digest()
+
+    def _remember(self, encrypted_token, session_token):
+        """
+        Remembers the plaintext of an encrypted token.
+
+        :param str encrypted_token: Encrypted session token.
+        :param str session_token: Plaintext session token.
+
+        :returns: The (plaintext, digest) tuple for the token.
+        """
+        entry = (session_token, self._digest(session_token))
+        with self._lock:
+            self._decrypted[encrypted_token] = entry
+            self._decrypted.move_to_end(encrypted_token)
+            while len(self._decrypted) > _DECRYPTED_TOKENS_CACHE_SIZE:
+                self._decrypted.popitem(last=False)
+        return entry
+
+    def _lookup(self, encrypted_token):
+        """
+        :param str encrypted_token: Encrypted session token.
+
+        :returns: The (plaintext, digest) tuple for the token.
+
+        :raises cryptography.fernet.InvalidToken: Raised if the token can't
+            be decrypted with this key.
+        """
+        with self._lock:
+            entry = self._decrypted.get(encrypted_token)
+            if entry is not None:
+                self._decrypted.move_to_end(encrypted_token)
+                return entry
+        session_token = self._fernet.decrypt(encrypted_token.encode()).decode()
+        return self._remember(encrypted_token, session_token)
+
+    def encrypt(self, session_token):
+        """
+        :param str session_token: Plaintext session token.
+
+        :returns: The encrypted session token.
+        """
+        encrypted_token = self._fernet.encrypt(session_token.encode()).decode()
+        self._remember(encrypted_token, session_token)
+        return encrypted_token
+
+    def decrypt(self, encrypted_token):
+        """
+        :param str encrypted_token: Encrypted session token.
+
+        :returns: The plaintext session token.
+
+        :raises cryptography.fernet.InvalidToken: Raised if the token can't
+            be decrypted with this key.
+        """
+        return self._lookup(encrypted_token)[0]
+
+    def matches(self, encrypted_token, session_token):
+        """
+        :param str encrypted_token: Encrypted session token.
+        :param str session_token: Plaintext session token.
+
+        :returns: True if the encrypted token holds the plaintext token, False
+            otherwise or if it can't be decrypted.
+        """
+        try:
+            digest = self._lookup(encrypted_token)[1]
+        except Exception:
+            return False
+        return hmac.compare_digest(digest, self._digest(session_token))
+
+    def equals(self, encrypted_token1, encrypted_token2):
+        """
+        :param str encrypted_token1: First encrypted session token.
+        :param str encrypted_token2: Second encrypted session token.
+
+        :returns: True if both tokens hold the same plaintext, False otherwise
+            or if any of them can't be decrypted.
+        """
+        if encrypted_token1 == encrypted_token2:
+            return True
+        try:
+            digest1 = self._lookup(encrypted_token1)[1]
+            digest2 = self._lookup(encrypted_token2)[1]
+        except Exception:
+            return False
+        return hmac.compare_digest(digest1, digest2)
+
+
+# Maps an encryption key to its _CryptoContext.
+_crypto_contexts = {}
+_crypto_contexts_lock = threading.Lock()
+
+
+def _get_crypto_context():
+    """
+    :returns: The :class:`_CryptoContext` for the key set with
+        :func:`set_encryption`, or None if encryption is not enabled.
+    """
+    key = _encryption[1]
+    if not key:
+        return None
+    with _crypto_contexts_lock:
+        context = _crypto_contexts.get(key)
+        if context is None:
+            context = _crypto_contexts[key] = _CryptoContext(key)
+        return context
+
+
 def compare_potentially_encrypted_session_tokens(token1, token2):
     """
     Compares two session tokens, which are potentially non-deterministically encrypted.
@@ -78,19 +393,48 @@ def compare_potentially_encrypted_session_tokens(token1, token2):
     if token1 is None or token2 is None:
         return token1 == token2
 
-    if _encryption[1]:
-        from cryptography.fernet import Fernet
-        fernet = Fernet(_encryption[1])
-        try:
-            decrypted_token1 = fernet.decrypt(token1.encode()).decode()
-            decrypted_token2 = fernet.decrypt(token2.encode()).decode()
-            return decrypted_token1 == decrypted_token2
-        except Exception:
-            # If decryption fails, the tokens are not equal.
-            return False
+    context = _get_crypto_context()
+    if context:
+        # If decryption fails, the tokens are not equal.
+        return context.equals(token1, token2)
 
     return token1 == token2
 
+
+def _encrypt_session_token(session_token):
+    """
+    Encrypts a session token if encryption is enabled.
+
+    :param session_token: Plaintext session token. Can be None.
+
+    :returns: The session token to write to the session cache.
+    """
+    context = _get_crypto_context()
+    if context and session_token:
+        return context.encrypt(session_token)
+    return session_token
+
+
+def _is_cached_session_token(cached_token, session_token):
+    """
+    Compares a session token from the session cache, which is potentially
+    encrypted, with a plaintext session token.
+
+    :param cached_token: Session token read from the session cache.
+    :param session_token: Plaintext session token.
+
+    :returns: True if the session tokens are equal, False otherwise.
+    """
+    if cached_token is None or session_token is None:
+        return cached_token == session_token
+
+    context = _get_crypto_context()
+    if context:
+        return context.matches(cached_token, session_token)
+
+    return cached_token == session_token
+
+
 def _is_same_user(session_data, login):
     """
     Compares the session data's login with a given login name. The comparison
@@ -187,7 +531,8 @@ def _ensure_folder_for_file(filepath):
     if not os.path.exists(folder):
         old_umask = os.umask(0o077)
         try:
-            os.makedirs(folder, 0o700)
+            # Another thread or process may create it in the meantime.
+            os.makedirs(folder, 0o700, exist_ok=True)
         finally:
             os.umask(old_umask)
     return filepath
@@ -197,21 +542,45 @@ def _try_load_yaml_file(file_path):
     """
     Loads a yaml file.
 
+    The parsed document is kept in memory and reused for as long as the file
+    on disk is unchanged.
+
     :param file_path: The yaml file to load.
 
     :returns: The dictionary for this yaml file. If the file doesn't exist or is
               corrupted, returns an empty dictionary.
     """
-    logger.debug("Loading '%s'" % file_path)
-    if not os.path.exists(file_path):
+    signature = _get_file_signature(file_path)
+    if signature is None:
+        _document_cache.invalidate(file_path)
         logger.debug("Yaml file missing: %s" % file_path)
         return {}
 
-    config_file = None
+    document = _document_cache.get(file_path, signature)
+    if document is not None:
+        return document
+
+    document = _read_yaml_file(file_path)
+    _document_cache.set(file_path, signature, document)
+    return document
+
+
+def _read_yaml_file(file_path):
+    """
+    Reads and parses a yaml file from disk.
+
+    :param file_path: The yaml file to load.
+
+    :returns: The dictionary for this yaml file. If the file doesn't exist or is
+              corrupted, returns an empty dictionary.
+    """
+    logger.debug("Loading '%s'" % file_path)
+    content = None
     try:
         # Open the file and read it.
-        config_file = open(file_path, "r")
-        result = yaml.load(config_file, Loader=yaml.FullLoader)
+        with open(file_path, "r") as config_file:
+            content = config_file.read()
+        result = _parse_document(content)
         # Make sure we got a dictionary back.
         if isinstance(result, dict):
             return result
@@ -220,25 +589,42 @@ def _try_load_yaml_file(file_path):
                 "File '%s' didn't have a dictionary, defaulting to an empty one."
             )
             return {}
-    except yaml.YAMLError:
-        # Return to the beginning
-        config_file.seek(0)
+    except Exception as e:
+        if not yaml.is_yaml_error(e):
+            logger.exception("Unexpected error while opening %s" % file_path)
+            return {}
+
         logger.exception("Error reading '%s'" % file_path)
 
         logger.debug("Here's its content:")
         # And log the complete file for debugging.
-        for line in config_file:
-            # Log line without \n
-            logger.debug(line.rstrip())
+        for line in content.splitlines():
+            logger.debug(line)
         # Create an empty document
         return {}
-    except Exception:
-        logger.exception("Unexpected error while opening %s" % file_path)
-        return {}
-    finally:
-        # If the exception occured when we opened the file, there is no file to close.
-        if config_file:
-            config_file.close()
+
+
+def _parse_document(content):
+    """
+    Parses the content of a session cache file.
+
+    JSON documents are parsed with the much faster json module. Anything else,
+    or JSON that can't be parsed, goes through the yaml parser.
+
+    :param str content: Content of the file.
+
+    :returns: The parsed document.
+
+    :raises yaml.YAMLError: Raised if the content can't be parsed.
+    """
+    if content.lstrip().startswith("{"):
+        try:
+            return json.loads(content)
+        except ValueError:
+            # YAML flow mappings look a lot like JSON, let the yaml parser
+            # decide.
+            pass
+    return yaml.load(content)
 
 
 def _try_load_site_authentication_file(file_path):
@@ -312,19 +698,14 @@ def _insert_or_update_user(users_file, login, session_token, session_metadata):
     :returns: True is the users dictionary has been updated, False otherwise.
     """
 
-    if _encryption[1] and session_token:
-        from cryptography.fernet import Fernet
-        fernet = Fernet(_encryption[1])
-        session_token = fernet.encrypt(session_token.encode()).decode()
-
     # Go through all users
     for user in users_file[_USERS]:
         # If we've matched what we are looking for.
         if _is_same_user(user, login):
             result = False
             # Update and return True only if something changed.
-            if not compare_potentially_encrypted_session_tokens(user.get(_SESSION_TOKEN), session_token):
-                user[_SESSION_TOKEN] = session_token
+            if not _is_cached_session_token(user.get(_SESSION_TOKEN), session_token):
+                user[_SESSION_TOKEN] = _encrypt_session_token(session_token)
                 result = True
             if (
                 user.get(_SESSION_METADATA)
@@ -334,7 +715,7 @@ def _insert_or_update_user(users_file, login, session_token, session_metadata):
                 result = True
             return result
     # This is a new user, add it to the list.
-    user = {_LOGIN: login, _SESSION_TOKEN: session_token}
+    user = {_LOGIN: login, _SESSION_TOKEN: _encrypt_session_token(session_token)}
     # We purposely do not save unset session_metadata to avoid de-serialization issues
     # when the data is read by older versions of the tk-core.
     if session_metadata is not None:
@@ -347,6 +728,8 @@ def _write_yaml_file(file_path, users_data):
     """
     Writes the yaml file at a given location.
 
+    The document is written in the format selected with :func:`set_file_format`.
+
     :param file_path: Where to write the users data
     :param users_data: Dictionary to write to disk.
     """
@@ -354,16 +737,491 @@ def _write_yaml_file(file_path, users_data):
     old_umask = os.umask(0o077)
     try:
         with open(temp_path, "w") as users_file:
-            yaml.safe_dump(users_data, users_file)
+            if _file_format == FILE_FORMAT_JSON:
+                json.dump(users_data, users_file, indent=2, sort_keys=True)
+            else:
+                yaml.dump(users_data, users_file)
         os.replace(temp_path, file_path)  # Generally atomic
     finally:
         os.umask(old_umask)
+        # Whatever happened, the next read needs to come from disk.
+        _document_cache.invalidate(file_path)
         if os.path.exists(temp_path):
             # If the file was not renamed, remove it.
             logger.warning("Failed to replace %s with %s, removing temp file." % (file_path, temp_path))
             os.remove(temp_path)
 
 
+# Serializes the writers of this process. File locks can't be relied upon for
+# this, since on some file systems they are held by the process as a whole.
+_write_lock = threading.Lock()
+
+
+def _try_lock(fd):
+    """
+    Attempts to take an exclusive lock on a file without blocking.
+
+    :param int fd: File descriptor of the file to lock.
+
+    :raises OSError: Raised if the file is already locked.
+    """
+    if fcntl:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    elif msvcrt:
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(fd):
+    """
+    Releases a lock taken with :func:`_try_lock`.
+
+    :param int fd: File descriptor of the locked file.
+    """
+    if fcntl:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif msvcrt:
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def _lock_file(file_path, timeout=None):
+    """
+    Context manager that takes an advisory lock for writing a session cache
+    file, so that writers from this and other processes don't overwrite each
+    other's updates.
+
+    The lock is taken on a ``.lock`` file next to the file. Every time the
+    timeout expires, a warning is logged and the lock is tried again, up to
+    ``_LOCK_ATTEMPTS`` times. If the lock still can't be taken, or if the
+    file system doesn't support locks, False is yielded. The caller can then
+    still write the file, but must merge its changes with the latest version
+    of the file and make sure they weren't overwritten, see
+    :meth:`SessionCacheTransaction._commit`.
+
+    :param str file_path: Path of the file that is about to be written.
+    :param float timeout: Number of seconds to wait for the lock on each
+        attempt. Defaults to ``LOCK_TIMEOUT``.
+
+    :returns: True if the lock was taken, False otherwise.
+    """
+    timeout = LOCK_TIMEOUT if timeout is None else timeout
+    attempts = _LOCK_ATTEMPTS
+    deadline = time.monotonic() + timeout
+
+    if not _write_lock.acquire(timeout=timeout * attempts):
+        logger.warning("Timed out waiting for another thread to write %s" % file_path)
+        yield False
+        return
+
+    fd = None
+    locked = False
+    try:
+        try:
+            fd = os.open(file_path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            logger.debug("Unable to open lock file for %s" % file_path, exc_info=True)
+
+        delay = 0.005
+        while fd is not None:
+            try:
+                _try_lock(fd)
+                locked = True
+                break
+            except OSError as e:
+                if e.errno not in _LOCK_CONTENTION_ERRNOS:
+                    logger.debug("Unable to lock %s" % file_path, exc_info=True)
+                    break
+                if time.monotonic() >= deadline:
+                    attempts -= 1
+                    logger.warning(
+                        "Timed out waiting for another process to write %s%s"
+                        % (file_path, ", trying again." if attempts else ".")
+                    )
+                    if not attempts:
+                        break
+                    deadline = time.monotonic() + timeout
+                # Spread out the retries of the processes that are waiting.
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                delay = min(delay * 2, 0.1)
+
+        yield locked
+    finally:
+        if locked:
+            _unlock(fd)
+        if fd is not None:
+            os.close(fd)
+        _write_lock.release()
+
+
+def _remove_stale_temp_files(file_path):
+    """
+    Removes temporary files left behind by writers that died before they
+    could rename them over the session cache file.
+
+    :param str file_path: Path to the session cache file.
+    """
+    for temp_path in glob.glob(glob.escape(file_path) + ".temp*"):
+        try:
+            if time.time() - os.path.getmtime(temp_path) > _STALE_TEMP_FILE_AGE:
+                logger.debug("Removing stale temporary file %s" % temp_path)
+                os.remove(temp_path)
+        except OSError:
+            # Another process may have beaten us to it.
+            pass
+
+
+class SessionCacheTransaction(object):
+    """
+    Batches updates to the session cache files.
+
+    Documents are loaded the first time they are modified and kept in memory
+    until the transaction is over, at which point each modified file is written
+    back exactly once. Reads made through the module functions while the
+    transaction is active see the pending modifications.
+
+    Every modification is recorded, so that if another process updated a file
+    in the meantime, the modifications can be reapplied on top of the latest
+    version of the file instead of overwriting it.
+
+    Do not instantiate this class directly, use :func:`transaction` instead.
+    """
+
+    def __init__(self, host):
+        """
+        :param host: Site the site level updates are made for. Can be None if
+            only the global authentication file is updated.
+        """
+        self._host = host
+        # Maps a file path to the document loaded from it.
+        self._documents = {}
+        # Maps a file path to its signature when the document was loaded.
+        self._signatures = {}
+        # Maps a file path to the method used to load it.
+        self._loaders = {}
+        # Maps a file path to the list of modifications made to its document.
+        self._operations = {}
+        # File paths whose document has been modified.
+        self._dirty = set()
+
+    def _bind(self, host):
+        """
+        Creates a transaction for another host which shares the documents of
+        this one.
+
+        :param host: Site the site level updates are made for.
+
+        :returns: A :class:`SessionCacheTransaction` instance.
+        """
+        transaction = copy.copy(self)
+        transaction._host = host
+        return transaction
+
+    def _get_pending_document(self, file_path):
+        """
+        :param file_path: Path of the document.
+
+        :returns: A copy of the document for this path if it was loaded in the
+            transaction, None otherwise.
+        """
+        document = self._documents.get(file_path)
+        if document is None:
+            return None
+        return copy.deepcopy(document)
+
+    def _load(self, file_path, loader):
+        """
+        Loads a document in the transaction if it hasn't been loaded already.
+
+        :param file_path: Path of the document.
+        :param loader: Method used to load the document.
+        """
+        if file_path not in self._documents:
+            self._signatures[file_path] = _get_file_signature(file_path)
+            self._loaders[file_path] = loader
+            self._documents[file_path] = loader(file_path)
+
+    def _get_site_path(self):
+        """
+        :returns: Path to the site authentication file, loaded in the transaction.
+        """
+        if not self._host:
+            raise ValueError("No host was specified for this session cache transaction.")
+        file_path = _get_site_authentication_file_location(self._host)
+        self._load(file_path, _try_load_site_authentication_file)
+        return file_path
+
+    def _get_global_path(self):
+        """
+        :returns: Path to the global authentication file, loaded in the transaction.
+        """
+        file_path = _get_global_authentication_file_location()
+        self._load(file_path, _try_load_global_authentication_file)
+        return file_path
+
+    def _apply(self, file_path, operation):
+        """
+        Modifies a document and records the modification.
+
+        :param file_path: Path of the document to modify.
+        :param operation: Method that takes the document, modifies it and
+            returns True if anything changed.
+
+        :returns: True if the document was modified, False otherwise.
+        """
+        self._operations.setdefault(file_path, []).append(operation)
+        if operation(self._documents[file_path]):
+            self._dirty.add(file_path)
+            return True
+        return False
+
+    def delete_session_data(self, login):
+        """
+        Clears the session cache for the given login.
+
+        :param login: User to clear the session cache for.
+        """
+
+        def remove_user(users_file):
+            # File the users to remove the token
+            users = [u for u in users_file[_USERS] if not _is_same_user(u, login)]
+            if len(users) == len(users_file[_USERS]):
+                return False
+            users_file[_USERS] = users
+            return True
+
+        self._apply(self._get_site_path(), remove_user)
+
+    def cache_session_data(self, login, session_token, session_metadata=None):
+        """
+        Caches the session data for a user.
+
+        :param login: User we want to cache a session for.
+        :param session_token: Session token we want to cache.
+        :param session_metadata: Session meta data.
+        """
+        file_path = self._get_site_path()
+
+        logger.debug(
+            "Checking if we need to update cached session data "
+            "for site '%s' and user '%s' in %s..." % (self._host, login, file_path)
+        )
+
+        def insert_or_update_user(document):
+            return _insert_or_update_user(
+                document, login, session_token, session_metadata
+            )
+
+        if self._apply(file_path, insert_or_update_user):
+            logger.debug("Updated session cache data.")
+        else:
+            logger.debug("Session data was already up to date.")
+
+    def set_current_user(self, login):
+        """
+        Saves the current user and updates the recent user list.
+
+        :param login: The current user login.
+        """
+        login = login.strip()
+
+        def update_current_user(document):
+            return _update_recent_list(document, _CURRENT_USER, _RECENT_USERS, login)
+
+        self._apply(self._get_site_path(), update_current_user)
+
+    def set_preferred_method(self, method):
+        """
+        Saves the authentication method.
+
+        :param method: The prefered authentication method.
+        """
+        method_name = constants.method_resolve.get(method)
+        if not method_name:
+            return
+
+        def update_preferred_method(document):
+            if document.get(_PREFERRED_METHOD) == method_name:
+                return False
+            document[_PREFERRED_METHOD] = method_name
+            return True
+
+        self._apply(self._get_site_path(), update_preferred_method)
+
+    def set_current_host(self, host):
+        """
+        Saves the current host and updates the most recent host list.
+
+        :param host: The new current host.
+        """
+        if host:
+            host = connection.sanitize_url(host)
+
+        def update_current_host(document):
+            return _update_recent_list(document, _CURRENT_HOST, _RECENT_HOSTS, host)
+
+        self._apply(self._get_global_path(), update_current_host)
+
+    def _merge(self, file_path):
+        """
+        Loads the latest version of a file and reapplies the modifications
+        made in the transaction on top of it.
+
+        :param file_path: Path of the document.
+
+        :returns: The merged document, or None if the file already contains
+            every modification.
+        """
+        document = self._loaders[file_path](file_path)
+        changed = False
+        for operation in self._operations[file_path]:
+            changed = operation(document) or changed
+        if not changed:
+            logger.debug("'%s' is already up to date." % file_path)
+            return None
+        return document
+
+    def _commit(self):
+        """
+        Writes back every modified document.
+
+        Each file is locked while it is being written. If it was modified since
+        the transaction loaded it, the latest version is loaded back and the
+        modifications are reapplied on top of it.
+
+        If the lock can't be taken, the file is written without it. To limit
+        the risk of overwriting the updates of another writer, the latest
+        version of the file is merged right before writing it, and the file is
+        read back afterwards until the modifications are found in it.
+        """
+        for file_path in sorted(self._dirty):
+            _ensure_folder_for_file(file_path)
+            with _lock_file(file_path) as locked:
+                if locked:
+                    self._write_locked(file_path)
+                else:
+                    self._write_unlocked(file_path)
+                _remove_stale_temp_files(file_path)
+        self._dirty.clear()
+        self._documents.clear()
+
+    def _write_locked(self, file_path):
+        """
+        Writes a modified document while holding the lock on its file.
+
+        :param file_path: Path of the document.
+        """
+        document = self._documents[file_path]
+        if _get_file_signature(file_path) != self._signatures[file_path]:
+            logger.debug(
+                "'%s' was modified by another writer, merging changes." % file_path
+            )
+            document = self._merge(file_path)
+            if document is None:
+                return
+        _write_yaml_file(file_path, document)
+
+    def _write_unlocked(self, file_path):
+        """
+        Writes a modified document without holding the lock on its file.
+
+        :param file_path: Path of the document.
+        """
+        for _ in range(_UNLOCKED_WRITE_ATTEMPTS):
+            document = self._merge(file_path)
+            if document is None:
+                return
+            _write_yaml_file(file_path, document)
+        logger.warning(
+            "Updates to '%s' kept being overwritten by other writers and may "
+            "have been lost." % file_path
+        )
+
+
+# Transaction active for the current thread, if any.
+_transaction_state = threading.local()
+
+
+@contextlib.contextmanager
+def transaction(host=None, best_effort=False):
+    """
+    Context manager that batches updates to the session cache files, so that
+    each file is read and written at most once::
+
+        with session_cache.transaction(host) as txn:
+            txn.cache_session_data(login, session_token)
+            txn.set_current_user(login)
+            txn.set_current_host(host)
+
+    Transactions started while another one is active on the same thread,
+    including the ones started by the module level functions, are merged
+    into the outer one and files are only written when the outermost
+    transaction ends. Nothing is written if the outermost transaction is
+    exited with an exception.
+
+    :param host: Site the site level updates are made for. Can be omitted
+        if only the current host is updated.
+    :param bool best_effort: If True and this is the outermost transaction,
+        failures to write the files are logged instead of raised, since the
+        session cache can always be rebuilt by asking for the credentials
+        again.
+
+    :returns: A :class:`SessionCacheTransaction` instance.
+    """
+    outer = getattr(_transaction_state, "current", None)
+    if outer is not None:
+        yield outer._bind(host)
+        return
+
+    current = SessionCacheTransaction(host)
+    _transaction_state.current = current
+    try:
+        yield current
+    finally:
+        _transaction_state.current = None
+    if not best_effort:
+        current._commit()
+        return
+
+    try:
+        current._commit()
+    except Exception:
+        # Do not break execution because somehow we couldn't cache the
+        # credentials. We'll simply be asking them again next time.
+        logger.exception("Couldn't write the session cache to disk:")
+
+
+def _load_site_authentication_file(host):
+    """
+    Returns the site level authentication data, taking into account the
+    modifications made by the active transaction.
+
+    :param host: Site to load the authentication data for.
+
+    :returns: site authentication style dictionary
+    """
+    file_path = _get_site_authentication_file_location(host)
+    current = getattr(_transaction_state, "current", None)
+    document = current._get_pending_document(file_path) if current else None
+    if document is None:
+        document = _try_load_site_authentication_file(file_path)
+    return document
+
+
+def _load_global_authentication_file():
+    """
+    Returns the global authentication data, taking into account the
+    modifications made by the active transaction.
+
+    :returns: global authentication style dictionary
+    """
+    file_path = _get_global_authentication_file_location()
+    current = getattr(_transaction_state, "current", None)
+    document = current._get_pending_document(file_path) if current else None
+    if document is None:
+        document = _try_load_global_authentication_file(file_path)
+    return document
+
+
 def delete_session_data(host, login):
     """
     Clears the session cache for the given site and login.
@@ -375,21 +1233,16 @@ def delete_session_data(host, login):
         logger.error("Current host not set, nothing to clear.")
         return
     logger.debug("Clearing session cached on disk.")
+    info_path = _get_site_authentication_file_location(host)
     try:
-        info_path = _get_site_authentication_file_location(host)
-        logger.debug("Session file found.")
-        # Read in the file
-        users_file = _try_load_site_authentication_file(info_path)
-        # File the users to remove the token
-        users_file[_USERS] = [
-            u for u in users_file[_USERS] if not _is_same_user(u, login)
-        ]
-        # Write back the file.
-        _write_yaml_file(info_path, users_file)
+        with transaction(host) as txn:
+            txn.delete_session_data(login)
         logger.debug("Session cleared.")
     except Exception:
         logger.exception("Couldn't update the session cache file!")
         raise
+    finally:
+        _document_cache.invalidate(info_path)
 
 
 def get_session_data(base_url, login):
@@ -401,10 +1254,8 @@ def get_session_data(base_url, login):
 
     :returns: Returns a dictionary with keys login and session_token or None
     """
-    # Retrieve the location of the cached info
-    info_path = _get_site_authentication_file_location(base_url)
     try:
-        users_file = _try_load_site_authentication_file(info_path)
+        users_file = _load_site_authentication_file(base_url)
         for user in users_file[_USERS]:
             # Search for the user in the users dictionary.
             if not _is_same_user(user, login):
@@ -414,10 +1265,9 @@ def get_session_data(base_url, login):
                 continue
 
             session_token = user[_SESSION_TOKEN]
-            if _encryption[1] and session_token:
-                from cryptography.fernet import Fernet
-                fernet = Fernet(_encryption[1])
-                session_token = fernet.decrypt(session_token.encode()).decode()
+            context = _get_crypto_context()
+            if context and session_token:
+                session_token = context.decrypt(session_token)
 
             session_data = {
                 _LOGIN: user[_LOGIN],
@@ -446,23 +1296,8 @@ def cache_session_data(host, login, session_token, session_metadata=None):
     :param session_token: Session token we want to cache.
     :param session_metadata: Session meta data.
     """
-    # Retrieve the cached info file location from the host
-    file_path = _get_site_authentication_file_location(host)
-    _ensure_folder_for_file(file_path)
-
-    logger.debug(
-        "Checking if we need to update cached session data "
-        "for site '%s' and user '%s' in %s..." % (host, login, file_path)
-    )
-
-    document = _try_load_site_authentication_file(file_path)
-
-    if _insert_or_update_user(document, login, session_token, session_metadata):
-        # Write back the file only it a new user was added.
-        _write_yaml_file(file_path, document)
-        logger.debug("Updated session cache data.")
-    else:
-        logger.debug("Session data was already up to date.")
+    with transaction(host) as txn:
+        txn.cache_session_data(login, session_token, session_metadata)
 
 
 def get_current_user(host):
@@ -473,9 +1308,7 @@ def get_current_user(host):
 
     :returns: The current user for this host or None if not set.
     """
-    # Retrieve the cached info file location from the host
-    info_path = _get_site_authentication_file_location(host)
-    document = _try_load_site_authentication_file(info_path)
+    document = _load_site_authentication_file(host)
     user = document[_CURRENT_USER]
     logger.debug("Current user is '%s'" % user)
     return user.strip() if user else user
@@ -489,17 +1322,8 @@ def set_current_user(host, login):
     :param host: Host to save the current user for.
     :param login: The current user login for specified host.
     """
-    host = host.strip()
-    login = login.strip()
-
-    file_path = _get_site_authentication_file_location(host)
-    _ensure_folder_for_file(file_path)
-
-    current_user_file = _try_load_site_authentication_file(file_path)
-
-    _update_recent_list(current_user_file, _CURRENT_USER, _RECENT_USERS, login)
-
-    _write_yaml_file(file_path, current_user_file)
+    with transaction(host.strip()) as txn:
+        txn.set_current_user(login)
 
 
 def set_current_host(host):
@@ -508,16 +1332,8 @@ def set_current_host(host):
 
     :param host: The new current host.
     """
-    if host:
-        host = connection.sanitize_url(host)
-
-    file_path = _get_global_authentication_file_location()
-    _ensure_folder_for_file(file_path)
-
-    current_host_file = _try_load_global_authentication_file(file_path)
-
-    _update_recent_list(current_host_file, _CURRENT_HOST, _RECENT_HOSTS, host)
-    _write_yaml_file(file_path, current_host_file)
+    with transaction() as txn:
+        txn.set_current_host(host)
 
 
 def _update_recent_list(document, current_key, recent_key, value):
@@ -528,7 +1344,10 @@ def _update_recent_list(document, current_key, recent_key, value):
     For example, if a document has the current_host (current_key) and recent_hosts (recent_key) key,
     the current_host would be set to the host (value) passed in and the host would be inserted
     at the front of recent_key's array.
+
+    :returns: True if the document was modified, False otherwise.
     """
+    previous = (document[current_key], list(document[recent_key]))
     document[current_key] = value
     # Make sure this user is now the most recent one.
     if value in document[recent_key]:
@@ -536,6 +1355,7 @@ def _update_recent_list(document, current_key, recent_key, value):
     document[recent_key].insert(0, value)
     # Only keep the 8 most recent entries
     document[recent_key] = document[recent_key][:8]
+    return previous != (document[current_key], document[recent_key])
 
 
 def get_current_host():
@@ -544,9 +1364,7 @@ def get_current_host():
 
     :returns: The current host string, None if undefined
     """
-    # Retrieve the cached info file location from the host
-    info_path = _get_global_authentication_file_location()
-    document = _try_load_global_authentication_file(info_path)
+    document = _load_global_authentication_file()
     host = document[_CURRENT_HOST]
     if host:
         host = connection.sanitize_url(host)
@@ -589,8 +1407,7 @@ def get_recent_hosts():
 
     :returns: List of recently visited hosts.
     """
-    info_path = _get_global_authentication_file_location()
-    document = _try_load_global_authentication_file(info_path)
+    document = _load_global_authentication_file()
     return _get_recent_items(document, _RECENT_HOSTS, _CURRENT_HOST, "hosts")
 
 
@@ -600,8 +1417,7 @@ def get_recent_users(site):
 
     :returns: List of recently visited hosts.
     """
-    info_path = _get_site_authentication_file_location(site)
-    document = _try_load_site_authentication_file(info_path)
+    document = _load_site_authentication_file(site)
     logger.debug("Recent users are: %s", document[_RECENT_USERS])
     return _get_recent_items(document, _RECENT_USERS, _CURRENT_USER, "users")
 
@@ -614,9 +1430,7 @@ def get_preferred_method(host):
 
     :returns: The authentication method for this host or None if not set.
     """
-    # Retrieve the cached info file location from the host
-    info_path = _get_site_authentication_file_location(host)
-    document = _try_load_site_authentication_file(info_path)
+    document = _load_site_authentication_file(host)
     method_name = document.get(_PREFERRED_METHOD)
     if not method_name:
         return
@@ -631,21 +1445,8 @@ def set_preferred_method(host, method):
     :param host: Host to save the current user for.
     :param method: The prefered authentication method for specified host.
     """
-    host = host.strip()
-
-    method_name = constants.method_resolve.get(method)
-    if not method_name:
-        return
-
-    file_path = _get_site_authentication_file_location(host)
-    _ensure_folder_for_file(file_path)
-
-    current_user_file = _try_load_site_authentication_file(file_path)
-    if current_user_file.get(_PREFERRED_METHOD) == method_name:
-        return
-
-    current_user_file[_PREFERRED_METHOD] = method_name
-    _write_yaml_file(file_path, current_user_file)
+    with transaction(host.strip()) as txn:
+        txn.set_preferred_method(method)
 
 
 @LogManager.log_timing
@@ -666,6 +1467,15 @@ def generate_session_token(hostname, login, password, http_proxy, auth_token=Non
         code or backup code.
     :raises Exception: Raised when a network error occurs.
     """
+    from xmlrpc.client import ProtocolError
+
+    from shotgun_api3 import (
+        Shotgun,
+        AuthenticationFault,
+        MissingTwoFactorAuthenticationFault,
+    )
+    from shotgun_api3.lib import httplib2
+
     try:
         # Create the instance that does not connect right away for speed...
         logger.debug("Connecting to PTR to generate session token...")
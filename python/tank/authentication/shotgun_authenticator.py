@@ -10,6 +10,8 @@
 
 """PTR Authenticator."""
 
+import functools
+
 from .sso_saml2 import has_sso_info_in_cookies, has_unified_login_flow_info_in_cookies
 from . import interactive_authentication
 from . import user
@@ -151,6 +153,7 @@ class ShotgunAuthenticator(object):
         host=None,
         http_proxy=None,
         session_metadata=None,
+        cache=True,
     ):
         """
         Create a :class:`ShotgunUser` given a set of human user credentials.
@@ -163,6 +166,9 @@ class ShotgunAuthenticator(object):
         :param host: Shotgun host to log in to. If None, the default host will be used.
         :param http_proxy: Shotgun proxy to use. If None, the default http proxy will be used.
         :param session_metadata: When using Web/SSO, b64encoded browser cookies.
+        :param cache: Set to False to create the user without reading or writing
+            the session cache. The credentials will be written to the session
+            cache only if the session token changes afterwards. Defaults to True.
 
         :returns: A :class:`ShotgunUser` instance.
         """
@@ -178,6 +184,7 @@ class ShotgunAuthenticator(object):
             http_proxy,
             password=password,
             session_metadata=session_metadata,
+            cache=cache,
         )
 
         # We check for SSO first, because it is possible that we use both the
@@ -191,6 +198,50 @@ class ShotgunAuthenticator(object):
             return user.ShotgunWebUser(impl)
         return user.ShotgunUser(impl)
 
+    async def acreate_session_user(
+        self,
+        login,
+        session_token=None,
+        password=None,
+        host=None,
+        http_proxy=None,
+        session_metadata=None,
+        cache=True,
+    ):
+        """
+        Awaitable counterpart of :meth:`create_session_user`.
+
+        The user is created in the default executor of the running event loop,
+        so generating a session token from a password and accessing the session
+        cache don't block the loop.
+
+        :param login: Shotgun user login
+        :param session_token: Shotgun session token
+        :param password: Shotgun password
+        :param host: Shotgun host to log in to. If None, the default host will be used.
+        :param http_proxy: Shotgun proxy to use. If None, the default http proxy will be used.
+        :param session_metadata: When using Web/SSO, b64encoded browser cookies.
+        :param cache: Set to False to create the user without reading or writing
+            the session cache. Defaults to True.
+
+        :returns: A :class:`ShotgunUser` instance.
+        """
+        import asyncio
+
+        return await asyncio.get_running_loop().run_in_executor(
+            None,
+            functools.partial(
+                self.create_session_user,
+                login,
+                session_token=session_token,
+                password=password,
+                host=host,
+                http_proxy=http_proxy,
+                session_metadata=session_metadata,
+                cache=cache,
+            ),
+        )
+
     def create_script_user(self, api_script, api_key, host=None, http_proxy=None):
         """
         Create an AuthenticatedUser given a set of script credentials.
@@ -268,6 +319,7 @@ class ShotgunAuthenticator(object):
                 host=credentials.get("host"),
                 http_proxy=credentials.get("http_proxy"),
                 session_metadata=credentials.get("session_metadata"),
+                cache=credentials.get("cache", True),
             )
         # We don't know what this is, abort!
         else:
@@ -289,18 +341,40 @@ class ShotgunAuthenticator(object):
         :raises: :class:`AuthenticationCancelled` is raised
                  if the user cancelled the authentication.
         """
-        # Make sure we don't already have a user logged in through single
-        # sign-on or provided by a DefaultsManager-derived instance.
-        user = self.get_default_user()
-        if user:
-            return user
+        # Batch all the session cache updates made during the login so each
+        # file is only written once. The user is returned even if they can't
+        # be written.
+        with session_cache.transaction(best_effort=True):
+            # Make sure we don't already have a user logged in through single
+            # sign-on or provided by a DefaultsManager-derived instance.
+            user = self.get_default_user()
+            if user:
+                return user
+
+            # Prompt the client for user credentials and connection information
+            user = self.get_user_from_prompt()
+
+            # Remember that this user and host are the last settings used for
+            # authentication in order to provide single sign-on.
+            self._defaults_manager.set_host(user.host)
+            self._defaults_manager.set_login(user.login)
 
-        # Prompt the client for user credentials and connection information
-        user = self.get_user_from_prompt()
+        return user
 
-        # Remember that this user and host are the last settings used for
-        # authentication in order to provide single sign-on.
-        self._defaults_manager.set_host(user.host)
-        self._defaults_manager.set_login(user.login)
+    async def aget_user(self):
+        """
+        Awaitable counterpart of :meth:`get_user`.
 
-        return user
+        The user is retrieved in the default executor of the running event loop,
+        so neither the session cache accesses nor the credentials prompt block
+        the loop.
+
+        :returns: A :class:`ShotgunUser` derived instance matching the credentials
+                  provided.
+
+        :raises: :class:`AuthenticationCancelled` is raised
+                 if the user cancelled the authentication.
+        """
+        import asyncio
+
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_user)
@@ -16,14 +16,115 @@ at any point.
 --------------------------------------------------------------------------------
 """
 import http.client
+import threading
+import time
 
 from shotgun_api3 import Shotgun, AuthenticationFault
 from xmlrpc.client import ProtocolError
-from . import interactive_authentication, session_cache
+from . import interactive_authentication, session_cache, sso_saml2
 from .. import LogManager
 
 logger = LogManager.get_logger(__name__)
 
+# Number of seconds before the known expiration of a session at which it is
+# renewed in the background.
+PROACTIVE_RENEWAL_MARGIN = 60
+
+
+class _RenewalCoordinator(object):
+    """
+    Renews sessions in the background shortly before they expire, so
+    requests don't have to wait for the renewal.
+
+    This is only possible when the expiration of a session is known, which
+    is the case when the session metadata carries the SAML claims
+    expiration. Renewals go through :class:`SessionRenewal`, so requests
+    failing while a background renewal is in flight wait for it instead of
+    starting their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Maps (host, login) to the (session metadata, expiration) tuple of
+        # the session last seen for that user.
+        self._expirations = {}
+        # Maps (host, login) to the session metadata a background renewal was
+        # last attempted for, so we don't retry over and over again when a
+        # renewal doesn't extend the session.
+        self._proactive_attempts = {}
+
+    def renew_ahead_of_expiry(self, user):
+        """
+        Starts a background renewal if the session of the user is about to
+        expire.
+
+        This is a no-op when the session expiration is unknown, when there
+        is no UI to renew the session with, or when a background renewal was
+        already attempted for this session.
+
+        :param user: SessionUser instance.
+        """
+        session_metadata = user.get_session_metadata()
+        if session_metadata is None:
+            return
+
+        key = (user.get_host(), user.get_login())
+        expiration = self._get_expiration(key, session_metadata)
+        if expiration is None or expiration - time.time() > PROACTIVE_RENEWAL_MARGIN:
+            return
+
+        if interactive_authentication.SessionRenewal.is_renewing(user):
+            return
+
+        with self._lock:
+            if self._proactive_attempts.get(key) == session_metadata:
+                return
+            self._proactive_attempts[key] = session_metadata
+
+        # Without a UI, the only way to renew a session is to prompt on the
+        # console, which we can't do from a background thread.
+        if not interactive_authentication._get_ui_state():
+            return
+
+        logger.debug("Session for %s is about to expire, renewing it.", user)
+        thread = threading.Thread(
+            target=self._renew, args=(user,), name="SessionRenewal"
+        )
+        thread.daemon = True
+        thread.start()
+
+    def _renew(self, user):
+        """
+        Renews the session of a user from a background thread.
+
+        :param user: SessionUser instance.
+        """
+        try:
+            interactive_authentication.renew_session(user)
+        except Exception as e:
+            # Requests will go through the regular renewal once the session
+            # expires.
+            logger.debug("Background session renewal failed: %s", e)
+
+    def _get_expiration(self, key, session_metadata):
+        """
+        Retrieves when a session expires.
+
+        :param tuple key: (host, login) of the user.
+        :param session_metadata: Session metadata of the user.
+
+        :returns: Expiration time in seconds since epoch, or None if unknown.
+        """
+        entry = self._expirations.get(key)
+        if entry is not None and entry[0] == session_metadata:
+            return entry[1]
+        expiration = sso_saml2.get_saml_claims_expiration(session_metadata)
+        self._expirations[key] = (session_metadata, expiration)
+        return expiration
+
+
+_renewal_coordinator = _RenewalCoordinator()
+
 
 class ShotgunWrapper(Shotgun):
     """
@@ -52,6 +153,8 @@ class ShotgunWrapper(Shotgun):
         Wraps the _call_rpc method from the base class to trap authentication
         errors and prompt for the user's password.
         """
+        _renewal_coordinator.renew_ahead_of_expiry(self._user)
+
         try:
             # If the user's session token has changed since we last tried to
             # call the server, it's because the token expired and there's a
@@ -82,11 +185,25 @@ class ShotgunWrapper(Shotgun):
             else:
                 raise e
 
+        # If the user's session token changed while the request was in flight,
+        # another thread renewed the session in the meantime, so try again with
+        # the new token.
+        if self._user.get_session_token() != self.config.session_token:
+            logger.debug("Session was renewed during the request. Trying again.")
+            self.config.session_token = self._user.get_session_token()
+            try:
+                return super()._call_rpc(*args, **kwargs)
+            except AuthenticationFault:
+                logger.debug("Authentication failure, renewed token was rejected.")
+
         # Before renewing the session token, let's see if there is another
-        # one in the session_cache.
-        session_info = session_cache.get_session_data(
-            self._user.get_host(), self._user.get_login()
-        )
+        # one in the session_cache. If the session is already being renewed,
+        # skip this and wait for the new token instead.
+        session_info = None
+        if not interactive_authentication.SessionRenewal.is_renewing(self._user):
+            session_info = session_cache.get_session_data(
+                self._user.get_host(), self._user.get_login()
+            )
 
         # If the one if the cache is different, maybe another process refreshed the token
         # for us, let's try that token instead.
@@ -113,7 +230,8 @@ class ShotgunWrapper(Shotgun):
         # We end up here if we were in sync with the cache or if tried the cached value but it
         # didn't work.
 
-        # Let's renew the session token!
+        # Let's renew the session token! Threads hitting the same expired
+        # session share a single renewal.
         interactive_authentication.renew_session(self._user)
         self.config.session_token = self._user.get_session_token()
         #  If there is once again an authentication fault, then it means
@@ -9,13 +9,20 @@
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
 
+import json
+import os
+from concurrent.futures import Future
+import random
+import threading
 import time
 
 from . import utils
+from .errors import SiteInfoBackoffError
 
-import shotgun_api3
-
+# shotgun_api3 and asyncio are imported when first needed, since the site
+# infos are most of the time read from the disk cache.
 from .. import LogManager
+from ..util import LocalFileStorageManager
 
 logger = LogManager.get_logger(__name__)
 
@@ -29,33 +36,184 @@ INFOS_CACHE_TIMEOUT = 30
 # The side effect would be an additional call to the Shotgun site.
 INFOS_CACHE = {}
 
+# The infos are also cached on disk so they can be shared between processes.
+# Infos younger than INFOS_DISK_CACHE_TIMEOUT seconds are used as is. Older
+# infos are still used for up to INFOS_DISK_CACHE_STALE_TIMEOUT seconds, but
+# are refreshed in the background.
+INFOS_DISK_CACHE_TIMEOUT = 60 * 60
+INFOS_DISK_CACHE_STALE_TIMEOUT = 7 * 24 * 60 * 60
+# When a site can't be reached, it isn't queried again before a delay which
+# doubles after every failure, from INFOS_FAILURE_BACKOFF up to
+# INFOS_FAILURE_MAX_BACKOFF seconds.
+INFOS_FAILURE_BACKOFF = 5
+INFOS_FAILURE_MAX_BACKOFF = 5 * 60
+
+_INFOS_CACHE_FILE_NAME = "site_info.json"
+# Used instead for sites served on a non-default port, since the site cache
+# root only depends on the host name.
+_INFOS_CACHE_PORT_FILE_NAME = "site_info.%d.json"
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Failures of the sites without infos cached on disk. They are only
+# remembered in memory, so that urls that never worked, like the partial ones
+# typed in the login dialog, don't leave files behind. Maps a url to a
+# (number of failures, time before which the site won't be queried again)
+# tuple.
+_failures = {}
+_failures_lock = threading.Lock()
+
+# Urls being refreshed in the background.
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+# Maps a url to the future of the site infos currently being retrieved for it.
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def _get_infos_cache_file_location(url):
+    """
+    :param url: Url of the site.
 
-def _get_site_infos(url, http_proxy=None):
+    :returns: Path to the file caching the site infos on disk.
     """
-    Get and cache the desired site infos.
+    url_items = utils.urlparse.urlparse(url)
+    try:
+        port = url_items.port
+    except ValueError:
+        port = None
+    if port and port != _DEFAULT_PORTS.get(url_items.scheme):
+        file_name = _INFOS_CACHE_PORT_FILE_NAME % port
+    else:
+        file_name = _INFOS_CACHE_FILE_NAME
+    return os.path.join(
+        LocalFileStorageManager.get_site_root(url, LocalFileStorageManager.CACHE),
+        file_name,
+    )
+
+
+def _read_infos_cache_file(url):
+    """
+    Reads the site infos cached on disk.
+
+    The cache has the following format:
+        {
+            "timestamp": <time the infos were retrieved>,
+            "infos": <site infos>,
+            "failures": <number of failed attempts since the infos were retrieved>,
+            "retry_after": <time before which the site won't be queried again>
+        }
+
+    :param url: Url of the site.
+
+    :returns: The cached dictionary, empty if there is no valid cache.
+    """
+    try:
+        with open(_get_infos_cache_file_location(url), "r") as cache_file:
+            entry = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    return entry if isinstance(entry, dict) else {}
+
+
+def _write_infos_cache_file(url, entry):
+    """
+    Writes the site infos cache on disk.
+
+    The file is replaced atomically, so other processes never see a partially
+    written file. Failing to write the cache is not an error.
+
+    :param url: Url of the site.
+    :param dict entry: Dictionary to write.
+    """
+    # The folder of the site also holds its session cache, so it must be
+    # created the same way.
+    from . import session_cache
+
+    file_path = _get_infos_cache_file_location(url)
+    temp_path = "%s.temp%d" % (file_path, random.randint(0, 1000000))
+    try:
+        session_cache._ensure_folder_for_file(file_path)
+        with open(temp_path, "w") as cache_file:
+            json.dump(entry, cache_file)
+        os.replace(temp_path, file_path)
+    except (OSError, TypeError, ValueError):
+        logger.debug("Unable to cache the infos for site '%s'", url, exc_info=True)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _get_retry_after(failures):
+    """
+    :param int failures: Number of consecutive failures to reach a site.
+
+    :returns: Time before which the site won't be queried again.
+    """
+    return time.time() + min(
+        INFOS_FAILURE_BACKOFF * 2 ** (failures - 1), INFOS_FAILURE_MAX_BACKOFF
+    )
+
+
+def _record_failure(url):
+    """
+    Records a failure to reach a site.
+
+    The failure is cached on disk along with the infos of the site if it has
+    any, so that other processes back off as well. Otherwise it is only
+    remembered by this process.
+
+    :param url: Url of the site.
+    """
+    entry = _read_infos_cache_file(url)
+    if "infos" in entry:
+        entry["failures"] = entry.get("failures", 0) + 1
+        entry["retry_after"] = _get_retry_after(entry["failures"])
+        _write_infos_cache_file(url, entry)
+        return
+
+    with _failures_lock:
+        failures = _failures.get(url, (0, 0))[0] + 1
+        _failures[url] = (failures, _get_retry_after(failures))
+
+
+def _get_backoff_deadline(url, entry):
+    """
+    :param url: Url of the site.
+    :param dict entry: Site infos cached on disk.
+
+    :returns: Time before which the site won't be queried again.
+    """
+    with _failures_lock:
+        failure = _failures.get(url)
+    return max(entry.get("retry_after", 0), failure[1] if failure else 0)
+
+
+def _fetch_site_infos(url, http_proxy):
+    """
+    Queries the site infos from the server and caches them.
+
+    When the site can't be reached, the failure is cached so that the site is
+    not queried again before the backoff delay expires.
 
     :param url:            Url of the site to query.
     :param http_proxy:     HTTP proxy to use, if any.
 
     :returns:   A dictionary with the site infos.
     """
-
-    # Checks if the information is in the cache, is missing or out of date.
-    if url not in INFOS_CACHE or (
-        (time.time() - INFOS_CACHE[url][0]) > INFOS_CACHE_TIMEOUT
-    ):
-        # Temporary shotgun instance, used only for the purpose of checking
-        # the site infos.
-        #
-        # The constructor of Shotgun requires either a username/login or
-        # key/scriptname pair or a session_token. The token is only used in
-        # calls which need to be authenticated. The 'info' call does not
-        # require authentication.
-        http_proxy = utils.sanitize_http_proxy(http_proxy).netloc
-        if http_proxy:
-            logger.debug("Using HTTP proxy to connect to the PTR server: %s", http_proxy)
-
-        logger.info("Infos for site '%s' not in cache or expired", url)
+    # Temporary shotgun instance, used only for the purpose of checking
+    # the site infos.
+    #
+    # The constructor of Shotgun requires either a username/login or
+    # key/scriptname pair or a session_token. The token is only used in
+    # calls which need to be authenticated. The 'info' call does not
+    # require authentication.
+    http_proxy = utils.sanitize_http_proxy(http_proxy).netloc
+    if http_proxy:
+        logger.debug("Using HTTP proxy to connect to the PTR server: %s", http_proxy)
+
+    import shotgun_api3
+
+    try:
         sg = shotgun_api3.Shotgun(
             url, session_token="dummy", connect=False, http_proxy=http_proxy
         )
@@ -66,18 +224,210 @@ def _get_site_infos(url, http_proxy=None):
         # python-api v3.0.41
         sg.config.rpc_attempt_interval = 0
         infos = sg.info()
+    except Exception:
+        _record_failure(url)
+        raise
 
-        INFOS_CACHE[url] = (time.time(), infos)
-    else:
+    with _failures_lock:
+        _failures.pop(url, None)
+    now = time.time()
+    _write_infos_cache_file(url, {"timestamp": now, "infos": infos})
+    INFOS_CACHE[url] = (now, infos)
+    return infos
+
+
+def _refresh_site_infos(url, http_proxy):
+    """
+    Refreshes the site infos in a background thread, unless this is already
+    happening for that site.
+
+    :param url:            Url of the site to query.
+    :param http_proxy:     HTTP proxy to use, if any.
+    """
+    with _refreshing_lock:
+        if url in _refreshing:
+            return
+        _refreshing.add(url)
+
+    def refresh():
+        try:
+            _fetch_site_infos(url, http_proxy)
+        except Exception as exc:
+            logger.debug("Unable to refresh the infos for site '%s': %s", url, exc)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(url)
+
+    thread = threading.Thread(target=refresh, name="SiteInfoRefresh")
+    thread.daemon = True
+    thread.start()
+
+
+def _get_site_infos(url, http_proxy=None):
+    """
+    Get and cache the desired site infos.
+
+    The infos are looked up in memory first, then on disk and are only
+    queried from the server when they are missing or too old.
+
+    :param url:            Url of the site to query.
+    :param http_proxy:     HTTP proxy to use, if any.
+
+    :returns:   A dictionary with the site infos.
+
+    :raises SiteInfoBackoffError: Raised if the site couldn't be reached
+        recently and is not to be queried again yet.
+    :raises Exception: Raised if the site can't be reached.
+    """
+
+    # Checks if the information is in the cache, is missing or out of date.
+    if url in INFOS_CACHE and (
+        (time.time() - INFOS_CACHE[url][0]) <= INFOS_CACHE_TIMEOUT
+    ):
         logger.info("Infos for site '%s' found in cache", url)
+        return INFOS_CACHE[url][1]
+
+    entry = _read_infos_cache_file(url)
+    now = time.time()
+    if "infos" in entry:
+        age = now - entry.get("timestamp", 0)
+        if age <= INFOS_DISK_CACHE_STALE_TIMEOUT:
+            if age <= INFOS_DISK_CACHE_TIMEOUT:
+                logger.info("Infos for site '%s' found in disk cache", url)
+            elif entry.get("retry_after", 0) <= now:
+                logger.info(
+                    "Infos for site '%s' found in disk cache, refreshing them", url
+                )
+                _refresh_site_infos(url, http_proxy)
+            INFOS_CACHE[url] = (now, entry["infos"])
+            return entry["infos"]
+
+    retry_after = _get_backoff_deadline(url, entry)
+    if retry_after > now:
+        raise SiteInfoBackoffError(url, retry_after - now)
+
+    logger.info("Infos for site '%s' not in cache or expired", url)
+    return _fetch_site_infos(url, http_proxy)
+
+
+def _resolve_site_infos(url, http_proxy, future):
+    """
+    Retrieves the site infos and resolves the future with them.
+
+    :param url:            Url of the site to query.
+    :param http_proxy:     HTTP proxy to use, if any.
+    :param future:         Future to resolve.
+    """
+    try:
+        infos = _get_site_infos(url, http_proxy)
+    except Exception as exc:
+        with _in_flight_lock:
+            _in_flight.pop(url, None)
+        future.set_exception(exc)
+    else:
+        with _in_flight_lock:
+            _in_flight.pop(url, None)
+        future.set_result(infos)
+
+
+def _get_site_infos_future(url, http_proxy=None, background=True):
+    """
+    Get the desired site infos as a future.
 
-    return INFOS_CACHE[url][1]
+    Requests for a site whose infos are already being retrieved share the
+    same request.
+
+    :param url:            Url of the site to query.
+    :param http_proxy:     HTTP proxy to use, if any.
+    :param background:     If True, the infos are retrieved in a background
+                           thread, otherwise they are retrieved on the calling
+                           thread before returning.
+
+    :returns:   A :class:`concurrent.futures.Future` resolved with the
+                dictionary of site infos.
+    """
+    with _in_flight_lock:
+        future = _in_flight.get(url)
+        if future is not None:
+            return future
+        future = Future()
+        # Avoid starting a thread when the infos are at hand.
+        if url in INFOS_CACHE and (
+            (time.time() - INFOS_CACHE[url][0]) <= INFOS_CACHE_TIMEOUT
+        ):
+            future.set_result(INFOS_CACHE[url][1])
+            return future
+        _in_flight[url] = future
+
+    if background:
+        thread = threading.Thread(
+            target=_resolve_site_infos,
+            args=(url, http_proxy, future),
+            name="SiteInfoReload",
+        )
+        thread.daemon = True
+        thread.start()
+    else:
+        _resolve_site_infos(url, http_proxy, future)
+    return future
+
+
+def _is_valid_url(url):
+    """
+    :param url: Url of the site.
+
+    :returns: True if the url can be queried, False otherwise.
+    """
+    url_items = utils.urlparse.urlparse(url)
+    if (
+        not url_items.netloc
+        or url_items.netloc in "https"
+        or url_items.scheme not in ["http", "https"]
+    ):
+        logger.debug("Invalid Flow Production Tracking URL %s" % url)
+        return False
+    return True
+
+
+def prefetch_site_infos(urls, http_proxy=None):
+    """
+    Starts retrieving the infos of multiple sites in the background, so they
+    are available by the time they are needed.
+
+    :param urls:           Urls of the sites to query.
+    :param http_proxy:     HTTP proxy to use, if any.
+
+    :returns:   A list of :class:`concurrent.futures.Future`, one per valid url,
+                resolved with the site infos.
+    """
+    return [
+        _get_site_infos_future(url, http_proxy)
+        for url in urls
+        if url and _is_valid_url(url)
+    ]
+
+
+def prefetch_recent_hosts(http_proxy=None):
+    """
+    Starts retrieving the infos of every recently used site in the background.
+
+    :param http_proxy:     HTTP proxy to use, if any.
+
+    :returns:   A list of :class:`concurrent.futures.Future` resolved with the
+                site infos.
+    """
+    # Avoid cyclic imports.
+    from . import session_cache
+
+    return prefetch_site_infos(session_cache.get_recent_hosts(), http_proxy)
 
 
 class SiteInfo(object):
     def __init__(self):
         self._url = None
         self._infos = {}
+        # Last url the infos were requested for.
+        self._requested_url = None
 
     def reload(self, url, http_proxy=None):
         """
@@ -89,28 +439,119 @@ class SiteInfo(object):
         some of the input fields and by the console authentication to select the
         appropriate authentication method.
 
+        If the infos for that site are already being retrieved, this method
+        waits for that request instead of making a new one.
+
         :param url:            Url of the site to query.
         :param http_proxy:     HTTP proxy to use, if any.
         """
+        self._requested_url = url
         # Check for valid URL
-        url_items = utils.urlparse.urlparse(url)
-        if (
-            not url_items.netloc
-            or url_items.netloc in "https"
-            or url_items.scheme not in ["http", "https"]
-        ):
-            logger.debug("Invalid Flow Production Tracking URL %s" % url)
+        if not _is_valid_url(url):
             return
 
         infos = {}
         try:
-            infos = _get_site_infos(url, http_proxy)
+            infos = _get_site_infos_future(url, http_proxy, background=False).result()
         # pylint: disable=broad-except
         except Exception as exc:
             # Silently ignore exceptions
             logger.debug("Unable to connect with %s, got exception '%s'", url, exc)
             return
 
+        self._set_infos(url, infos)
+
+    def reload_async(self, url, http_proxy=None):
+        """
+        Load the site information into the instance without blocking.
+
+        Requests for a site whose infos are already being retrieved share the
+        same request. If the instance is reloaded with another url before the
+        infos are available, they are ignored and the returned future is
+        cancelled.
+
+        :param url:            Url of the site to query.
+        :param http_proxy:     HTTP proxy to use, if any.
+
+        :returns:   A :class:`concurrent.futures.Future` resolved with True once
+                    the instance has been updated, or False if the infos could
+                    not be retrieved.
+        """
+        self._requested_url = url
+        future = Future()
+        if not _is_valid_url(url):
+            future.set_result(False)
+            return future
+
+        def on_infos_retrieved(infos_future):
+            if future.cancelled():
+                return
+            if self._requested_url != url:
+                logger.debug("Ignoring superseded infos for site %s", url)
+                future.cancel()
+                return
+            try:
+                infos = infos_future.result()
+            # pylint: disable=broad-except
+            except Exception as exc:
+                # Silently ignore exceptions
+                logger.debug("Unable to connect with %s, got exception '%s'", url, exc)
+                future.set_result(False)
+                return
+            self._set_infos(url, infos)
+            future.set_result(True)
+
+        _get_site_infos_future(url, http_proxy).add_done_callback(on_infos_retrieved)
+        return future
+
+    async def areload(self, url, http_proxy=None):
+        """
+        Awaitable counterpart of :meth:`reload`.
+
+        The infos are retrieved from a background thread, so the event loop is
+        never blocked and multiple sites can be probed concurrently. Requests
+        for a site whose infos are already being retrieved share the same
+        request. Cancelling the awaiting task doesn't cancel that request.
+
+        :param url:            Url of the site to query.
+        :param http_proxy:     HTTP proxy to use, if any.
+
+        :returns:   True if the instance has been updated, False if the infos
+                    could not be retrieved or if the instance was reloaded with
+                    another url in the meantime.
+        """
+        self._requested_url = url
+        if not _is_valid_url(url):
+            return False
+
+        import asyncio
+
+        try:
+            # The future may be shared with other callers, so it must not be
+            # cancelled along with the awaiting task.
+            infos = await asyncio.shield(
+                asyncio.wrap_future(_get_site_infos_future(url, http_proxy))
+            )
+        # pylint: disable=broad-except
+        except Exception as exc:
+            # Silently ignore exceptions
+            logger.debug("Unable to connect with %s, got exception '%s'", url, exc)
+            return False
+
+        if self._requested_url != url:
+            logger.debug("Ignoring superseded infos for site %s", url)
+            return False
+
+        self._set_infos(url, infos)
+        return True
+
+    def _set_infos(self, url, infos):
+        """
+        Updates the instance with the infos of a site.
+
+        :param url:            Url of the site.
+        :param infos:          Dictionary of site infos.
+        """
         self._url = url
         self._infos = infos
 
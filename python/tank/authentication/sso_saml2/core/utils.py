@@ -15,7 +15,11 @@ SSO/SAML2 Core utility functions.
 
 import base64
 import binascii
+import collections
+import hashlib
 import logging
+import threading
+import types
 from urllib.parse import unquote_plus
 from http.cookies import SimpleCookie
 
@@ -116,6 +120,174 @@ def _get_shotgun_user_id(cookies):
     return user_id
 
 
+class CookieJar(object):
+    """
+    Read-only view of the Shotgun cookies held in a session metadata blob.
+
+    The cookies are decoded and parsed once, when the view is created. Use
+    :func:`get_cookie_jar` to retrieve instances, as it avoids parsing the
+    same blob over and over again.
+    """
+
+    __slots__ = ("_values", "_user_id", "_user_id_error")
+
+    def __init__(self, encoded_cookies):
+        """
+        :param encoded_cookies: An encoded string representing the cookie jar.
+        """
+        cookies = SimpleCookie()
+        cookies.load(_decode_cookies(encoded_cookies))
+        self._values = types.MappingProxyType(
+            {name: morsel.value for name, morsel in cookies.items()}
+        )
+        # The user id can't be determined when the cookies come from multiple
+        # sites. Only raise when the user id is actually needed, like we
+        # always did.
+        try:
+            self._user_id = _get_shotgun_user_id(cookies)
+            self._user_id_error = None
+        except SsoSaml2MultiSessionNotSupportedError as e:
+            self._user_id = None
+            self._user_id_error = e.args
+
+    @property
+    def user_id(self):
+        """
+        Id of the user in the shotgun instance, as a string, or None.
+
+        :raises SsoSaml2MultiSessionNotSupportedError: If the cookies come from
+            multiple sites.
+        """
+        if self._user_id_error is not None:
+            raise SsoSaml2MultiSessionNotSupportedError(*self._user_id_error)
+        return self._user_id
+
+    def get(self, cookie_name):
+        """
+        Returns a cookie value based on its name.
+
+        :param cookie_name: The name of the cookie.
+
+        :returns: A string of the cookie value, or None.
+        """
+        return self._values.get(cookie_name)
+
+    def get_from_prefix(self, cookie_prefix):
+        """
+        Returns a cookie value based on a prefix to which we will append the user id.
+
+        :param cookie_prefix: The prefix of the cookie name.
+
+        :returns: A string of the cookie value, or None.
+        """
+        return self._values.get("%s%s" % (cookie_prefix, self.user_id))
+
+    @property
+    def saml_claims_expiration(self):
+        """
+        Expiration time of the saml claims, as an int with the time in seconds
+        since January 1st 1970 UTC, or None.
+        """
+        # Shotgun appends the unique numerical ID of the user to the cookie name:
+        # ex: shotgun_sso_session_expiration_u78
+        saml_claims_expiration = self.get(
+            "shotgun_current_user_sso_claims_expiration"
+        ) or self.get_from_prefix("shotgun_sso_session_expiration_u")
+        if saml_claims_expiration is not None:
+            saml_claims_expiration = int(saml_claims_expiration)
+        return saml_claims_expiration
+
+    @property
+    def session_expiration(self):
+        """
+        Expiration time of the Shotgun session, as an int with the time in seconds
+        since January 1st 1970 UTC, or None if the cookie
+        'shotgun_current_session_expiration' is not defined.
+        """
+        session_expiration = self.get("shotgun_current_session_expiration")
+        if session_expiration is not None:
+            session_expiration = int(session_expiration)
+        return session_expiration
+
+    @property
+    def user_name(self):
+        """
+        User name, or None.
+        """
+        # Shotgun appends the unique numerical ID of the user to the cookie name:
+        # ex: shotgun_sso_session_userid_u78
+        user_name = self.get("shotgun_current_user_login") or self.get_from_prefix(
+            "shotgun_sso_session_userid_u"
+        )
+        if user_name is not None:
+            user_name = unquote_plus(user_name)
+        return user_name
+
+    @property
+    def session_id(self):
+        """
+        Session id, or None.
+        """
+        return self.get("_session_id")
+
+    @property
+    def csrf_token(self):
+        """
+        CSRF token, or None.
+        """
+        # Shotgun appends the unique numerical ID of the user to the cookie name:
+        # ex: csrf_token_u78
+        return self.get_from_prefix("csrf_token_u")
+
+    @property
+    def csrf_key(self):
+        """
+        Name of the CSRF token cookie.
+        """
+        # Shotgun appends the unique numerical ID of the user to the cookie name:
+        # ex: csrf_token_u78
+        return "csrf_token_u%s" % self.user_id
+
+
+# Number of parsed cookie jars kept in memory.
+_COOKIE_JAR_CACHE_SIZE = 16
+
+# Parsed cookie jars, keyed by the digest of their encoded cookies and in least
+# recently used order.
+_cookie_jars = collections.OrderedDict()
+_cookie_jars_lock = threading.Lock()
+
+
+def get_cookie_jar(encoded_cookies):
+    """
+    Returns the parsed view of a cookie jar.
+
+    Views are cached, so parsing the same encoded cookies again is free.
+
+    :param encoded_cookies: An encoded string representing the cookie jar.
+
+    :returns: A :class:`CookieJar` instance.
+    """
+    blob = encoded_cookies or b""
+    if isinstance(blob, str):
+        blob = blob.encode("utf-8")
+    digest = hashlib.sha256(blob).digest()
+
+    with _cookie_jars_lock:
+        cookie_jar = _cookie_jars.get(digest)
+        if cookie_jar is not None:
+            _cookie_jars.move_to_end(digest)
+            return cookie_jar
+
+    cookie_jar = CookieJar(encoded_cookies)
+
+    with _cookie_jars_lock:
+        _cookie_jars[digest] = cookie_jar
+        while len(_cookie_jars) > _COOKIE_JAR_CACHE_SIZE:
+            _cookie_jars.popitem(last=False)
+    return cookie_jar
+
+
 def _get_cookie(encoded_cookies, cookie_name):
     """
     Returns a cookie value based on its name.
@@ -125,12 +297,7 @@ def _get_cookie(encoded_cookies, cookie_name):
 
     :returns: A string of the cookie value, or None.
     """
-    value = None
-    cookies = SimpleCookie()
-    cookies.load(_decode_cookies(encoded_cookies))
-    if cookie_name in cookies:
-        value = cookies[cookie_name].value
-    return value
+    return get_cookie_jar(encoded_cookies).get(cookie_name)
 
 
 def _get_cookie_from_prefix(encoded_cookies, cookie_prefix):
@@ -142,13 +309,7 @@ def _get_cookie_from_prefix(encoded_cookies, cookie_prefix):
 
     :returns: A string of the cookie value, or None.
     """
-    value = None
-    cookies = SimpleCookie()
-    cookies.load(_decode_cookies(encoded_cookies))
-    key = "%s%s" % (cookie_prefix, _get_shotgun_user_id(cookies))
-    if key in cookies:
-        value = cookies[key].value
-    return value
+    return get_cookie_jar(encoded_cookies).get_from_prefix(cookie_prefix)
 
 
 def get_saml_claims_expiration(encoded_cookies):
@@ -159,14 +320,7 @@ def get_saml_claims_expiration(encoded_cookies):
 
     :returns: An int with the time in seconds since January 1st 1970 UTC, or None
     """
-    # Shotgun appends the unique numerical ID of the user to the cookie name:
-    # ex: shotgun_sso_session_expiration_u78
-    saml_claims_expiration = _get_cookie(
-        encoded_cookies, "shotgun_current_user_sso_claims_expiration"
-    ) or _get_cookie_from_prefix(encoded_cookies, "shotgun_sso_session_expiration_u")
-    if saml_claims_expiration is not None:
-        saml_claims_expiration = int(saml_claims_expiration)
-    return saml_claims_expiration
+    return get_cookie_jar(encoded_cookies).saml_claims_expiration
 
 
 def get_session_expiration(encoded_cookies):
@@ -178,12 +332,7 @@ def get_session_expiration(encoded_cookies):
     :returns: An int with the time in seconds since January 1st 1970 UTC, or None if the cookie
               'shotgun_current_session_expiration' is not defined.
     """
-    session_expiration = _get_cookie(
-        encoded_cookies, "shotgun_current_session_expiration"
-    )
-    if session_expiration is not None:
-        session_expiration = int(session_expiration)
-    return session_expiration
+    return get_cookie_jar(encoded_cookies).session_expiration
 
 
 def get_user_name(encoded_cookies):
@@ -194,14 +343,7 @@ def get_user_name(encoded_cookies):
 
     :returns: A string with the user name, or None
     """
-    # Shotgun appends the unique numerical ID of the user to the cookie name:
-    # ex: shotgun_sso_session_userid_u78
-    user_name = _get_cookie(
-        encoded_cookies, "shotgun_current_user_login"
-    ) or _get_cookie_from_prefix(encoded_cookies, "shotgun_sso_session_userid_u")
-    if user_name is not None:
-        user_name = unquote_plus(user_name)
-    return user_name
+    return get_cookie_jar(encoded_cookies).user_name
 
 
 def get_session_id(encoded_cookies):
@@ -212,13 +354,7 @@ def get_session_id(encoded_cookies):
 
     :returns: A string with the session id, or None
     """
-    session_id = None
-    cookies = SimpleCookie()
-    cookies.load(_decode_cookies(encoded_cookies))
-    key = "_session_id"
-    if key in cookies:
-        session_id = cookies[key].value
-    return session_id
+    return get_cookie_jar(encoded_cookies).session_id
 
 
 def get_csrf_token(encoded_cookies):
@@ -229,9 +365,7 @@ def get_csrf_token(encoded_cookies):
 
     :returns: A string with the csrf token, or None
     """
-    # Shotgun appends the unique numerical ID of the user to the cookie name:
-    # ex: csrf_token_u78
-    return _get_cookie_from_prefix(encoded_cookies, "csrf_token_u")
+    return get_cookie_jar(encoded_cookies).csrf_token
 
 
 def get_csrf_key(encoded_cookies):
@@ -242,8 +376,4 @@ def get_csrf_key(encoded_cookies):
 
     :returns: A string with the csrf token name
     """
-    cookies = SimpleCookie()
-    cookies.load(_decode_cookies(encoded_cookies))
-    # Shotgun appends the unique numerical ID of the user to the cookie name:
-    # ex: csrf_token_u78
-    return "csrf_token_u%s" % _get_shotgun_user_id(cookies)
+    return get_cookie_jar(encoded_cookies).csrf_key
@@ -8,7 +8,10 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
+import heapq
+import itertools
 import os
+import random
 import threading
 import time
 
@@ -24,6 +27,177 @@ logger = LogManager.get_logger(__name__)
 # Ensure that the SSO-related logging will be merged in our loggin.
 sso_saml2.set_logger_parent(logger)
 
+# Fraction of the renewal delay by which claims renewals are randomly brought
+# forward, so that users created at the same time don't all renew at once.
+CLAIMS_RENEWAL_JITTER = 0.1
+
+# Number of seconds a claims renewal can run past its due time before it is
+# counted as a missed deadline.
+CLAIMS_RENEWAL_DEADLINE_TOLERANCE = 1.0
+
+
+class _ScheduledClaimsRenewal(object):
+    """
+    Claims renewal of a user, as tracked by the claims renewal scheduler.
+    """
+
+    def __init__(self, user, due_time, preemtive_renewal_threshold):
+        """
+        :param user: ShotgunSamlUser whose claims need to be renewed.
+        :param float due_time: Monotonic time at which the renewal is due.
+        :param float preemtive_renewal_threshold: Threshold to pass on to the
+            next renewal.
+        """
+        self.user = user
+        self.due_time = due_time
+        self.preemtive_renewal_threshold = preemtive_renewal_threshold
+        self.cancelled = False
+        self.done = False
+
+    def is_active(self):
+        """
+        :returns: True if the renewal is pending or running, False otherwise.
+        """
+        return not self.cancelled and not self.done
+
+
+class _ClaimsRenewalScheduler(object):
+    """
+    Runs the claims renewals of every ShotgunSamlUser from a single daemon
+    thread, in order of due time.
+
+    Renewals are executed one after the other. A renewal that runs later than
+    its due time, for example because a previous one was waiting on user input,
+    is counted as a missed deadline.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        # Heap of (due time, sequence number, scheduled renewal) tuples. The
+        # sequence number keeps the ordering stable for identical due times.
+        self._heap = []
+        self._sequence = itertools.count()
+        self._thread = None
+        self._stats = {
+            "scheduled": 0,
+            "cancelled": 0,
+            "executed": 0,
+            "missed_deadlines": 0,
+            "max_delay": 0.0,
+        }
+
+    def schedule(self, user, delay, preemtive_renewal_threshold):
+        """
+        Schedules the claims renewal of a user.
+
+        :param user: ShotgunSamlUser whose claims need to be renewed.
+        :param float delay: Number of seconds after which the renewal is due. The
+            renewal will be brought forward by up to :data:`CLAIMS_RENEWAL_JITTER`
+            of that delay.
+        :param float preemtive_renewal_threshold: Threshold to pass on to the
+            renewal.
+
+        :returns: The _ScheduledClaimsRenewal instance.
+        """
+        delay *= 1 - random.uniform(0, CLAIMS_RENEWAL_JITTER)
+        renewal = _ScheduledClaimsRenewal(
+            user, time.monotonic() + delay, preemtive_renewal_threshold
+        )
+        with self._condition:
+            heapq.heappush(
+                self._heap, (renewal.due_time, next(self._sequence), renewal)
+            )
+            self._stats["scheduled"] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ClaimsRenewalScheduler"
+                )
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+        return renewal
+
+    def cancel(self, renewal):
+        """
+        Cancels a scheduled renewal. A renewal that is already running will
+        complete.
+
+        :param renewal: _ScheduledClaimsRenewal instance.
+        """
+        with self._condition:
+            if renewal.is_active():
+                renewal.cancelled = True
+                self._stats["cancelled"] += 1
+            # The renewal will be discarded when it reaches the top of the heap.
+            self._condition.notify()
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of renewals ``scheduled``,
+            ``cancelled``, ``executed``, ``pending``, the number of
+            ``missed_deadlines`` and the ``max_delay`` in seconds a renewal ran
+            past its due time.
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats["pending"] = sum(
+                1 for _, _, renewal in self._heap if not renewal.cancelled
+            )
+        return stats
+
+    def _run(self):
+        """
+        Main loop of the scheduler thread.
+        """
+        while True:
+            renewal = self._get_next_renewal()
+            try:
+                renewal.user._do_automatic_claims_renewal(
+                    renewal.preemtive_renewal_threshold
+                )
+            except AuthenticationCancelled:
+                # Already logged, the renewal simply won't be rescheduled.
+                pass
+            except Exception:
+                logger.exception("Automatic claims renewal failed.")
+            finally:
+                renewal.done = True
+
+    def _get_next_renewal(self):
+        """
+        Waits for the next renewal to be due.
+
+        :returns: The _ScheduledClaimsRenewal instance to run.
+        """
+        with self._condition:
+            while True:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                due_time = self._heap[0][0]
+                if due_time > now:
+                    self._condition.wait(due_time - now)
+                    continue
+
+                _, _, renewal = heapq.heappop(self._heap)
+                delay = now - due_time
+                self._stats["executed"] += 1
+                self._stats["max_delay"] = max(self._stats["max_delay"], delay)
+                if delay > CLAIMS_RENEWAL_DEADLINE_TOLERANCE:
+                    self._stats["missed_deadlines"] += 1
+                    logger.warning(
+                        "Claims renewal for %s ran %.1f seconds late.",
+                        renewal.user,
+                        delay,
+                    )
+                return renewal
+
+
+_claims_renewal_scheduler = _ClaimsRenewalScheduler()
+
 
 class ShotgunUser(object):
     """
@@ -88,12 +262,20 @@ class ShotgunUser(object):
         """
         return self._impl.resolve_entity()
 
-    def create_sg_connection(self):
+    def create_sg_connection(self, pooled=False):
         """
         Creates a Shotgun connection using the credentials for this user.
 
+        :param bool pooled: If ``True``, the connection is taken from a pool of
+            connections and reuses the HTTP connection to the site across calls.
+            Pooled connections are confined to the calling thread: the same
+            thread will get the same connection back on subsequent calls, and
+            the connection must not be handed to other threads.
+
         :returns: A Shotgun connection.
         """
+        if pooled:
+            return self._impl.create_sg_connection(pooled=True)
         return self._impl.create_sg_connection()
 
     def are_credentials_expired(self):
@@ -104,6 +286,15 @@ class ShotgunUser(object):
         """
         return self._impl.are_credentials_expired()
 
+    async def aare_credentials_expired(self):
+        """
+        Awaitable counterpart of :meth:`are_credentials_expired`, which doesn't
+        block the event loop.
+
+        :returns: True if the credentials are expired, False otherwise.
+        """
+        return await self._impl.aare_credentials_expired()
+
     def refresh_credentials(self):
         """
         Refreshes the credentials of this user so that they don't expire.
@@ -183,15 +374,15 @@ class ShotgunSamlUser(ShotgunWebUser):
         :param impl: Internal user implementation class this class proxies.
         """
         super().__init__(impl)
-        self._timer = None
+        self._scheduled_renewal = None
         self._claims_renewal_cancelled = False
 
         # Calling stop_claims_renewal only guarantees that the claims renewal will stop at some point,
         # not that it will stop right away unfortunately. What this means is that it is possible,
         # however unlikely, that someone can stop and restart the claims renewal fast enough to
-        # confuse the _timer and _claims_renewal_cancelled flag.
+        # confuse the _scheduled_renewal and _claims_renewal_cancelled flag.
         #
-        # This lock will ensure the thread-safety of restarting the timer. Since the timer's
+        # This lock will ensure the thread-safety of rescheduling the renewal. Since the scheduler
         # thread is impacted by the update to the _claims_renewal_cancelled flag, any update
         # to these two will be done under a lock.
         #
@@ -241,9 +432,9 @@ class ShotgunSamlUser(ShotgunWebUser):
                     #
                     # 1. This IF is evaluated by thread B, so the next instruction will be "return"
                     # 2. From thread A, "start_claims_renewal" is called.
-                    # 3. Thread A sets the flag to False and checks if the timer is active. It is,
+                    # 3. Thread A sets the flag to False and checks if the renewal is active. It is,
                     #    because _do_automatic_claims_renewal is still executing, so the method
-                    #    thinks it doesn't have to restart the timer and returns.
+                    #    thinks it doesn't have to reschedule the renewal and returns.
                     # 4. Thread B now resumes and returns.
                     # 5. At some point in the future, claim renewal won't happen and the session
                     #    is going to go out of date.
@@ -253,12 +444,9 @@ class ShotgunSamlUser(ShotgunWebUser):
                     # an atomic fashion, so there are no more race conditions.
                     if self._claims_renewal_cancelled:
                         return
-                    self._timer = threading.Timer(
-                        delta,
-                        self._do_automatic_claims_renewal,
-                        [preemtive_renewal_threshold],
+                    self._scheduled_renewal = _claims_renewal_scheduler.schedule(
+                        self, delta, preemtive_renewal_threshold
                     )
-                    self._timer.start()
             else:
                 logger.warning(
                     "No further attempts to auto-renew in the background will be attempted."
@@ -276,11 +464,11 @@ class ShotgunSamlUser(ShotgunWebUser):
             a value of 0.9, which is also the default value, will indicate that the renewal should
             happen after 4 minutes and 30 seconds.
         """
-        # Ensure thread-safe access of _claims_renewal_cancelled and _timer. See __init__
+        # Ensure thread-safe access of _claims_renewal_cancelled and _scheduled_renewal. See __init__
         # for details.
         with self._timer_lock:
             self._claims_renewal_cancelled = False
-            if self._timer is None or not self.is_claims_renewal_active():
+            if not self.is_claims_renewal_active():
 
                 self._do_automatic_claims_renewal(preemtive_renewal_threshold)
             else:
@@ -292,12 +480,12 @@ class ShotgunSamlUser(ShotgunWebUser):
         """
         Stops claims renewal mechanism.
         """
-        # Ensure thread-safe access of _claims_renewal_cancelled and _timer. See __init__
+        # Ensure thread-safe access of _claims_renewal_cancelled and _scheduled_renewal. See __init__
         # for details.
         with self._timer_lock:
             self._claims_renewal_cancelled = True
-            if self._timer:
-                self._timer.cancel()
+            if self._scheduled_renewal:
+                _claims_renewal_scheduler.cancel(self._scheduled_renewal)
             else:
                 logger.debug(
                     "Attempting to stop claims renewal when it was not active."
@@ -309,12 +497,26 @@ class ShotgunSamlUser(ShotgunWebUser):
 
         :returns: A bool value on the current active state of the renewal loop.
         """
-        if self._timer:
-            return self._timer.is_alive()
+        if self._scheduled_renewal:
+            return self._scheduled_renewal.is_active()
         else:
             return False
 
 
+def get_claims_renewal_stats():
+    """
+    Retrieves statistics about the automatic claims renewal of all
+    :class:`ShotgunSamlUser` instances.
+
+    :returns: Dictionary with the number of renewals ``scheduled``, ``cancelled``,
+        ``executed`` and ``pending``, the number of ``missed_deadlines``, i.e.
+        renewals that ran more than :data:`CLAIMS_RENEWAL_DEADLINE_TOLERANCE`
+        seconds past their due time, and the ``max_delay`` in seconds a renewal
+        ran past its due time.
+    """
+    return _claims_renewal_scheduler.get_stats()
+
+
 def serialize_user(user, use_json=False):
     """
     Serializes a user. Meant to be consumed by deserialize.
@@ -328,16 +530,22 @@ def serialize_user(user, use_json=False):
     return user_impl.serialize_user(user.impl, use_json=use_json)
 
 
-def deserialize_user(payload):
+def deserialize_user(payload, cache=True):
     """
     Converts a payload produced by serialize into any of the ShotgunUser
     derived instance.
 
     :param payload: Pickled dictionary of values
+    :param cache: Set to False to build the user purely in memory. The session
+        cache is then neither read nor written during deserialization, which
+        avoids any file system access when a user is handed over to a large
+        number of processes. The credentials will be written to the session
+        cache only if the session token changes afterwards, for example when
+        the session gets renewed. Defaults to True.
 
     :returns: A ShotgunUser derived instance.
     """
-    impl = user_impl.deserialize_user(payload)
+    impl = user_impl.deserialize_user(payload, cache=cache)
 
     # We use the presence of session_metadata as an indicator that we are using SSO.
     if (
@@ -19,23 +19,108 @@ at any point.
 --------------------------------------------------------------------------------
 """
 import json
-import http.client
+import os
+import threading
+import time
 
-from .shotgun_wrapper import ShotgunWrapper
-from shotgun_api3 import Shotgun, AuthenticationFault
-
-from xmlrpc.client import ProtocolError
-
-from . import session_cache
+# shotgun_api3, the ShotgunWrapper and asyncio are imported when first needed,
+# so importing this module stays cheap for processes that never connect.
+from . import connection_pool, session_cache
 from .errors import IncompleteCredentials, UnresolvableHumanUser, UnresolvableScriptUser
 from .. import LogManager
 from ..util import pickle
 
-# Indirection to create ShotgunWrapper instances. Great for unit testing.
-_shotgun_instance_factory = ShotgunWrapper
+
+def _shotgun_instance_factory(*args, **kwargs):
+    """
+    Indirection to create ShotgunWrapper instances. Great for unit testing.
+
+    :returns: A ShotgunWrapper instance.
+    """
+    from .shotgun_wrapper import ShotgunWrapper
+
+    return ShotgunWrapper(*args, **kwargs)
+
 
 logger = LogManager.get_logger(__name__)
 
+# Number of seconds during which the result of are_credentials_expired is
+# reused for a given session token. Can be overridden through the
+# SGTK_CREDENTIALS_CHECK_CACHE_TIMEOUT environment variable. A value of 0
+# disables the cache.
+CREDENTIALS_CHECK_CACHE_TIMEOUT = 30
+
+# Results of are_credentials_expired, keyed by (host, login, session token).
+# Values are (expired, timestamp) tuples.
+_credentials_checks = {}
+_credentials_checks_lock = threading.Lock()
+
+
+def _get_credentials_check_cache_timeout():
+    """
+    Retrieves for how long the result of a credentials check can be reused.
+
+    :returns: Number of seconds.
+    """
+    timeout = os.environ.get("SGTK_CREDENTIALS_CHECK_CACHE_TIMEOUT")
+    if timeout is None:
+        return CREDENTIALS_CHECK_CACHE_TIMEOUT
+    try:
+        return float(timeout)
+    except ValueError:
+        logger.warning(
+            "Invalid value for SGTK_CREDENTIALS_CHECK_CACHE_TIMEOUT: %s", timeout
+        )
+        return CREDENTIALS_CHECK_CACHE_TIMEOUT
+
+
+def _get_cached_credentials_check(key):
+    """
+    Retrieves the result of a previous credentials check.
+
+    :param tuple key: (host, login, session token) tuple.
+
+    :returns: True or False if the check result is known, None otherwise.
+    """
+    timeout = _get_credentials_check_cache_timeout()
+    if timeout <= 0:
+        return None
+    with _credentials_checks_lock:
+        entry = _credentials_checks.get(key)
+    if entry is None or time.monotonic() - entry[1] > timeout:
+        return None
+    return entry[0]
+
+
+def _cache_credentials_check(key, expired):
+    """
+    Records the result of a credentials check.
+
+    :param tuple key: (host, login, session token) tuple.
+    :param bool expired: Result of the check.
+    """
+    timeout = _get_credentials_check_cache_timeout()
+    if timeout <= 0:
+        return
+    now = time.monotonic()
+    with _credentials_checks_lock:
+        # Forget about results that can't be used anymore so tokens don't
+        # accumulate in memory.
+        for other_key, (_, timestamp) in list(_credentials_checks.items()):
+            if now - timestamp > timeout:
+                del _credentials_checks[other_key]
+        _credentials_checks[key] = (expired, now)
+
+
+def _invalidate_credentials_check(key):
+    """
+    Forgets about the result of a credentials check.
+
+    :param tuple key: (host, login, session token) tuple.
+    """
+    with _credentials_checks_lock:
+        _credentials_checks.pop(key, None)
+
 
 class ShotgunUserImpl(object):
     """
@@ -79,10 +164,14 @@ class ShotgunUserImpl(object):
         """
         return self._http_proxy
 
-    def create_sg_connection(self):
+    def create_sg_connection(self, pooled=False):
         """
         Creates a Shotgun connection using the credentials for this user.
 
+        :param bool pooled: If ``True``, a connection from the connection pool
+            is returned. Pooled connections are reused by subsequent calls from
+            the same thread and must not be shared with other threads.
+
         :raises NotImplementedError: If not overridden in the derived class,
                                      this method will raise a
                                      NotImplementedError.
@@ -97,6 +186,19 @@ class ShotgunUserImpl(object):
         """
         self.__class__._not_implemented("are_credentials_expired")
 
+    async def aare_credentials_expired(self):
+        """
+        Awaitable counterpart of :meth:`are_credentials_expired`, which is run
+        in the default executor of the running event loop.
+
+        :returns: True if the credentials are expired, False otherwise.
+        """
+        import asyncio
+
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.are_credentials_expired
+        )
+
     def get_login(self):
         """
         Returns the login name for this user.
@@ -126,11 +228,13 @@ class ShotgunUserImpl(object):
         return {"http_proxy": self._http_proxy, "host": self._host}
 
     @classmethod
-    def from_dict(cls, payload):
+    def from_dict(cls, payload, cache=True):
         """
         Creates a user from a dictionary.
 
         :param payload: Dictionary with the user information.
+        :param cache: Set to False to build the user without accessing the
+            session cache. Defaults to True.
 
         :returns: A ShotgunUser derived instance.
 
@@ -167,6 +271,7 @@ class SessionUser(ShotgunUserImpl):
         http_proxy,
         password=None,
         session_metadata=None,
+        cache=True,
     ):
         """
         Constructor.
@@ -179,6 +284,9 @@ class SessionUser(ShotgunUserImpl):
         :param password: Password for the user. Defaults to None.
         :param session_metadata: Data structure needed when SSO is used. This is an obscure blob of data. Defaults to
             None.
+        :param cache: Set to False to build the user purely in memory. The session
+            cache is then neither read nor written until the session token is
+            updated. Defaults to True.
 
         :raises IncompleteCredentials: If there is not enough values
             provided to initialize the user, this exception will be thrown.
@@ -196,7 +304,7 @@ class SessionUser(ShotgunUserImpl):
 
         # If we still don't have a session token, look in the session cache
         # to see if this user was already authenticated in the past.
-        if not session_token:
+        if not session_token and cache:
             session_data = session_cache.get_session_data(host, login)
             # If session data was cached, load it.
             if session_data:
@@ -210,7 +318,8 @@ class SessionUser(ShotgunUserImpl):
         self._session_token = session_token
         self._session_metadata = session_metadata
 
-        self._try_save()
+        if cache:
+            self._try_save()
 
     def refresh_credentials(self):
         """
@@ -220,7 +329,7 @@ class SessionUser(ShotgunUserImpl):
         # Make a very simple authenticated request that returns as little information as possible.
         # If the session token was expired, the ShotgunWrapper returned by create_sg_connection
         # will take care of the session renewal.
-        self.create_sg_connection().find_one("HumanUser", [])
+        self.create_sg_connection(pooled=True).find_one("HumanUser", [])
 
     def get_login(self):
         """
@@ -246,7 +355,12 @@ class SessionUser(ShotgunUserImpl):
         :param cache: Set to False if you don't want the token to be written back
             to the session cache. Defaults to True.
         """
-        self._session_token = session_token
+        if session_token != self._session_token:
+            # Whatever we knew about the validity of the previous token is
+            # most likely out of date.
+            _invalidate_credentials_check(self._get_credentials_check_key())
+            self._session_token = session_token
+            _invalidate_credentials_check(self._get_credentials_check_key())
         if cache:
             self._try_save()
 
@@ -266,14 +380,36 @@ class SessionUser(ShotgunUserImpl):
         """
         self._session_metadata = session_metadata
 
-    def create_sg_connection(self):
+    def create_sg_connection(self, pooled=False):
         """
-        Creates a Shotgun instance using the script user's credentials.
+        Creates a Shotgun instance using the session user's credentials.
 
         The Shotgun instance will connect upon its first request.
 
+        :param bool pooled: If ``True``, a connection from the connection pool
+            is returned. Pooled connections are reused by subsequent calls from
+            the same thread and must not be shared with other threads.
+
         :returns: A Shotgun instance.
         """
+        if not pooled:
+            return self._create_sg_connection()
+
+        connection = connection_pool.acquire(
+            (self.get_host(), self.get_http_proxy(), self.get_login()),
+            self._create_sg_connection,
+        )
+        # The connection may have been created for another instance of this
+        # user. Make sure it follows the session token of this one.
+        connection._user = self
+        return connection
+
+    def _create_sg_connection(self):
+        """
+        Creates a new Shotgun instance using the session user's credentials.
+
+        :returns: A ShotgunWrapper instance.
+        """
         return _shotgun_instance_factory(
             self.get_host(),
             session_token=self.get_session_token(),
@@ -291,7 +427,7 @@ class SessionUser(ShotgunUserImpl):
         """
         # We cache the entity to avoid fetching it multiple times.
         if self._cached_entity is None:
-            self._cached_entity = self.create_sg_connection().find_one(
+            self._cached_entity = self.create_sg_connection(pooled=True).find_one(
                 "HumanUser", [["login", "is", self._login]]
             )
             if self._cached_entity is None:
@@ -306,26 +442,84 @@ class SessionUser(ShotgunUserImpl):
         This check is done solely on the Shotgun side. If SSO is being used,
         we do not attempt to contact the IdP to validate the session.
 
+        The result is reused for the same session token for
+        :data:`CREDENTIALS_CHECK_CACHE_TIMEOUT` seconds.
+
         :returns: True if the credentials are expired, False otherwise.
         """
+        key = self._get_credentials_check_key()
+        expired = _get_cached_credentials_check(key)
+        if expired is not None:
+            logger.debug("Using cached result of the credentials check.")
+            return expired
+
+        expired = self._check_credentials_expired()
+        # Do not cache the result if we got None, which means that we couldn't
+        # tell whether the credentials were expired or not.
+        if expired is None:
+            return True
+        _cache_credentials_check(key, expired)
+        return expired
+
+    async def aare_credentials_expired(self):
+        """
+        Awaitable counterpart of :meth:`are_credentials_expired`.
+
+        A cached result is returned right away. Otherwise, the site is
+        contacted from the default executor of the running event loop, so
+        multiple users can be checked concurrently.
+
+        :returns: True if the credentials are expired, False otherwise.
+        """
+        expired = _get_cached_credentials_check(self._get_credentials_check_key())
+        if expired is not None:
+            return expired
+        import asyncio
+
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.are_credentials_expired
+        )
+
+    def _check_credentials_expired(self):
+        """
+        Contacts the site to check if the credentials for the user are expired.
+
+        A pooled, unwrapped connection is used so no connection setup is paid
+        on subsequent checks and an authentication failure doesn't trigger a
+        session renewal.
+
+        :returns: True if the credentials are expired, False if they are not,
+            and None if this couldn't be determined.
+        """
+        import http.client
+        from xmlrpc.client import ProtocolError
+
+        from shotgun_api3 import Shotgun, AuthenticationFault
+
         logger.debug("Connecting to PTR to determine if credentials have expired...")
-        try:
-            sg = Shotgun(
+        sg = connection_pool.acquire(
+            (self.get_host(), self.get_http_proxy(), self.get_login(), "check"),
+            lambda: Shotgun(
                 self.get_host(),
                 session_token=self.get_session_token(),
                 http_proxy=self.get_http_proxy(),
-            )
+                connect=False,
+            ),
+        )
+        sg.config.session_token = self.get_session_token()
+
+        try:
+            # Cheapest authenticated request we can make: it matches no rows
+            # and only returns the id field.
+            sg.find_one("HumanUser", [["id", "is", 0]])
+            return False
         except ConnectionRefusedError:
             logger.warning(
                 "Unable to contact {host}".format(
                     host=self.get_host(),
                 )
             )
-            return True
-
-        try:
-            sg.find_one("HumanUser", [])
-            return False
+            return None
         except ProtocolError as e:
             # One potential source of the error is that our SAML claims have
             # expired. We check if we were given a 302 and the
@@ -346,11 +540,17 @@ class SessionUser(ShotgunUserImpl):
                 logger.error(
                     "Unexpected exception while validating credentials: %s" % e
                 )
-            return True
+            return None
         except AuthenticationFault:
             return True
-        finally:
-            sg.close()
+
+    def _get_credentials_check_key(self):
+        """
+        Builds the key under which the result of credentials checks are cached.
+
+        :returns: A (host, login, session token) tuple.
+        """
+        return (self._host, self._login, self._session_token)
 
     def __repr__(self):
         """
@@ -369,11 +569,13 @@ class SessionUser(ShotgunUserImpl):
         return str(self._login)
 
     @staticmethod
-    def from_dict(payload):
+    def from_dict(payload, cache=True):
         """
         Creates a user from a dictionary.
 
         :param payload: Dictionary with the user information.
+        :param cache: Set to False to build the user without accessing the
+            session cache. Defaults to True.
 
         :returns: A SessionUser instance.
         """
@@ -383,6 +585,7 @@ class SessionUser(ShotgunUserImpl):
             session_token=payload.get("session_token"),
             http_proxy=payload.get("http_proxy"),
             session_metadata=payload.get("session_metadata"),
+            cache=cache,
         )
 
     def to_dict(self):
@@ -441,14 +644,33 @@ class ScriptUser(ShotgunUserImpl):
         self._api_script = api_script
         self._api_key = api_key
 
-    def create_sg_connection(self):
+    def create_sg_connection(self, pooled=False):
         """
         Creates a Shotgun instance using the script user's credentials.
 
         The Shotgun instance will connect upon its first request.
 
+        :param bool pooled: If ``True``, a connection from the connection pool
+            is returned. Pooled connections are reused by subsequent calls from
+            the same thread and must not be shared with other threads.
+
+        :returns: A Shotgun instance.
+        """
+        if pooled:
+            return connection_pool.acquire(
+                (self._host, self._http_proxy, self._api_script, self._api_key),
+                self._create_sg_connection,
+            )
+        return self._create_sg_connection()
+
+    def _create_sg_connection(self):
+        """
+        Creates a new Shotgun instance using the script user's credentials.
+
         :returns: A Shotgun instance.
         """
+        from shotgun_api3 import Shotgun
+
         # No need to instantiate the ShotgunWrapper because we're not using
         # session-based authentication.
         return Shotgun(
@@ -468,7 +690,7 @@ class ScriptUser(ShotgunUserImpl):
         """
         # We cache the entity to avoid fetching it multiple times.
         if self._cached_entity is None:
-            self._cached_entity = self.create_sg_connection().find_one(
+            self._cached_entity = self.create_sg_connection(pooled=True).find_one(
                 "ApiUser", [["firstname", "is", self._api_script]]
             )
             if self._cached_entity is None:
@@ -489,6 +711,15 @@ class ScriptUser(ShotgunUserImpl):
         """
         return False
 
+    async def aare_credentials_expired(self):
+        """
+        Script user credentials can never be expired, so this method always
+        returns False.
+
+        :returns: False
+        """
+        return False
+
     def get_script(self):
         """
         Returns the script user name.
@@ -551,11 +782,12 @@ class ScriptUser(ShotgunUserImpl):
         return self._api_script
 
     @staticmethod
-    def from_dict(payload):
+    def from_dict(payload, cache=True):
         """
         Creates a user from a dictionary.
 
         :param payload: Dictionary with the user information.
+        :param cache: Unused, script users are never cached.
 
         :returns: A ScriptUser instance.
         """
@@ -593,12 +825,15 @@ def serialize_user(user, use_json=False):
         return pickle.dumps(user_data)
 
 
-def deserialize_user(payload):
+def deserialize_user(payload, cache=True):
     """
     Converts a payload produced by serialize into any of the ShotgunUser
     derived instance.
 
     :params payload: Pickled dictionary of values
+    :param cache: Set to False to build the user purely in memory, without
+        reading or writing the session cache. The credentials will only be
+        written to the session cache once the session token changes.
 
     :returns: A ShotgunUser derived instance.
     """
@@ -618,4 +853,4 @@ def deserialize_user(payload):
             "Could not deserialize PTR user. Invalid user type: %s" % user_dict
         )
     # Instantiate the user object.
-    return factory(user_dict["data"])
+    return factory(user_dict["data"], cache=cache)
@@ -14,9 +14,18 @@ ROOT_LOGGER_NAME = "sgtk"
 # log channel to used for function timings
 PROFILING_LOG_CHANNEL = "sgtk.stopwatch"
 
+# environment variable that if set to a value other than 0, false, no or off,
+# collects statistics about function timings and reports them when the process
+# exits
+PROFILING_ENV_VAR = "TK_PROFILING"
+
 # environment variable that if set, enables debug logging in the engine
 DEBUG_LOGGING_ENV_VAR = "TK_DEBUG"
 
+# environment variable that if set, writes the base log file from a background
+# thread. The value can be "drop_oldest" or "block" to pick the overflow policy.
+ASYNC_LOGGING_ENV_VAR = "TK_ASYNC_LOGGING"
+
 # URL for contacting support
 SUPPORT_URL = "https://knowledge.autodesk.com/support"
 
@@ -180,6 +180,13 @@ automatically enabled and end users do not need to worry about this.
 If you want debug logging to be written to these files, enable the
 global debug flag.
 
+File writes normally happen on the thread emitting the log message. When
+debug logging is enabled and the log folder lives on a slow drive, this can
+stall the application. Setting the ``TK_ASYNC_LOGGING`` environment variable
+or calling :meth:`LogManager.configure_async_file_logging` queues the log
+messages in memory instead, where a background thread writes them to disk in
+batches.
+
     .. note:: If you are writing a toolkit plugin, we recommend
               that you initialize logging early on in your code by
               calling :meth:`LogManager.initialize_base_file_handler`.
@@ -221,16 +228,161 @@ For more information, see https://docs.python.org/2/library/logging.handlers.htm
 """
 
 
+import atexit
+import collections
+import copy
 import logging
 from logging.handlers import RotatingFileHandler
 import os
+import threading
 import time
 import weakref
-import uuid
 from functools import wraps
 from . import constants
 
 
+class _TimingStats(object):
+    """
+    Aggregates the execution times of the methods decorated with
+    :meth:`LogManager.log_timing`.
+
+    For each method, the number of calls, the total and the maximum time
+    spent are tracked over the lifetime of the process, while percentiles
+    are computed over the most recent calls.
+    """
+
+    # Number of recent timings kept per method to compute the percentiles.
+    SAMPLE_SIZE = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Maps the method name to a [count, total ns, max ns, recent ns] list.
+        self._stats = {}
+        self._dump_at_exit_registered = False
+        self.enabled = False
+
+    def record(self, name, duration):
+        """
+        Records the execution time of a method.
+
+        :param str name: Qualified name of the method.
+        :param int duration: Execution time in nanoseconds.
+        """
+        with self._lock:
+            entry = self._stats.get(name)
+            if entry is None:
+                entry = [0, 0, 0, collections.deque(maxlen=self.SAMPLE_SIZE)]
+                self._stats[name] = entry
+            entry[0] += 1
+            entry[1] += duration
+            if duration > entry[2]:
+                entry[2] = duration
+            entry[3].append(duration)
+
+    def get(self):
+        """
+        Retrieves the aggregated timings.
+
+        :returns: Dictionary mapping the method names to dictionaries with the
+            ``count``, ``total``, ``p50``, ``p95``, ``p99`` and ``max`` keys.
+            Times are in seconds.
+        """
+        with self._lock:
+            entries = [
+                (name, count, total, maximum, sorted(recent))
+                for name, (count, total, maximum, recent) in self._stats.items()
+            ]
+
+        stats = {}
+        for name, count, total, maximum, recent in entries:
+            stats[name] = {
+                "count": count,
+                "total": total / 1e9,
+                "p50": self._percentile(recent, 50) / 1e9,
+                "p95": self._percentile(recent, 95) / 1e9,
+                "p99": self._percentile(recent, 99) / 1e9,
+                "max": maximum / 1e9,
+            }
+        return stats
+
+    def reset(self):
+        """
+        Discards the timings collected so far.
+        """
+        with self._lock:
+            self._stats.clear()
+
+    def format_report(self):
+        """
+        Formats the aggregated timings as a table, sorted by total time spent.
+
+        :returns: The report as a string.
+        """
+        stats = self.get()
+        lines = [
+            "%-60s %8s %12s %10s %10s %10s %10s"
+            % (
+                "method",
+                "count",
+                "total (s)",
+                "p50 (s)",
+                "p95 (s)",
+                "p99 (s)",
+                "max (s)",
+            )
+        ]
+        for name, entry in sorted(
+            stats.items(), key=lambda item: item[1]["total"], reverse=True
+        ):
+            lines.append(
+                "%-60s %8d %12.6f %10.6f %10.6f %10.6f %10.6f"
+                % (
+                    name,
+                    entry["count"],
+                    entry["total"],
+                    entry["p50"],
+                    entry["p95"],
+                    entry["p99"],
+                    entry["max"],
+                )
+            )
+        return "\n".join(lines)
+
+    def register_dump_at_exit(self):
+        """
+        Logs the report when the process exits.
+        """
+        with self._lock:
+            if self._dump_at_exit_registered:
+                return
+            self._dump_at_exit_registered = True
+        # Registered after the logging module's own exit handler, so this runs
+        # while the log handlers are still open.
+        atexit.register(self._dump_at_exit)
+
+    def _dump_at_exit(self):
+        """
+        Logs the report if any timing was collected.
+        """
+        if self.enabled and self._stats:
+            LogManager().dump_timing_stats()
+
+    @staticmethod
+    def _percentile(samples, percent):
+        """
+        Computes a percentile with the nearest-rank method.
+
+        :param list samples: Sorted samples.
+        :param int percent: Percentile to compute, between 0 and 100.
+
+        :returns: The percentile, or 0 if there are no samples.
+        """
+        if not samples:
+            return 0
+        rank = max(1, -(-percent * len(samples) // 100))
+        return samples[rank - 1]
+
+
 class LogManager(object):
     """
     Main interface for logging in Toolkit.
@@ -246,6 +398,16 @@ class LogManager(object):
     # keeps track of the single instance of the class
     __instance = None
 
+    # Overflow policies of the asynchronous file logging. When the queue of
+    # log messages is full, either drop the oldest message or wait for the
+    # queue to drain.
+    OVERFLOW_DROP_OLDEST = "drop_oldest"
+    OVERFLOW_BLOCK = "block"
+
+    # Default maximum number of log messages waiting to be written to disk
+    # when asynchronous file logging is enabled.
+    ASYNC_QUEUE_SIZE = 10000
+
     class _SafeRotatingFileHandler(RotatingFileHandler):
         """
         Provides all the functionality provided by Python's built-in RotatingFileHandler, but with a
@@ -280,6 +442,9 @@ class LogManager(object):
             deactivated for this handler and logs will be appended to the current log file indefinitely.
             """
 
+            # uuid is slow to import and rollovers are rare.
+            import uuid
+
             temp_backup_name = "%s.%s" % (self.baseFilename, uuid.uuid4())
 
             # We need to close the file before renaming it (windows!)
@@ -381,6 +546,265 @@ class LogManager(object):
                 self, record
             )
 
+        def emit_batch(self, records):
+            """
+            Writes several records to the log file at once.
+
+            The rollover check and the flush happen once for the whole batch
+            instead of once per record.
+
+            :param list records: List of :class:`logging.LogRecord` to write.
+            """
+            if not records:
+                return
+            self.acquire()
+            try:
+                data = "".join(
+                    "%s%s" % (self.format(record), self.terminator)
+                    for record in records
+                )
+                if self._should_rollover_for(len(data)):
+                    self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write(data)
+                self.flush()
+            except Exception:
+                self.handleError(records[0])
+            finally:
+                self.release()
+
+        def _should_rollover_for(self, size):
+            """
+            Return if the log files should rollover before writing the given
+            amount of data.
+
+            :param int size: Number of characters about to be written.
+
+            :returns: True if rollover should happen, False otherwise.
+            :rtype: bool
+            """
+            if self._disable_rollover or self.maxBytes <= 0:
+                return False
+            # Never rollover anything other than regular files.
+            if os.path.exists(self.baseFilename) and not os.path.isfile(
+                self.baseFilename
+            ):
+                return False
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.seek(0, 2)
+            return self.stream.tell() + size >= self.maxBytes
+
+    class _QueuedFileHandler(logging.Handler):
+        """
+        Hands the records over to a file handler written to by a single
+        background thread, so the threads emitting records never wait on the
+        disk.
+
+        Records are kept in a bounded in-memory queue. When the queue is full,
+        the overflow policy decides if the oldest record is dropped to make
+        room for the new one or if the emitting thread waits for the writer
+        to catch up. The writer thread takes records from the queue in batches
+        and writes each batch with a single flush.
+        """
+
+        # Maximum number of records written at once by the writer thread.
+        MAX_BATCH_SIZE = 256
+
+        def __init__(self, target, queue_size, overflow_policy):
+            """
+            :param target: :class:`_SafeRotatingFileHandler` the records are
+                written to.
+            :param int queue_size: Maximum number of records waiting to be written.
+            :param str overflow_policy: Either ``LogManager.OVERFLOW_DROP_OLDEST``
+                or ``LogManager.OVERFLOW_BLOCK``.
+            """
+            logging.Handler.__init__(self)
+            self._target = target
+            self._queue_size = max(1, queue_size)
+            self._block = overflow_policy == LogManager.OVERFLOW_BLOCK
+            self._queue = collections.deque()
+            self._condition = threading.Condition()
+            self._dropped = 0
+            self._writing = False
+            self._closed = False
+            self._writer = None
+            self._writer_pid = None
+
+        @property
+        def target(self):
+            """
+            The file handler the records are written to.
+            """
+            return self._target
+
+        @property
+        def baseFilename(self):
+            """
+            Path to the log file.
+            """
+            return self._target.baseFilename
+
+        def setFormatter(self, fmt):
+            """
+            Sets the formatter of the file handler.
+
+            :param fmt: :class:`logging.Formatter` instance.
+            """
+            logging.Handler.setFormatter(self, fmt)
+            self._target.setFormatter(fmt)
+
+        def emit(self, record):
+            """
+            Queues a record to be written by the writer thread.
+
+            :param record: :class:`logging.LogRecord` to write.
+            """
+            try:
+                record = self._prepare(record)
+            except Exception:
+                self.handleError(record)
+                return
+
+            with self._condition:
+                if self._closed:
+                    return
+                self._ensure_writer()
+                while len(self._queue) >= self._queue_size:
+                    # The writer thread itself must never wait on the queue,
+                    # since it is the only one emptying it.
+                    if not self._block or threading.current_thread() is self._writer:
+                        self._queue.popleft()
+                        self._dropped += 1
+                        break
+                    self._condition.wait()
+                    if self._closed:
+                        return
+                self._queue.append(record)
+                self._condition.notify_all()
+
+        def flush(self):
+            """
+            Waits for the queued records to be written to disk.
+            """
+            with self._condition:
+                if threading.current_thread() is self._writer:
+                    return
+                while (self._queue or self._writing) and self._is_writer_alive():
+                    self._condition.wait()
+
+        def close(self):
+            """
+            Writes the queued records to disk, stops the writer thread and
+            closes the file handler.
+            """
+            with self._condition:
+                self._closed = True
+                writer = self._writer
+                self._condition.notify_all()
+
+            if writer is not None and writer is not threading.current_thread():
+                writer.join()
+
+            self._target.close()
+            logging.Handler.close(self)
+
+        def _prepare(self, record):
+            """
+            Makes a copy of the record that can be formatted from another
+            thread. The message arguments and the exception are rendered right
+            away since they might change or go away once this method returns.
+
+            :param record: :class:`logging.LogRecord` to prepare.
+
+            :returns: The prepared :class:`logging.LogRecord`.
+            """
+            record = copy.copy(record)
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                if not record.exc_text:
+                    formatter = self._target.formatter or logging.Formatter()
+                    record.exc_text = formatter.formatException(record.exc_info)
+                record.exc_info = None
+            return record
+
+        def _is_writer_alive(self):
+            """
+            :returns: True if the writer thread of this process is running.
+            """
+            return (
+                self._writer is not None
+                and self._writer_pid == os.getpid()
+                and self._writer.is_alive()
+            )
+
+        def _ensure_writer(self):
+            """
+            Starts the writer thread if it isn't running. This also restarts it
+            in processes forked after it was started.
+
+            This must be called with the condition held.
+            """
+            if self._is_writer_alive():
+                return
+            self._writing = False
+            self._writer_pid = os.getpid()
+            self._writer = threading.Thread(target=self._run, name="LogFileWriter")
+            self._writer.daemon = True
+            self._writer.start()
+
+        def _run(self):
+            """
+            Writes the queued records to disk until the handler is closed.
+            """
+            while True:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+                    while not self._queue and not self._closed:
+                        self._condition.wait()
+                    if not self._queue:
+                        return
+                    batch = [
+                        self._queue.popleft()
+                        for _ in range(min(len(self._queue), self.MAX_BATCH_SIZE))
+                    ]
+                    dropped, self._dropped = self._dropped, 0
+                    self._writing = True
+                    # Let the threads blocked on a full queue resume.
+                    self._condition.notify_all()
+
+                if dropped:
+                    batch.insert(0, self._make_dropped_record(dropped))
+
+                try:
+                    self._target.emit_batch(batch)
+                except Exception:
+                    # Keep the writer alive no matter what, otherwise threads
+                    # would wait on the queue forever.
+                    pass
+
+        def _make_dropped_record(self, dropped):
+            """
+            Creates a record reporting records that were dropped because the
+            queue was full.
+
+            :param int dropped: Number of records that were dropped.
+
+            :returns: A :class:`logging.LogRecord`.
+            """
+            return logging.makeLogRecord(
+                {
+                    "name": log.name,
+                    "levelno": logging.WARNING,
+                    "levelname": logging.getLevelName(logging.WARNING),
+                    "msg": "%d log messages were dropped because the log file "
+                    "couldn't keep up." % dropped,
+                }
+            )
+
     def __new__(cls, *args, **kwargs):
         #
         # note - this init isn't currently threadsafe.
@@ -399,6 +823,18 @@ class LogManager(object):
             # that were created via the log manager.
             instance._handlers = []
 
+            # asynchronous file logging settings, None when disabled.
+            # check the TK_ASYNC_LOGGING flag at startup.
+            instance._async_file_logging = None
+            async_logging = os.environ.get(constants.ASYNC_LOGGING_ENV_VAR)
+            if async_logging:
+                if async_logging not in (
+                    cls.OVERFLOW_DROP_OLDEST,
+                    cls.OVERFLOW_BLOCK,
+                ):
+                    async_logging = cls.OVERFLOW_DROP_OLDEST
+                instance._async_file_logging = (cls.ASYNC_QUEUE_SIZE, async_logging)
+
             # the root logger, created at code init
             instance._root_logger = logging.getLogger(constants.ROOT_LOGGER_NAME)
 
@@ -498,24 +934,91 @@ class LogManager(object):
 
             [DEBUG sgtk.stopwatch.module] my_shotgun_publish_method: 0.633s
 
+        When :attr:`collect_timing_stats` is enabled, timings are also
+        aggregated per method so they can be reported with
+        :meth:`dump_timing_stats`.
         """
+        name = "%s.%s" % (func.__module__, func.__qualname__)
+        # resolved on first call, so that decorating doesn't create loggers
+        timing_logger = None
 
         @wraps(func)
         def wrapper(*args, **kwargs):
-            time_before = time.time()
+            nonlocal timing_logger
+            time_before = time.perf_counter_ns()
             try:
                 response = func(*args, **kwargs)
             finally:
-                time_spent = time.time() - time_before
+                time_spent = time.perf_counter_ns() - time_before
+                if _timing_stats.enabled:
+                    _timing_stats.record(name, time_spent)
                 # log to special timing logger
-                timing_logger = logging.getLogger(
-                    "%s.%s" % (constants.PROFILING_LOG_CHANNEL, func.__module__)
-                )
-                timing_logger.debug("%s: %fs" % (func.__name__, time_spent))
+                if timing_logger is None:
+                    timing_logger = logging.getLogger(
+                        "%s.%s" % (constants.PROFILING_LOG_CHANNEL, func.__module__)
+                    )
+                timing_logger.debug("%s: %fs", func.__name__, time_spent / 1e9)
             return response
 
         return wrapper
 
+    def _get_collect_timing_stats(self):
+        """
+        Controls whether the timings of the methods decorated with
+        :meth:`log_timing` are aggregated in memory. When enabled, the
+        aggregated timings are also logged when the process exits.
+
+        .. note:: Timing statistics are off by default.
+                  If you want to enable them at startup,
+                  set the environment variable ``TK_PROFILING`` to ``1``.
+                  Empty values and ``0``, ``false``, ``no`` and ``off``
+                  leave them disabled.
+        """
+        return _timing_stats.enabled
+
+    def _set_collect_timing_stats(self, state):
+        """
+        Sets whether timings are aggregated.
+        """
+        _timing_stats.enabled = bool(state)
+        if state:
+            _timing_stats.register_dump_at_exit()
+
+    collect_timing_stats = property(
+        _get_collect_timing_stats, _set_collect_timing_stats
+    )
+
+    def get_timing_stats(self):
+        """
+        Retrieves the timings aggregated since :attr:`collect_timing_stats`
+        was enabled.
+
+        Percentiles are computed over the most recent calls of each method.
+
+        :returns: Dictionary mapping the qualified names of the methods to
+            dictionaries with the ``count``, ``total``, ``p50``, ``p95``,
+            ``p99`` and ``max`` keys. Times are in seconds.
+        """
+        return _timing_stats.get()
+
+    def dump_timing_stats(self, reset=False):
+        """
+        Logs a report of the aggregated timings to the ``sgtk.stopwatch``
+        logger at the info level.
+
+        :param bool reset: If True, the timings collected so far are discarded
+            after being reported.
+
+        :returns: The report as a string.
+        """
+        report = _timing_stats.format_report()
+        logging.getLogger(constants.PROFILING_LOG_CHANNEL).info(
+            "Timing statistics:\n%s", report
+        )
+        if reset:
+            _timing_stats.reset()
+        return report
+
     def _set_global_debug(self, state):
         """
         Sets the state of the global debug in toolkit.
@@ -633,6 +1136,67 @@ class LogManager(object):
         """
         return self._std_file_handler
 
+    @property
+    def async_file_logging(self):
+        """
+        True if the base file handler writes to disk from a background thread.
+
+        See :meth:`configure_async_file_logging`.
+        """
+        return self._async_file_logging is not None
+
+    def configure_async_file_logging(
+        self, enabled=True, queue_size=None, overflow_policy=None
+    ):
+        """
+        Controls whether the base file handler writes to disk from a background
+        thread.
+
+        When enabled, log messages are queued in memory and written to disk in
+        batches by a single thread, so slow drives don't stall the threads
+        that are logging. Queued messages are written to disk when the base
+        file handler is torn down or when the process exits.
+
+        If a base file handler is already active, it is recreated with the new
+        settings.
+
+        .. note:: Asynchronous file logging can also be enabled by setting the
+                  ``TK_ASYNC_LOGGING`` environment variable to either
+                  ``drop_oldest`` or ``block``.
+
+        :param bool enabled: True to write to disk from a background thread,
+            False to write from the thread emitting the log messages.
+        :param int queue_size: Maximum number of log messages waiting to be
+            written to disk. Defaults to :attr:`ASYNC_QUEUE_SIZE`.
+        :param str overflow_policy: What happens when a message is logged while
+            the queue is full. :attr:`OVERFLOW_DROP_OLDEST` drops the oldest
+            message in the queue and :attr:`OVERFLOW_BLOCK` waits until there
+            is room in the queue. Defaults to :attr:`OVERFLOW_DROP_OLDEST`.
+
+        :raises ValueError: If the overflow policy is unknown.
+        """
+        overflow_policy = overflow_policy or self.OVERFLOW_DROP_OLDEST
+        if overflow_policy not in (self.OVERFLOW_DROP_OLDEST, self.OVERFLOW_BLOCK):
+            raise ValueError("Unknown overflow policy '%s'" % overflow_policy)
+
+        previous_settings = self._async_file_logging
+        if enabled:
+            self._async_file_logging = (
+                queue_size or self.ASYNC_QUEUE_SIZE,
+                overflow_policy,
+            )
+        else:
+            self._async_file_logging = None
+
+        # Recreate the base file handler, if any, so the settings take effect.
+        if (
+            self._std_file_handler is not None
+            and self._async_file_logging != previous_settings
+        ):
+            self.initialize_base_file_handler_from_path(
+                self._std_file_handler_log_file
+            )
+
     def initialize_custom_handler(self, handler=None):
         """
         Convenience method that initializes a log handler
@@ -706,6 +1270,9 @@ class LogManager(object):
             % (base_log_file, self._std_file_handler)
         )
         self._root_logger.removeHandler(self._std_file_handler)
+        # write out the queued log messages and stop the writer thread
+        if isinstance(self._std_file_handler, self._QueuedFileHandler):
+            self._std_file_handler.close()
         self._std_file_handler = None
         self._std_file_handler_log_file = None
 
@@ -790,6 +1357,14 @@ class LogManager(object):
             encoding="utf8",
         )
 
+        # hand the log messages over to a background writer thread if
+        # asynchronous file logging is enabled.
+        if self._async_file_logging is not None:
+            queue_size, overflow_policy = self._async_file_logging
+            self._std_file_handler = self._QueuedFileHandler(
+                self._std_file_handler, queue_size, overflow_policy
+            )
+
         # set the level based on global debug flag
         if self.global_debug:
             self._std_file_handler.setLevel(logging.DEBUG)
@@ -815,6 +1390,18 @@ class LogManager(object):
 # the logger for logging messages from this file :)
 log = LogManager.get_logger(__name__)
 
+# values that leave the TK_PROFILING switch off
+_DISABLED_ENV_VAR_VALUES = ("", "0", "false", "no", "off")
+
+# timings aggregated by LogManager.log_timing
+_timing_stats = _TimingStats()
+if (
+    os.environ.get(constants.PROFILING_ENV_VAR, "").strip().lower()
+    not in _DISABLED_ENV_VAR_VALUES
+):
+    _timing_stats.enabled = True
+    _timing_stats.register_dump_at_exit()
+
 # initialize toolkit logging
 #
 # retrieve top most logger in the sgtk hierarchy
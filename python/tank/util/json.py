@@ -20,6 +20,34 @@ import json
 from .unicode import ensure_contains_str
 
 
+def _may_contain_bytes(cls, object_hook, parse_float, parse_int, parse_constant, kw):
+    """
+    Checks if a decoded document may contain :class:`bytes` objects.
+
+    The json module only ever produces :class:`str` objects, so the decoded
+    document can only contain :class:`bytes` objects if a custom decoder or
+    hook was provided.
+
+    :param cls: Custom decoder class, if any.
+    :param object_hook: Custom object hook, if any.
+    :param parse_float: Custom float parser, if any.
+    :param parse_int: Custom int parser, if any.
+    :param parse_constant: Custom constant parser, if any.
+    :param dict kw: Extra arguments given to the decoder.
+
+    :returns: True if the decoded document needs to be converted with
+        :func:`ensure_contains_str`, False otherwise.
+    """
+    return (
+        cls is not None
+        or object_hook is not None
+        or parse_float is not None
+        or parse_int is not None
+        or parse_constant is not None
+        or kw.get("object_pairs_hook") is not None
+    )
+
+
 # This is the Python 2.6 signature. 2.7 has an extra object_hook_pairs argument.
 def load(
     fp,
@@ -36,7 +64,9 @@ def load(
     a JSON document) to a Python object.
 
     This method is a simple thin wrapper around :func:`json.load` that
-    ensures unserialized strings are utf-8 encoded :class:`str` objects.
+    ensures unserialized strings are utf-8 encoded :class:`str` objects. The
+    json module only produces :class:`str` objects, so the document is only
+    converted if a custom decoder or hook is used.
 
     See the documentation for :func:`json.load` to learn more about this method.
     """
@@ -57,6 +87,11 @@ def load(
         **kw
     )
 
+    if not _may_contain_bytes(
+        cls, object_hook, parse_float, parse_int, parse_constant, kw
+    ):
+        return loaded_value
+
     return ensure_contains_str(loaded_value)
 
 
@@ -76,7 +111,9 @@ def loads(
     document) to a Python object.
 
     This method is a simple thin wrapper around :func:`json.loads` that
-    ensures unserialized strings are utf-8 encoded :class:`str` objects.
+    ensures unserialized strings are utf-8 encoded :class:`str` objects. The
+    json module only produces :class:`str` objects, so the document is only
+    converted if a custom decoder or hook is used.
 
     See the documentation for :func:`json.loads` to learn more about this method.
     """
@@ -97,4 +134,9 @@ def loads(
         **kw
     )
 
+    if not _may_contain_bytes(
+        cls, object_hook, parse_float, parse_int, parse_constant, kw
+    ):
+        return loaded_value
+
     return ensure_contains_str(loaded_value)
@@ -8,8 +8,10 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
+import base64
 import os
 import pickle
+import zlib
 
 from .. import LogManager
 from .unicode import ensure_contains_str
@@ -28,6 +30,22 @@ DUMP_KWARGS = {"protocol": 0}
 FALLBACK_ENCODING = "ISO-8859-1"
 FALLBACK_ENCODING_KEY = "_payload_encoding"
 
+# Payloads stored in environment variables start with this prefix, followed by
+# the version of the format, the flags and the base64 encoded pickle, all
+# separated by colons. For example: "sgtk-pickle:1:z:eJxrYJ..."
+# Payloads without the prefix were written with protocol 0 by older versions
+# of Toolkit.
+ENV_PAYLOAD_PREFIX = "sgtk-pickle:"
+ENV_PAYLOAD_VERSION = 1
+# Flag set when the pickle is compressed with zlib.
+ENV_PAYLOAD_COMPRESSED_FLAG = "z"
+# Protocol used for pickles stored in environment variables. Protocol 4 is
+# understood by every supported version of Python, so child processes running
+# another interpreter can still read the payload.
+ENV_PICKLE_PROTOCOL = 4
+# Pickles smaller than this number of bytes are not worth compressing.
+ENV_COMPRESSION_THRESHOLD = 256
+
 
 def dumps(data):
     """
@@ -101,6 +119,60 @@ def load(fh):
     return ensure_contains_str(pickle.load(fh, **LOAD_KWARGS))
 
 
+def dumps_env_payload(data):
+    """
+    Return the representation of ``data`` stored in environment variables.
+
+    The data is pickled with a binary protocol, compressed with zlib when that
+    makes it smaller, and encoded to base64 so it can be stored as a ``str``.
+    The payload starts with a header describing the format, see
+    :data:`ENV_PAYLOAD_PREFIX`.
+
+    :param data: The object to pickle.
+    :returns: The payload.
+    :rtype: str
+    """
+    binary = pickle.dumps(data, protocol=ENV_PICKLE_PROTOCOL)
+    flags = ""
+    if len(binary) >= ENV_COMPRESSION_THRESHOLD:
+        compressed = zlib.compress(binary)
+        if len(compressed) < len(binary):
+            binary = compressed
+            flags = ENV_PAYLOAD_COMPRESSED_FLAG
+    return "%s%d:%s:%s" % (
+        ENV_PAYLOAD_PREFIX,
+        ENV_PAYLOAD_VERSION,
+        flags,
+        base64.b64encode(binary).decode("ascii"),
+    )
+
+
+def loads_env_payload(payload):
+    """
+    Deserialize a payload stored in an environment variable.
+
+    Both the payloads written by :func:`dumps_env_payload` and the protocol 0
+    pickles written by older versions of Toolkit are supported.
+
+    :param str payload: The payload.
+    :returns: The unpickled object.
+    :raises ValueError: If the payload was written with an unsupported version
+        of the format.
+    """
+    if not payload.startswith(ENV_PAYLOAD_PREFIX):
+        # Legacy protocol 0 pickle.
+        return loads(payload)
+
+    version, flags, encoded = payload[len(ENV_PAYLOAD_PREFIX) :].split(":", 2)
+    if version != str(ENV_PAYLOAD_VERSION):
+        raise ValueError("Unsupported environment payload version '%s'." % version)
+
+    binary = base64.b64decode(encoded)
+    if ENV_PAYLOAD_COMPRESSED_FLAG in flags:
+        binary = zlib.decompress(binary)
+    return ensure_contains_str(pickle.loads(binary, **LOAD_KWARGS))
+
+
 def store_env_var_pickled(key, data):
     """
     Stores the provided data under the environment variable specified.
@@ -108,17 +180,14 @@ def store_env_var_pickled(key, data):
     .. note::
         This method is part of Toolkit's internal API.
 
-    In Python 3 pickle.dumps() returns a binary object that can't be decoded to
-    a string for storage in an environment variable.  To work around this, we
-    encode the pickled data to base64, compress the result, and store that.
+    The data is pickled with a binary protocol, compressed and encoded to
+    base64, see :func:`dumps_env_payload`. This keeps the environment of the
+    child processes small.
 
     :param key: The name of the environment variable to store the data in.
     :param data: The object to pickle and store.
     """
-    pickled_data = dumps(data)
-    if isinstance(pickled_data, bytes):
-        pickled_data = pickled_data.decode("utf-8")
-    os.environ[key] = pickled_data
+    os.environ[key] = dumps_env_payload(data)
 
 
 def retrieve_env_var_pickled(key):
@@ -129,14 +198,11 @@ def retrieve_env_var_pickled(key):
     .. note::
         This method is part of Toolkit's internal API.
 
-    In Python 3 pickle.dumps() returns a binary object that can't be decoded to
-    a string for storage in an environment variable.  To work around this, we
-    encode the pickled data to base64, compress the result, and store that.
+    Payloads stored by older versions of Toolkit, which were protocol 0
+    pickles, are detected and still supported.
 
     :param key: The name of the environment variable to retrieve data from.
     :returns: The original object that was stored.
+    :raises KeyError: If the environment variable is not set.
     """
-    if isinstance(key, str):
-        envvar_contents = key.encode("utf-8")
-
-    return loads(envvar_contents)
+    return loads_env_payload(os.environ[key])
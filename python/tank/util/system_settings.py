@@ -12,8 +12,6 @@
 System settings management.
 """
 
-import urllib.request
-
 
 class SystemSettings(object):
     """
@@ -46,6 +44,10 @@ class SystemSettings(object):
         # Note the following restriction: "getproxies" does not support the use of proxies which
         # require authentication (user and password) when looking for proxy information from
         # Mac OSX System Configuration or Windows Systems Registry.
+        #
+        # urllib.request is slow to import, so only import it when needed.
+        import urllib.request
+
         system_proxies = urllib.request.getproxies()
 
         # Get the http proxy when it exists in the dictionary.
@@ -11,22 +11,40 @@
 Utility methods for filtering dictionaries
 """
 
+import itertools
 
-def _ensure_contains_str(input_value, visited):
+
+# Types of the values that never need to be converted, which are skipped
+# without calling _convert.
+_UNCHANGED_TYPES = frozenset([str, int, float, bool, type(None)])
+
+
+def _convert(input_value, visited, pending):
     """
-    Convert the keys and values of arrays and dicts to ensure no ``unicode``
-    objects are present.
+    Converts a value that isn't a list or a dictionary, or schedules the
+    conversion of a list or dictionary that hasn't been visited yet.
 
-    :param object input_value: Value to validate.
-    :param set visited: List of objects already visited.
+    :param object input_value: Value to convert.
+    :param set visited: Ids of the lists and dictionaries already visited.
+    :param list pending: Lists and dictionaries waiting to be converted.
 
-    :returns: The converted value, if required.
+    :returns: The converted value, or the value itself if it doesn't need to
+        be converted. Lists and dictionaries are always returned as is since
+        they are converted in place.
     :rtype: object
     """
+    # If we've found a unicode object of a bytes string, convert them back to
+    # string.
+    if isinstance(input_value, str):
+        if type(input_value) is str:
+            return input_value
+        return str(input_value)
+    if isinstance(input_value, bytes):
+        return input_value.decode("utf-8")
     # It's important to keep track of visited lists and dictionary, as
     # there can be circular dependencies between those. Failing to
     # keep track of them will introduce cycles which will make this method
-    # do a stack overflow.
+    # loop forever.
     #
     # Certain parts of Toolkit, like the ShotgunModel's cache from shotgunutils
     # actually pickle structures with circular dependencies, so we have to
@@ -36,45 +54,123 @@ def _ensure_contains_str(input_value, visited):
     # those back references are kept, so we'll always in-place edit arrays
     # and dicts instead of instantiating a new array or dict with the
     # updated values.
-
-    # If we've found a unicode object of a bytes string, convert them back to
-    # string.
-    if isinstance(input_value, str):
-        return str(input_value)
-    if isinstance(input_value, bytes):
-        return input_value.decode("utf-8")
-    # If we've found a new array, we must ensure each element is
-    # not a unicode object.
-    elif isinstance(input_value, list) and id(input_value) not in visited:
-        visited.add(id(input_value))
-        for i in range(len(input_value)):
-            item = input_value[i]
-            input_value[i] = _ensure_contains_str(item, visited)
-        return input_value
-    elif isinstance(input_value, tuple):
-        # Tuples are immutable, so we don't need to track which one have been
-        # converted so far.
-        #
-        # We could start to track tuples instances that have been converted and reinsert
-        # those, but it would make the code a lot more complex for very little benefit.
-        # We need to modify other types in place as we can create circular dependencies,
-        # but you cannot create a circular dependency of tuples, so this is not an issue.
-        return tuple(
-            _ensure_contains_str(tuple_item, visited) for tuple_item in input_value
-        )
-    # If we've found a new dict, we must ensure each key and value
-    # is not a unicode object.
-    elif isinstance(input_value, dict) and id(input_value) not in visited:
-        visited.add(id(input_value))
-        for key in list(input_value.keys()):
-            item = input_value.pop(key)
-            converted_item = _ensure_contains_str(item, visited)
-            converted_key = _ensure_contains_str(key, visited)
-            input_value[converted_key] = converted_item
-        return input_value
-    # Not a unicode, bytes, list or array, so return as is.
-    else:
+    if isinstance(input_value, (list, dict)):
+        if id(input_value) not in visited:
+            visited.add(id(input_value))
+            pending.append(input_value)
         return input_value
+    if isinstance(input_value, tuple):
+        return _convert_tuple(input_value, visited, pending)
+    # Not a unicode, bytes, list, dict or tuple, so return as is.
+    return input_value
+
+
+def _convert_tuple(input_value, visited, pending):
+    """
+    Converts the items of a tuple.
+
+    Tuples are immutable, so a new tuple is created if any of the items, or
+    of the items of nested tuples, had to be converted. Nested tuples are
+    converted with an explicit stack so deep nesting can't exhaust the
+    recursion limit.
+
+    :param tuple input_value: Tuple to convert.
+    :param set visited: Ids of the lists and dictionaries already visited.
+    :param list pending: Lists and dictionaries waiting to be converted.
+
+    :returns: The converted tuple, or the tuple itself if nothing changed.
+    :rtype: tuple
+    """
+    # We could start to track tuples instances that have been converted and reinsert
+    # those, but it would make the code a lot more complex for very little benefit.
+    # We need to modify other types in place as we can create circular dependencies,
+    # but you cannot create a circular dependency of tuples, so this is not an issue.
+    #
+    # Each frame holds a tuple, the index of the next item to convert, the
+    # items converted so far and whether any of them changed.
+    frames = [[input_value, 0, [], False]]
+    while True:
+        frame = frames[-1]
+        current, index, items, changed = frame
+        if index < len(current):
+            frame[1] = index + 1
+            item = current[index]
+            if isinstance(item, tuple):
+                frames.append([item, 0, [], False])
+                continue
+            converted = _convert(item, visited, pending)
+            items.append(converted)
+            if converted is not item:
+                frame[3] = True
+            continue
+
+        frames.pop()
+        result = tuple(items) if changed else current
+        if not frames:
+            return result
+        parent = frames[-1]
+        parent[2].append(result)
+        if result is not current:
+            parent[3] = True
+
+
+def _convert_list(input_value, visited, pending):
+    """
+    Converts the items of a list in place.
+
+    :param list input_value: List to convert.
+    :param set visited: Ids of the lists and dictionaries already visited.
+    :param list pending: Lists and dictionaries waiting to be converted.
+    """
+    for index, item in enumerate(input_value):
+        if type(item) is bytes:
+            input_value[index] = item.decode("utf-8")
+        elif type(item) not in _UNCHANGED_TYPES:
+            converted = _convert(item, visited, pending)
+            if converted is not item:
+                input_value[index] = converted
+
+
+def _convert_dict(input_value, visited, pending):
+    """
+    Converts the keys and values of a dictionary in place.
+
+    Values are replaced in place. The dictionary is only rebuilt, in the same
+    order, if one of its keys has to be converted.
+
+    :param dict input_value: Dictionary to convert.
+    :param set visited: Ids of the lists and dictionaries already visited.
+    :param list pending: Lists and dictionaries waiting to be converted.
+    """
+    # Converted (key, value) pairs, once a key had to be converted.
+    items = None
+    for index, (key, item) in enumerate(input_value.items()):
+        converted = item
+        if type(item) is bytes:
+            converted = item.decode("utf-8")
+        elif type(item) not in _UNCHANGED_TYPES:
+            converted = _convert(item, visited, pending)
+        converted_key = key
+        if type(key) is bytes:
+            converted_key = key.decode("utf-8")
+        elif type(key) not in _UNCHANGED_TYPES:
+            converted_key = _convert(key, visited, pending)
+
+        if items is not None:
+            items.append((converted_key, converted))
+        elif converted_key is not key:
+            # The dictionary will be rebuilt, starting with the items before
+            # this one, which are already converted.
+            items = list(itertools.islice(input_value.items(), index))
+            items.append((converted_key, converted))
+        elif converted is not item:
+            # Replacing the value of an existing key doesn't change the
+            # size of the dictionary, so it is safe while iterating.
+            input_value[key] = converted
+
+    if items is not None:
+        input_value.clear()
+        input_value.update(items)
 
 
 def ensure_contains_str(input_value):
@@ -88,4 +184,15 @@ def ensure_contains_str(input_value):
 
     :returns: A value with utf-8 encoded :class:`str` instances.
     """
-    return _ensure_contains_str(input_value, set())
+    visited = set()
+    pending = []
+    converted = _convert(input_value, visited, pending)
+    # Lists and dictionaries are converted from a stack instead of
+    # recursively, so deeply nested values can't exhaust the recursion limit.
+    while pending:
+        container = pending.pop()
+        if isinstance(container, list):
+            _convert_list(container, visited, pending)
+        else:
+            _convert_dict(container, visited, pending)
+    return converted
@@ -13,10 +13,14 @@ User settings management.
 """
 
 import configparser
+import logging
 import os
+import threading
+import time
 
 from .local_file_storage import LocalFileStorageManager
 from .errors import EnvironmentVariableFileLookupError, TankError
+from .platforms import is_windows
 from .. import LogManager
 from .singleton import Singleton
 from .system_settings import SystemSettings
@@ -33,21 +37,104 @@ class UserSettings(Singleton):
     All the settings are returned as strings. If a setting is missing from the file, ``None`` will
     be returned. If the setting is present but has no value, an empty string will be returned.
 
-    As of this writing, settings can only be updated by editing the ``ini`` file manually.
+    As of this writing, settings can only be updated by editing the ``ini`` file manually. The file
+    is parsed the first time a setting is accessed and is parsed again when it is modified, so
+    long running processes pick up the changes without being restarted.
+
+    Environment variables (``$VAR``, ``${VAR}`` and, on Windows, ``%VAR%``) and ``~`` in the values
+    are expanded every time such a setting is read, so changes to the environment are picked up
+    too. Other values are cached until the file is modified.
     """
 
     _LOGIN = "Login"
 
+    # Characters that make os.path.expandvars and os.path.expanduser look up
+    # the environment. On Windows, expandvars also expands %VAR%.
+    _ENVIRONMENT_CHARACTERS = ("$", "~", "%") if is_windows() else ("$", "~")
+
+    # Minimum number of seconds between two checks for changes to the file.
+    _CHANGE_CHECK_INTERVAL = 1.0
+
     def _init_singleton(self):
         """
         Singleton initialization.
+
+        The file is only located and parsed when a setting is first accessed.
+        """
+        self._lock = threading.Lock()
+        self._path = None
+        # (ConfigParser instance, values cached by (section, name)) tuple.
+        # Both are always replaced together, so values read from a previous
+        # version of the file can't end up in the cache of the new one.
+        self._settings = None
+        # (mtime, size) of the file when it was parsed, None if it didn't exist.
+        self._file_signature = None
+        self._next_change_check = 0
+
+    def _get_settings(self):
+        """
+        Retrieves the parsed settings, parsing the file on first access and
+        parsing it again if it has been modified since.
+
+        The file is checked for changes at most once every
+        ``_CHANGE_CHECK_INTERVAL`` seconds.
+
+        :returns: A (ConfigParser instance, dictionary of cached values) tuple
+            for the current contents of the configuration file.
+        """
+        settings = self._settings
+        if settings is not None and time.monotonic() < self._next_change_check:
+            return settings
+
+        with self._lock:
+            now = time.monotonic()
+            first_load = self._settings is None
+            if first_load:
+                self._path = self._compute_config_location()
+                logger.debug("Reading user settings from %s", self._path)
+                self._file_signature = self._get_file_signature(self._path)
+                self._settings = (self._load_config(self._path), {})
+            elif now >= self._next_change_check:
+                signature = self._get_file_signature(self._path)
+                if signature != self._file_signature:
+                    logger.debug("Reloading user settings from %s", self._path)
+                    self._file_signature = signature
+                    self._settings = (self._load_config(self._path), {})
+            self._next_change_check = now + self._CHANGE_CHECK_INTERVAL
+            settings = self._settings
+
+        if first_load:
+            self._log_settings()
+        return settings
+
+    def _get_config(self):
         """
-        self._path = self._compute_config_location()
-        logger.debug("Reading user settings from %s", self._path)
+        Retrieves the parsed settings, see :meth:`_get_settings`.
 
-        self._user_config = self._load_config(self._path)
+        :returns: A ConfigParser instance with the contents from the configuration file.
+        """
+        return self._get_settings()[0]
+
+    def _get_file_signature(self, path):
+        """
+        :param path: Path to the configuration file.
+
+        :returns: A (modification time, size) tuple for the file, or None if it
+            doesn't exist.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _log_settings(self):
+        """
+        Logs the default settings.
+        """
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
 
-        # Log the default settings
         logger.debug("Default site: %s", self._to_display_value(self.default_site))
         logger.debug("Default login: %s", self._to_display_value(self.default_login))
 
@@ -105,9 +192,10 @@ class UserSettings(Singleton):
         :returns: A list of setting's name. If the section is missing, returns
             ``None``.
         """
-        if not self._user_config.has_section(section):
+        config = self._get_config()
+        if not config.has_section(section):
             return None
-        return self._user_config.options(section)
+        return config.options(section)
 
     def get_setting(self, section, name):
         """
@@ -120,15 +208,22 @@ class UserSettings(Singleton):
             an empty string if the setting is present but has no value associated.
         :rtype: str
         """
-        if not self._user_config.has_section(
-            section
-        ) or not self._user_config.has_option(section, name):
-            return None
+        config, values = self._get_settings()
+        key = (section, name)
+        if key in values:
+            return values[key]
 
-        value = os.path.expanduser(
-            os.path.expandvars(self._user_config.get(section, name))
-        )
-        return value.strip()
+        if not config.has_section(section) or not config.has_option(section, name):
+            value = None
+        else:
+            raw_value = config.get(section, name)
+            value = os.path.expanduser(os.path.expandvars(raw_value)).strip()
+            if any(char in raw_value for char in self._ENVIRONMENT_CHARACTERS):
+                # The expanded value depends on the environment, which can
+                # change at any time, so it is not cached.
+                return value
+        values[key] = value
+        return value
 
     # Unfortunately here for get_boolean_setting and get_integer_setting we're replicating some of the
     # logic from the ConfigParser class. We have to do this because ConfigParser doesn't expand environment
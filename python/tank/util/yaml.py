@@ -0,0 +1,224 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Utility methods for reading and writing YAML documents.
+
+Documents are parsed and emitted with the libyaml C bindings when they are
+available, which is several times faster than the pure Python implementation.
+The C bindings are only used if they produce the same output as the pure
+Python implementation, otherwise the pure Python implementation is used.
+
+The libyaml bindings shipped with PyYAML belong to the ``yaml`` package they
+were built for: the events, nodes and errors they create are the ones of that
+package. The ``CSafeLoader`` and ``CSafeDumper`` classes of ``tank_vendor.yaml``
+mix those with the vendored classes and can't be used, so the bindings are
+only used through the package they belong to.
+"""
+
+import threading
+
+from .. import LogManager
+
+log = LogManager.get_logger(__name__)
+
+# Documents used to make sure the C bindings produce the same output as the
+# pure Python implementation.
+_PROBE_DOCUMENTS = [
+    {
+        "current_user": "john.doe",
+        "recent_users": ["john.doe", "jane.doe"],
+        "users": [
+            {
+                "login": "john.doe",
+                "session_token": "9f0e1c2b3a4d5e6f",
+                "session_metadata": "Y3NyZl90b2tlbl91OiAx" * 20,
+            },
+        ],
+        "integer": 42,
+        "float": 0.5,
+        "boolean": True,
+        "none": None,
+        "empty": "",
+        "number_as_string": "0123",
+        "unicode": "Jérôme",
+        "multi_line": "first line\nsecond line",
+    }
+]
+
+_lock = threading.Lock()
+# (yaml package, loader class, dumper class, error classes) tuple, selected on
+# first use.
+_selection = None
+
+
+def _get_pure_python_selection():
+    """
+    :returns: The (yaml package, loader class, dumper class, error classes)
+        tuple of the pure Python implementation.
+    """
+    from tank_vendor import yaml
+
+    return yaml, yaml.SafeLoader, yaml.SafeDumper, (yaml.YAMLError,)
+
+
+def _get_libyaml_selection():
+    """
+    Retrieves the classes using the libyaml C bindings, if they are available
+    and produce the same output as the pure Python implementation.
+
+    The C bindings are probed through :func:`_load_with` and
+    :func:`_dump_with`, like the documents that are actually read and written.
+
+    :returns: The (yaml package, loader class, dumper class, error classes)
+        tuple, or None if the C bindings can't be used.
+    """
+    from tank_vendor import yaml as vendored_yaml
+
+    if not vendored_yaml.__with_libyaml__:
+        return None
+
+    try:
+        # The package the C bindings were imported from.
+        import yaml as libyaml_yaml
+
+        selection = (
+            libyaml_yaml,
+            libyaml_yaml.CSafeLoader,
+            libyaml_yaml.CSafeDumper,
+            (vendored_yaml.YAMLError, libyaml_yaml.YAMLError),
+        )
+        pure_python_selection = _get_pure_python_selection()
+
+        for document in _PROBE_DOCUMENTS:
+            expected = _dump_with(pure_python_selection, document)
+            if _dump_with(selection, document) != expected:
+                log.debug("libyaml output differs, using the pure Python yaml.")
+                return None
+            if _load_with(selection, expected) != document:
+                log.debug("libyaml parsing differs, using the pure Python yaml.")
+                return None
+    except Exception as e:
+        log.debug("libyaml can't be used, using the pure Python yaml: %s", e)
+        return None
+
+    return selection
+
+
+def _load_with(selection, stream):
+    """
+    Parses a document with the safe loader of a selection.
+
+    :param selection: (yaml package, loader class, dumper class, error classes)
+        tuple.
+    :param stream: String or file-like object containing the document.
+
+    :returns: The parsed document.
+    """
+    _, loader_class, _, _ = selection
+    loader = loader_class(stream)
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+def _dump_with(selection, data, stream=None, **kwargs):
+    """
+    Emits a document with the safe dumper of a selection, through the yaml
+    package the dumper belongs to.
+
+    :param selection: (yaml package, loader class, dumper class, error classes)
+        tuple.
+    :param data: Data to serialize.
+    :param stream: File-like object to write to. If None, the document is
+        returned as a string.
+    :param kwargs: Extra arguments for the dumper, see ``yaml.dump``.
+
+    :returns: The document if no stream was given, None otherwise.
+    """
+    yaml_package, _, dumper_class, _ = selection
+    return yaml_package.dump(data, stream, Dumper=dumper_class, **kwargs)
+
+
+def _get_selection():
+    """
+    Selects the yaml implementation on first use.
+
+    :returns: The (yaml package, loader class, dumper class, error classes)
+        tuple.
+    """
+    global _selection
+    if _selection is None:
+        with _lock:
+            if _selection is None:
+                _selection = _get_libyaml_selection() or _get_pure_python_selection()
+    return _selection
+
+
+def get_loader_class():
+    """
+    Retrieves the safe loader class to parse documents with.
+
+    :returns: ``CSafeLoader`` if the libyaml C bindings can be used,
+        ``SafeLoader`` otherwise.
+    """
+    return _get_selection()[1]
+
+
+def get_dumper_class():
+    """
+    Retrieves the safe dumper class to emit documents with.
+
+    :returns: ``CSafeDumper`` if the libyaml C bindings can be used,
+        ``SafeDumper`` otherwise.
+    """
+    return _get_selection()[2]
+
+
+def is_yaml_error(exception):
+    """
+    Checks if an exception was raised by the parser or the emitter.
+
+    :param Exception exception: Exception to check.
+
+    :returns: True if the exception is a ``YAMLError``, False otherwise.
+    """
+    return isinstance(exception, _get_selection()[3])
+
+
+def load(stream):
+    """
+    Parses a document with the safe loader.
+
+    :param stream: String or file-like object containing the document.
+
+    :returns: The parsed document.
+
+    :raises YAMLError: Raised if the document can't be parsed. Use
+        :func:`is_yaml_error` to check for it.
+    """
+    return _load_with(_get_selection(), stream)
+
+
+def dump(data, stream=None, **kwargs):
+    """
+    Emits a document with the safe dumper.
+
+    This is equivalent to ``yaml.safe_dump``.
+
+    :param data: Data to serialize.
+    :param stream: File-like object to write to. If None, the document is
+        returned as a string.
+    :param kwargs: Extra arguments for the dumper, see ``yaml.dump``.
+
+    :returns: The document if no stream was given, None otherwise.
+    """
+    return _dump_with(_get_selection(), data, stream, **kwargs)
@@ -12,6 +12,7 @@
 # Reader provides the following methods and attributes:
 #   reader.peek(length=1) - return the next `length` characters
 #   reader.forward(length=1) - move the current position to `length` characters.
+#   reader.match_length(pattern) - the number of next characters matching `pattern`.
 #   reader.index - the number of the current character.
 #   reader.line, stream.column - the line and the column of the current character.
 
@@ -96,9 +97,19 @@ class Reader(object):
             self.update(length)
         return self.buffer[self.pointer:self.pointer+length]
 
+    # Characters that need special care when moving forward.
+    LINE_BREAKS_OR_BOM = re.compile('[\n\r\x85\u2028\u2029\uFEFF]')
+
     def forward(self, length=1):
         if self.pointer+length+1 >= len(self.buffer):
             self.update(length+1)
+        if length > 1 and not self.LINE_BREAKS_OR_BOM.search(
+                self.buffer, self.pointer, self.pointer+length):
+            # Fast path: the characters are all on the current line.
+            self.pointer += length
+            self.index += length
+            self.column += length
+            return
         while length:
             ch = self.buffer[self.pointer]
             self.pointer += 1
@@ -111,6 +122,18 @@ class Reader(object):
                 self.column += 1
             length -= 1
 
+    def match_length(self, pattern):
+        # Return the number of characters matched by `pattern` from the
+        # current position, reading more data if the match may go on past the
+        # end of the buffer. `pattern` must not look further than one
+        # character past its match.
+        while True:
+            length = pattern.match(self.buffer, self.pointer).end()-self.pointer
+            if self.raw_buffer is None  \
+                    or self.pointer+length+1 < len(self.buffer):
+                return length
+            self.update(2*length+2)
+
     def get_mark(self):
         if self.stream is None:
             return Mark(self.name, self.index, self.line, self.column,
@@ -29,6 +29,8 @@ __all__ = ['Scanner', 'ScannerError']
 from .error import MarkedYAMLError
 from .tokens import *
 
+import re
+
 class ScannerError(MarkedYAMLError):
     pass
 
@@ -749,6 +751,33 @@ class Scanner:
 
     # Scanners.
 
+    # Patterns matching runs of characters, used to move forward over them at
+    # once instead of one character at a time. They must not look further
+    # than one character past their match, see Reader.match_length.
+
+    # Spaces before a token.
+    SPACES = re.compile(' *')
+
+    # Anything up to the end of the line, i.e. comments.
+    NON_BREAKS = re.compile('[^\0\r\n\x85\u2028\u2029]*')
+
+    # Characters of a quoted scalar that have no special meaning.
+    FLOW_SCALAR_NON_SPACES = re.compile('[^\'"\\\\\0 \t\r\n\x85\u2028\u2029]*')
+
+    # Characters of a plain scalar in the block context: anything but
+    # spaces and line breaks, and ':' if it is followed by one of those.
+    BLOCK_PLAIN = re.compile(
+            '[^\0 \t\r\n\x85\u2028\u2029:]*'
+            '(?::(?=[^\0 \t\r\n\x85\u2028\u2029])'
+            '[^\0 \t\r\n\x85\u2028\u2029:]*)*')
+
+    # Characters of a plain scalar in the flow context, which cannot contain
+    # flow indicators either.
+    FLOW_PLAIN = re.compile(
+            '[^\0 \t\r\n\x85\u2028\u2029:,?\\[\\]{}]*'
+            '(?::(?=[^\0 \t\r\n\x85\u2028\u2029,\\[\\]{}])'
+            '[^\0 \t\r\n\x85\u2028\u2029:,?\\[\\]{}]*)*')
+
     def scan_to_next_token(self):
         # We ignore spaces, line breaks and comments.
         # If we find a line break in the block context, we set the flag
@@ -773,11 +802,9 @@ class Scanner:
             self.forward()
         found = False
         while not found:
-            while self.peek() == ' ':
-                self.forward()
+            self.forward(self.match_length(self.SPACES))
             if self.peek() == '#':
-                while self.peek() not in '\0\r\n\x85\u2028\u2029':
-                    self.forward()
+                self.forward(self.match_length(self.NON_BREAKS))
             if self.scan_line_break():
                 if not self.flow_level:
                     self.allow_simple_key = True
@@ -1186,9 +1213,7 @@ class Scanner:
         # See the specification for details.
         chunks = []
         while True:
-            length = 0
-            while self.peek(length) not in '\'\"\\\0 \t\r\n\x85\u2028\u2029':
-                length += 1
+            length = self.match_length(self.FLOW_SCALAR_NON_SPACES)
             if length:
                 chunks.append(self.prefix(length))
                 self.forward(length)
@@ -1282,19 +1307,14 @@ class Scanner:
         #if indent == 0:
         #    indent = 1
         spaces = []
+        if self.flow_level:
+            pattern = self.FLOW_PLAIN
+        else:
+            pattern = self.BLOCK_PLAIN
         while True:
-            length = 0
             if self.peek() == '#':
                 break
-            while True:
-                ch = self.peek(length)
-                if ch in '\0 \t\r\n\x85\u2028\u2029'    \
-                        or (ch == ':' and
-                                self.peek(length+1) in '\0 \t\r\n\x85\u2028\u2029'
-                                      + (u',[]{}' if self.flow_level else u''))\
-                        or (self.flow_level and ch in ',?[]{}'):
-                    break
-                length += 1
+            length = self.match_length(pattern)
             if length == 0:
                 break
             self.allow_simple_key = False
@@ -0,0 +1,232 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Tests for the ordering and cancellation of the claims renewals run by
+user._ClaimsRenewalScheduler.
+"""
+
+import time
+import unittest
+from unittest import mock
+
+from tank.authentication import AuthenticationCancelled, user
+
+# Number of seconds to wait for the scheduler thread before giving up.
+TIMEOUT = 10
+
+# Delay of renewals that must not become due during a test.
+NEVER = 3600
+
+
+def _wait_for(condition):
+    """
+    Waits until a condition is met.
+
+    :raises AssertionError: If the condition isn't met within TIMEOUT seconds.
+    """
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for %s" % condition)
+        time.sleep(0.001)
+
+
+class _FakeUser(object):
+    """
+    Stands in for a ShotgunSamlUser, recording its renewals in a shared list
+    and optionally raising an exception.
+    """
+
+    def __init__(self, name, renewals, error=None):
+        self.name = name
+        self._renewals = renewals
+        self._error = error
+
+    def _do_automatic_claims_renewal(self, preemtive_renewal_threshold):
+        self._renewals.append((self.name, preemtive_renewal_threshold))
+        if self._error is not None:
+            raise self._error
+
+    def __repr__(self):
+        return self.name
+
+
+class ClaimsRenewalSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        # Renewals are not brought forward, so their due times are known.
+        patcher = mock.patch.object(user.random, "uniform", return_value=0)
+        self.uniform = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.scheduler = user._ClaimsRenewalScheduler()
+        self.renewals = []
+
+    def _schedule(self, delays, error=None):
+        """
+        Schedules a renewal for each (name, delay) pair. The scheduler thread
+        can't pick a renewal until all of them are scheduled.
+
+        :returns: Dictionary of the scheduled renewals, by name.
+        """
+        scheduled = {}
+        # The condition's lock is reentrant.
+        with self.scheduler._condition:
+            for name, delay in delays:
+                scheduled[name] = self.scheduler.schedule(
+                    _FakeUser(name, self.renewals, error), delay, 0.9
+                )
+        return scheduled
+
+    def _wait_for_renewals(self, renewals):
+        _wait_for(lambda: all(renewal.done for renewal in renewals))
+
+    def test_renewals_run_in_due_time_order(self):
+        """
+        Renewals run in order of due time, not in the order they were
+        scheduled.
+        """
+        scheduled = self._schedule([("c", -1), ("a", -3), ("b", -2)])
+        self._wait_for_renewals(scheduled.values())
+
+        self.assertEqual([name for name, _ in self.renewals], ["a", "b", "c"])
+        self.assertEqual(self.renewals[0][1], 0.9)
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats["scheduled"], 3)
+        self.assertEqual(stats["executed"], 3)
+        self.assertEqual(stats["pending"], 0)
+
+    def test_identical_due_times_run_in_scheduling_order(self):
+        """
+        Renewals due at the same time run in the order they were scheduled.
+        """
+        with mock.patch.object(user.time, "monotonic", return_value=0):
+            scheduled = self._schedule([(name, -1) for name in "dbca"])
+        self._wait_for_renewals(scheduled.values())
+
+        self.assertEqual([name for name, _ in self.renewals], list("dbca"))
+
+    def test_earlier_renewal_wakes_up_the_scheduler(self):
+        """
+        A renewal due before the one the scheduler is waiting for runs without
+        waiting for it.
+        """
+        later = self._schedule([("later", NEVER)])["later"]
+        # Let the scheduler thread wait for the later renewal.
+        _wait_for(lambda: len(self.scheduler._condition._waiters) == 1)
+        sooner = self._schedule([("sooner", 0)])["sooner"]
+        self._wait_for_renewals([sooner])
+
+        self.assertEqual(self.renewals, [("sooner", 0.9)])
+        self.assertTrue(later.is_active())
+        self.assertEqual(self.scheduler.get_stats()["pending"], 1)
+
+    def test_cancelled_renewal_never_runs(self):
+        """
+        A renewal cancelled before it is due is skipped, and the next ones
+        still run.
+        """
+        scheduled = self._schedule([("a", -3), ("b", -2), ("c", -1)])
+        self.scheduler.cancel(scheduled["b"])
+        self.assertEqual(self.scheduler.get_stats()["pending"], 2)
+        self._wait_for_renewals([scheduled["a"], scheduled["c"]])
+
+        self.assertEqual([name for name, _ in self.renewals], ["a", "c"])
+        self.assertFalse(scheduled["b"].is_active())
+        self.assertFalse(scheduled["b"].done)
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats["cancelled"], 1)
+        self.assertEqual(stats["executed"], 2)
+        self.assertEqual(stats["pending"], 0)
+
+    def test_cancel_pending_renewal(self):
+        """
+        Cancelling a renewal that isn't due yet removes it from the pending
+        renewals.
+        """
+        renewal = self._schedule([("a", NEVER)])["a"]
+        self.assertEqual(self.scheduler.get_stats()["pending"], 1)
+
+        self.scheduler.cancel(renewal)
+        # Cancelling twice is only counted once.
+        self.scheduler.cancel(renewal)
+
+        self.assertFalse(renewal.is_active())
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats["cancelled"], 1)
+        self.assertEqual(stats["pending"], 0)
+        self.assertEqual(self.renewals, [])
+
+    def test_cancel_completed_renewal(self):
+        """
+        Cancelling a renewal that already ran has no effect.
+        """
+        renewal = self._schedule([("a", -1)])["a"]
+        self._wait_for_renewals([renewal])
+
+        self.scheduler.cancel(renewal)
+
+        self.assertFalse(renewal.cancelled)
+        self.assertEqual(self.scheduler.get_stats()["cancelled"], 0)
+
+    def test_failed_renewals_dont_stop_the_scheduler(self):
+        """
+        Renewals that fail or are cancelled by the user don't prevent the next
+        ones from running.
+        """
+        with self.assertLogs(user.logger, "ERROR") as logs:
+            failed = self._schedule([("failed", -3)], error=ValueError("Failed"))
+            cancelled = self._schedule(
+                [("cancelled", -2)], error=AuthenticationCancelled()
+            )
+            succeeded = self._schedule([("succeeded", -1)])
+            self._wait_for_renewals(
+                list(failed.values())
+                + list(cancelled.values())
+                + list(succeeded.values())
+            )
+
+        self.assertEqual(
+            [name for name, _ in self.renewals], ["failed", "cancelled", "succeeded"]
+        )
+        # Only the unexpected failure is logged as an error.
+        self.assertEqual(len(logs.records), 1)
+
+    def test_missed_deadline(self):
+        """
+        Renewals running later than the tolerance are counted as missed
+        deadlines.
+        """
+        tolerance = user.CLAIMS_RENEWAL_DEADLINE_TOLERANCE
+        with self.assertLogs(user.logger, "WARNING") as logs:
+            scheduled = self._schedule([("late", -(tolerance + 5)), ("on_time", 0)])
+            self._wait_for_renewals(scheduled.values())
+
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats["missed_deadlines"], 1)
+        self.assertGreaterEqual(stats["max_delay"], tolerance + 5)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("late", logs.records[0].getMessage())
+
+    def test_jitter_brings_renewals_forward(self):
+        """
+        Renewals are brought forward by up to CLAIMS_RENEWAL_JITTER of their
+        delay.
+        """
+        self.uniform.return_value = user.CLAIMS_RENEWAL_JITTER
+        before = time.monotonic()
+        renewal = self._schedule([("a", NEVER)])["a"]
+        after = time.monotonic()
+
+        self.uniform.assert_called_once_with(0, user.CLAIMS_RENEWAL_JITTER)
+        delay = NEVER * (1 - user.CLAIMS_RENEWAL_JITTER)
+        self.assertGreaterEqual(renewal.due_time, before + delay)
+        self.assertLessEqual(renewal.due_time, after + delay)
+        self.scheduler.cancel(renewal)
@@ -0,0 +1,245 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Tests for the credential broker and the BrokerDefaultsManager.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from tank.authentication import (
+    BrokerDefaultsManager,
+    ShotgunAuthenticator,
+    credential_broker,
+    interactive_authentication,
+    session_cache,
+)
+
+HOST = "https://broker.shotgunstudio.com"
+
+
+class _FakeBroker(socketserver.ThreadingUnixStreamServer):
+    """
+    Broker answering every request with the result of a callable. If the
+    callable returns None, the request is never answered.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, answer):
+        self.answer = answer
+        self.requests = []
+        self.stop = threading.Event()
+        super().__init__(socket_path, _FakeBrokerHandler)
+
+
+class _FakeBrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            request = json.loads(line)
+            self.server.requests.append(request)
+            response = self.server.answer(request)
+            if response is None:
+                self.server.stop.wait()
+                return
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix domain sockets required.")
+class CredentialBrokerTests(unittest.TestCase):
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self._folder.cleanup)
+        self.shotgun_home = self._folder.name
+        self.socket_path = os.path.join(self.shotgun_home, "broker.sock")
+
+        patcher = mock.patch.dict(os.environ, {"SHOTGUN_HOME": self.shotgun_home})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        session_cache.clear_document_cache()
+        self.addCleanup(session_cache.clear_document_cache)
+
+        # The broker must never prompt for credentials.
+        patcher = mock.patch.object(
+            interactive_authentication,
+            "renew_session",
+            side_effect=AssertionError("renew_session called"),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _start_fake_broker(self, answer):
+        server = _FakeBroker(self.socket_path, answer)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        def stop():
+            server.stop.set()
+            server.shutdown()
+            server.server_close()
+
+        self.addCleanup(stop)
+        return server
+
+    def _cache_session(self, login, session_token):
+        session_cache.cache_session_data(HOST, login, session_token)
+        session_cache.set_current_host(HOST)
+        session_cache.set_current_user(HOST, login)
+
+    def _get_session_cache_files(self):
+        return [
+            os.path.join(folder, name)
+            for folder, _, names in os.walk(self.shotgun_home)
+            for name in names
+            if name == "authentication.yml"
+        ]
+
+    def test_hit(self):
+        """
+        The user provided by the broker is created without accessing the
+        session cache.
+        """
+        broker = self._start_fake_broker(
+            lambda request: {
+                "host": HOST,
+                "login": "john",
+                "session_token": "broker-token",
+                "session_metadata": None,
+            }
+        )
+        manager = BrokerDefaultsManager(socket_path=self.socket_path)
+
+        # Failures to save the session are swallowed, so record the accesses.
+        with mock.patch.object(
+            session_cache,
+            "_try_load_yaml_file",
+            wraps=session_cache._try_load_yaml_file,
+        ) as load_file:
+            user = ShotgunAuthenticator(manager).get_default_user()
+
+        self.assertFalse(load_file.called)
+        self.assertEqual(user.host, HOST)
+        self.assertEqual(user.login, "john")
+        self.assertEqual(user.impl.get_session_token(), "broker-token")
+        self.assertEqual(self._get_session_cache_files(), [])
+        # The broker is only asked once.
+        self.assertEqual(len(broker.requests), 1)
+
+    def test_miss(self):
+        """
+        The session cache is used when the broker can't provide a session.
+        """
+        self._cache_session("john", "cached-token")
+        self._start_fake_broker(lambda request: {"error": "no session"})
+
+        credentials = BrokerDefaultsManager(
+            socket_path=self.socket_path
+        ).get_user_credentials()
+
+        self.assertEqual(credentials["session_token"], "cached-token")
+        self.assertNotIn("cache", credentials)
+
+    def test_no_broker(self):
+        """
+        The session cache is used when no broker is listening.
+        """
+        self._cache_session("john", "cached-token")
+
+        credentials = BrokerDefaultsManager(
+            socket_path=self.socket_path
+        ).get_user_credentials()
+
+        self.assertEqual(credentials["session_token"], "cached-token")
+
+    def test_timeout(self):
+        """
+        Clients give up on a broker that doesn't answer.
+        """
+        self._cache_session("john", "cached-token")
+        self._start_fake_broker(lambda request: None)
+
+        start = time.monotonic()
+        with mock.patch.object(credential_broker, "CLIENT_TIMEOUT", 0.2):
+            credentials = BrokerDefaultsManager(
+                socket_path=self.socket_path
+            ).get_user_credentials()
+
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(credentials["session_token"], "cached-token")
+
+    def test_expired_token(self):
+        """
+        The broker reports expired sessions instead of renewing them, and
+        clients fall back on the session cache.
+        """
+        self._cache_session("john", "expired-token")
+
+        authenticator = ShotgunAuthenticator()
+        broker = credential_broker.CredentialBroker(authenticator, self.socket_path)
+        with mock.patch(
+            "tank.authentication.user_impl.SessionUser.are_credentials_expired",
+            return_value=True,
+        ) as are_credentials_expired:
+            broker.start()
+            self.addCleanup(broker.shutdown)
+
+            response = credential_broker._request(
+                {"op": "get"}, socket_path=self.socket_path
+            )
+            credentials = BrokerDefaultsManager(
+                socket_path=self.socket_path
+            ).get_user_credentials()
+
+        self.assertTrue(response["expired"])
+        self.assertNotIn("session_token", response)
+        self.assertTrue(are_credentials_expired.called)
+        self.assertEqual(credentials["session_token"], "expired-token")
+        self.assertNotIn("cache", credentials)
+
+    def test_socket_permissions(self):
+        """
+        Only the current user can connect to the broker, from the moment the
+        socket is created, and the umask of the process is left untouched.
+        """
+        umask = os.umask(0o022)
+        self.addCleanup(os.umask, umask)
+        socket_path = os.path.join(self.shotgun_home, "broker", "broker.sock")
+
+        # Record the permissions of the socket as soon as it is created.
+        modes = []
+        server_bind = credential_broker._BrokerServer.server_bind
+
+        def record_mode(server):
+            server_bind(server)
+            modes.append(os.stat(socket_path).st_mode & 0o777)
+
+        broker = credential_broker.CredentialBroker(ShotgunAuthenticator(), socket_path)
+        with mock.patch.object(
+            credential_broker._BrokerServer, "server_bind", record_mode
+        ):
+            broker.start()
+        self.addCleanup(broker.shutdown)
+
+        self.assertEqual(len(modes), 1)
+        self.assertEqual(modes[0] & 0o077, 0)
+        self.assertEqual(os.stat(socket_path).st_mode & 0o777, 0o600)
+        self.assertEqual(os.stat(os.path.dirname(socket_path)).st_mode & 0o777, 0o700)
+        self.assertTrue(credential_broker.ping(socket_path))
+        self.assertEqual(os.umask(0o022), 0o022)
@@ -0,0 +1,194 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Tests for the locking of the session cache files and for the writes made when
+the lock can't be taken.
+"""
+
+import errno
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tank.authentication import session_cache
+
+HOST = "https://locks.shotgunstudio.com"
+
+
+def _contention():
+    return OSError(errno.EAGAIN, "Resource temporarily unavailable")
+
+
+class SessionCacheLockTests(unittest.TestCase):
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self._folder.cleanup)
+
+        patcher = mock.patch.dict(os.environ, {"SHOTGUN_HOME": self._folder.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        session_cache.clear_document_cache()
+        self.addCleanup(session_cache.clear_document_cache)
+
+        # Every attempt times out on the first failure to take the lock, and
+        # retries don't wait.
+        patcher = mock.patch.object(session_cache, "LOCK_TIMEOUT", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(session_cache.time, "sleep")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.file_path = session_cache._get_site_authentication_file_location(HOST)
+
+    def _patch_try_lock(self, failures):
+        """
+        Makes taking the lock fail with the given exceptions, in order, then
+        succeed.
+        """
+        failures = list(failures)
+
+        def try_lock(fd):
+            if failures:
+                raise failures.pop(0)
+
+        return mock.patch.object(session_cache, "_try_lock", side_effect=try_lock)
+
+    def _get_cached_logins(self):
+        session_cache.clear_document_cache()
+        return [
+            user["login"]
+            for user in session_cache._try_load_site_authentication_file(
+                self.file_path
+            )["users"]
+        ]
+
+    def _cache_session_while_another_writer_updates(self):
+        """
+        Caches a session for "john" while another writer caches one for
+        "jane" between the moment the transaction read the file and the
+        moment it writes it.
+        """
+        with session_cache.transaction(HOST) as txn:
+            txn.cache_session_data("john", "john-token")
+            # Not part of the transaction, like another process.
+            document = session_cache._try_load_site_authentication_file(
+                self.file_path
+            )
+            document["users"].append(
+                {"login": "jane", "session_token": "jane-token"}
+            )
+            session_cache._ensure_folder_for_file(self.file_path)
+            session_cache._write_yaml_file(self.file_path, document)
+
+    def test_lock_retried(self):
+        """
+        A writer that can't take the lock warns and tries again, and gets the
+        lock once it is released.
+        """
+        contention = [_contention()] * (session_cache._LOCK_ATTEMPTS - 1)
+        session_cache._ensure_folder_for_file(self.file_path)
+
+        with self._patch_try_lock(contention) as try_lock, self.assertLogs(
+            session_cache.logger, "WARNING"
+        ) as logs:
+            with session_cache._lock_file(self.file_path) as locked:
+                self.assertTrue(locked)
+
+        self.assertEqual(try_lock.call_count, session_cache._LOCK_ATTEMPTS)
+        self.assertEqual(len(logs.records), session_cache._LOCK_ATTEMPTS - 1)
+        self.assertIn("trying again", logs.records[0].getMessage())
+
+    def test_lock_given_up(self):
+        """
+        The lock is given up after _LOCK_ATTEMPTS attempts.
+        """
+        contention = [_contention()] * session_cache._LOCK_ATTEMPTS
+        session_cache._ensure_folder_for_file(self.file_path)
+
+        with self._patch_try_lock(contention) as try_lock, self.assertLogs(
+            session_cache.logger, "WARNING"
+        ):
+            with session_cache._lock_file(self.file_path) as locked:
+                self.assertFalse(locked)
+
+        self.assertEqual(try_lock.call_count, session_cache._LOCK_ATTEMPTS)
+
+    def test_locks_not_supported(self):
+        """
+        The lock is given up right away if the file system doesn't support
+        locks.
+        """
+        session_cache._ensure_folder_for_file(self.file_path)
+
+        with self._patch_try_lock([OSError(errno.ENOLCK, "No locks")]) as try_lock:
+            with session_cache._lock_file(self.file_path) as locked:
+                self.assertFalse(locked)
+
+        self.assertEqual(try_lock.call_count, 1)
+
+    def test_locked_write_merges(self):
+        """
+        A writer that got the lock after retrying merges the updates made in
+        the meantime.
+        """
+        contention = [_contention()] * (session_cache._LOCK_ATTEMPTS - 1)
+        with self._patch_try_lock(contention), self.assertLogs(
+            session_cache.logger, "WARNING"
+        ):
+            self._cache_session_while_another_writer_updates()
+
+        self.assertEqual(sorted(self._get_cached_logins()), ["jane", "john"])
+
+    def test_unlocked_write_merges(self):
+        """
+        A writer that couldn't get the lock merges the updates made in the
+        meantime instead of overwriting them.
+        """
+        contention = [_contention()] * session_cache._LOCK_ATTEMPTS
+        with self._patch_try_lock(contention), mock.patch.object(
+            session_cache,
+            "_write_yaml_file",
+            wraps=session_cache._write_yaml_file,
+        ) as write_yaml_file, self.assertLogs(session_cache.logger, "WARNING"):
+            self._cache_session_while_another_writer_updates()
+
+        self.assertEqual(sorted(self._get_cached_logins()), ["jane", "john"])
+        # Once for the other writer, once for the transaction.
+        self.assertEqual(write_yaml_file.call_count, 2)
+
+    def test_unlocked_write_overwritten(self):
+        """
+        A writer that couldn't get the lock writes its updates again when they
+        get overwritten, and warns when it gives up.
+        """
+        session_cache._ensure_folder_for_file(self.file_path)
+        session_cache._write_yaml_file(
+            self.file_path, session_cache._try_load_site_authentication_file(self.file_path)
+        )
+        with open(self.file_path) as f:
+            original = f.read()
+        write_yaml_file = session_cache._write_yaml_file
+
+        def write_then_overwrite(file_path, document):
+            write_yaml_file(file_path, document)
+            # Another writer overwrites the file right away.
+            with open(file_path, "w") as f:
+                f.write(original)
+
+        with self._patch_try_lock([OSError(errno.ENOLCK, "No locks")]), mock.patch.object(
+            session_cache, "_write_yaml_file", side_effect=write_then_overwrite
+        ) as write, self.assertLogs(session_cache.logger, "WARNING") as logs:
+            session_cache.cache_session_data(HOST, "john", "john-token")
+
+        self.assertEqual(write.call_count, session_cache._UNLOCKED_WRITE_ATTEMPTS)
+        self.assertIn("may have been lost", logs.records[-1].getMessage())
@@ -0,0 +1,286 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Tests for the session renewals of interactive_authentication.SessionRenewal.
+"""
+
+import errno
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from tank.authentication import (
+    AuthenticationCancelled,
+    ShotgunAuthenticator,
+    session_cache,
+    user,
+    user_impl,
+)
+from tank.authentication.interactive_authentication import SessionRenewal
+
+HOST = "https://renewal.shotgunstudio.com"
+
+# Number of seconds to wait for the threads of a test before giving up.
+TIMEOUT = 10
+
+
+def _wait_for(condition):
+    """
+    Waits until a condition is met.
+
+    :raises AssertionError: If the condition isn't met within TIMEOUT seconds.
+    """
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for %s" % condition)
+        time.sleep(0.001)
+
+
+def _read_only_file_system(*args, **kwargs):
+    raise OSError(errno.EROFS, "Read-only file system")
+
+
+class _SessionRenewalTestCase(unittest.TestCase):
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self._folder.cleanup)
+
+        patcher = mock.patch.dict(os.environ, {"SHOTGUN_HOME": self._folder.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        session_cache.clear_document_cache()
+        self.addCleanup(session_cache.clear_document_cache)
+
+    def _create_user(self, login="john", session_token="old-token"):
+        return user_impl.SessionUser(HOST, login, session_token, None, cache=False)
+
+    def _create_handler(self, session_token="new-token"):
+        handler = mock.Mock()
+        handler.authenticate.side_effect = lambda host, login, http_proxy: (
+            host,
+            login,
+            session_token,
+            None,
+        )
+        return handler
+
+
+class SessionCacheWriteFailureTests(_SessionRenewalTestCase):
+    def test_renewal_with_read_only_session_cache(self):
+        """
+        A session renewed while the session cache can't be written is still
+        renewed.
+        """
+        renewed_user = self._create_user()
+
+        with mock.patch.object(
+            session_cache, "_write_yaml_file", side_effect=_read_only_file_system
+        ) as write_yaml_file:
+            SessionRenewal.renew_session(renewed_user, self._create_handler())
+
+        self.assertTrue(write_yaml_file.called)
+        self.assertEqual(renewed_user.get_session_token(), "new-token")
+        self.assertFalse(SessionRenewal.is_renewing(renewed_user))
+
+    def test_get_user_with_read_only_session_cache(self):
+        """
+        The user logged in is returned even if the session cache can't be
+        written.
+        """
+        authenticator = ShotgunAuthenticator()
+        prompted_user = user.ShotgunUser(self._create_user())
+
+        with mock.patch.object(
+            session_cache, "_write_yaml_file", side_effect=_read_only_file_system
+        ) as write_yaml_file, mock.patch.object(
+            authenticator, "get_default_user", return_value=None
+        ), mock.patch.object(
+            authenticator, "get_user_from_prompt", return_value=prompted_user
+        ):
+            self.assertIs(authenticator.get_user(), prompted_user)
+
+        self.assertTrue(write_yaml_file.called)
+
+    def test_session_cache_write_failure_outside_renewal(self):
+        """
+        Failures to write the session cache are still raised by the module
+        level functions.
+        """
+        with mock.patch.object(
+            session_cache, "_write_yaml_file", side_effect=_read_only_file_system
+        ):
+            with self.assertRaises(OSError):
+                session_cache.cache_session_data(HOST, "john", "token")
+
+
+class _BlockingCredentialsHandler(object):
+    """
+    Credentials handler whose authentications block until their login is
+    released, then return a new session or raise the exception given for
+    that login.
+    """
+
+    def __init__(self, errors=None):
+        self._errors = errors or {}
+        self._lock = threading.Lock()
+        self._released = {}
+        # Maps a login to the number of authentications started for it.
+        self.calls = {}
+
+    def _get_release(self, login):
+        with self._lock:
+            return self._released.setdefault(login, threading.Event())
+
+    def release(self, login):
+        self._get_release(login).set()
+
+    def get_calls(self, login):
+        with self._lock:
+            return self.calls.get(login, 0)
+
+    def authenticate(self, host, login, http_proxy):
+        with self._lock:
+            self.calls[login] = self.calls.get(login, 0) + 1
+        if not self._get_release(login).wait(TIMEOUT):
+            raise AssertionError("The renewal of %s was never released." % login)
+        if login in self._errors:
+            raise self._errors[login]
+        return host, login, "%s-new-token" % login, None
+
+
+class SingleFlightTests(_SessionRenewalTestCase):
+    """
+    Only one renewal at a time is made per (host, login), and threads waiting
+    for it get its outcome.
+    """
+
+    def _get_login(self, name):
+        # Statistics are kept for the whole process, so use logins unique to
+        # each test.
+        return "%s-%s" % (self._testMethodName, name)
+
+    def _get_stats(self, login):
+        return SessionRenewal.get_stats().get((HOST, login), {})
+
+    def _start_renewals(self, users, handler):
+        """
+        Renews the session of each user from its own thread.
+
+        :returns: A (threads, outcomes) tuple. Outcomes are filled with None
+            or the exception raised by each renewal once the threads are done.
+        """
+        outcomes = [None] * len(users)
+
+        def renew(index):
+            try:
+                SessionRenewal.renew_session(users[index], handler)
+            except BaseException as e:
+                outcomes[index] = e
+
+        threads = [
+            threading.Thread(target=renew, args=(index,)) for index in range(len(users))
+        ]
+        for thread in threads:
+            thread.start()
+        return threads, outcomes
+
+    def _join(self, threads):
+        for thread in threads:
+            thread.join(TIMEOUT)
+            self.assertFalse(thread.is_alive())
+
+    def test_one_renewal_per_user(self):
+        """
+        Concurrent renewals of the same user, even through different
+        instances, result in a single authentication.
+        """
+        login = self._get_login("john")
+        users = [self._create_user(login) for _ in range(5)]
+        handler = _BlockingCredentialsHandler()
+
+        threads, outcomes = self._start_renewals(users, handler)
+        _wait_for(lambda: self._get_stats(login).get("current_waiters") == 4)
+        self.assertTrue(SessionRenewal.is_renewing(users[0]))
+        handler.release(login)
+        self._join(threads)
+
+        self.assertEqual(outcomes, [None] * 5)
+        self.assertEqual(handler.get_calls(login), 1)
+        for renewed_user in users:
+            self.assertEqual(renewed_user.get_session_token(), "%s-new-token" % login)
+        stats = self._get_stats(login)
+        self.assertEqual(stats["renewals"], 1)
+        self.assertEqual(stats["waiters"], 4)
+        self.assertEqual(stats["max_waiters"], 4)
+        self.assertEqual(stats["current_waiters"], 0)
+        self.assertFalse(SessionRenewal.is_renewing(users[0]))
+
+    def test_waiters_get_the_exception(self):
+        """
+        Threads waiting for a renewal get the exception it raised.
+        """
+        login = self._get_login("john")
+        users = [self._create_user(login) for _ in range(3)]
+        error = AuthenticationCancelled()
+        handler = _BlockingCredentialsHandler(errors={login: error})
+
+        threads, outcomes = self._start_renewals(users, handler)
+        _wait_for(lambda: self._get_stats(login).get("current_waiters") == 2)
+        handler.release(login)
+        self._join(threads)
+
+        self.assertEqual(outcomes, [error] * 3)
+        self.assertEqual(handler.get_calls(login), 1)
+        self.assertEqual(self._get_stats(login)["cancellations"], 1)
+
+    def test_next_renewal_starts_over(self):
+        """
+        A renewal requested after the previous one completed authenticates
+        again instead of reusing its outcome.
+        """
+        login = self._get_login("john")
+        renewed_user = self._create_user(login)
+        handler = _BlockingCredentialsHandler()
+        handler.release(login)
+
+        SessionRenewal.renew_session(renewed_user, handler)
+        SessionRenewal.renew_session(renewed_user, handler)
+
+        self.assertEqual(handler.get_calls(login), 2)
+        self.assertEqual(self._get_stats(login)["renewals"], 2)
+        self.assertEqual(self._get_stats(login)["waiters"], 0)
+
+    def test_users_renewed_concurrently(self):
+        """
+        Renewals of different users run at the same time, and cancelling one
+        doesn't affect the other.
+        """
+        john = self._get_login("john")
+        jane = self._get_login("jane")
+        handler = _BlockingCredentialsHandler(errors={john: AuthenticationCancelled()})
+        users = [self._create_user(john), self._create_user(jane)]
+
+        threads, outcomes = self._start_renewals(users, handler)
+        # Both authentications are in flight at the same time.
+        _wait_for(lambda: handler.get_calls(john) == 1 and handler.get_calls(jane) == 1)
+        handler.release(john)
+        threads[0].join(TIMEOUT)
+        self.assertTrue(SessionRenewal.is_renewing(users[1]))
+        handler.release(jane)
+        self._join(threads)
+
+        self.assertIsInstance(outcomes[0], AuthenticationCancelled)
+        self.assertIsNone(outcomes[1])
+        self.assertEqual(users[1].get_session_token(), "%s-new-token" % jane)
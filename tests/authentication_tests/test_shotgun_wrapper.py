@@ -0,0 +1,249 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Tests for the session renewals triggered by ShotgunWrapper.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from shotgun_api3 import AuthenticationFault, Shotgun
+
+from tank.authentication import (
+    AuthenticationCancelled,
+    interactive_authentication,
+    session_cache,
+    shotgun_wrapper,
+    user_impl,
+)
+from tank.authentication.interactive_authentication import SessionRenewal
+
+HOST = "https://wrapper.shotgunstudio.com"
+
+# Number of seconds to wait for the threads of a test before giving up.
+TIMEOUT = 10
+
+
+def _wait_for(condition):
+    """
+    Waits until a condition is met.
+
+    :raises AssertionError: If the condition isn't met within TIMEOUT seconds.
+    """
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for %s" % condition)
+        time.sleep(0.001)
+
+
+class _BlockingCredentialsHandler(object):
+    """
+    Credentials handler whose authentication blocks until released, then
+    returns a new session or raises the given exception.
+    """
+
+    def __init__(self, session_token="new-token", error=None):
+        self.session_token = session_token
+        self.error = error
+        self.release = threading.Event()
+        self.calls = 0
+
+    def authenticate(self, host, login, http_proxy):
+        self.calls += 1
+        if not self.release.wait(TIMEOUT):
+            raise AssertionError("The renewal was never released.")
+        if self.error is not None:
+            raise self.error
+        return host, login, self.session_token, None
+
+
+class ShotgunWrapperTestCase(unittest.TestCase):
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self._folder.cleanup)
+
+        patcher = mock.patch.dict(os.environ, {"SHOTGUN_HOME": self._folder.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        session_cache.clear_document_cache()
+        self.addCleanup(session_cache.clear_document_cache)
+
+        self.user = user_impl.SessionUser(HOST, "john", "old-token", None, cache=False)
+
+    def _create_wrapper(self):
+        return shotgun_wrapper.ShotgunWrapper(
+            HOST, session_token="old-token", connect=False, sg_auth_user=self.user
+        )
+
+
+class RenewalWaitersTests(ShotgunWrapperTestCase):
+    """
+    Requests failing while the session is being renewed wait for the renewal
+    and get its outcome.
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        # The server only accepts the new session token.
+        def call_rpc(sg, *args, **kwargs):
+            if sg.config.session_token != "new-token":
+                raise AuthenticationFault("Session expired.")
+            return "result"
+
+        patcher = mock.patch.object(Shotgun, "_call_rpc", autospec=True, side_effect=call_rpc)
+        self.call_rpc = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run_requests(self, handler, count=4):
+        """
+        Runs requests from concurrent threads, each with its own wrapper, and
+        releases the renewal once every other thread is waiting for it.
+
+        :returns: The list of results or exceptions of each request.
+        """
+        patcher = mock.patch.object(
+            interactive_authentication,
+            "renew_session",
+            side_effect=lambda user: SessionRenewal.renew_session(user, handler),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        key = (HOST, "john")
+        waiters = SessionRenewal.get_stats().get(key, {}).get("waiters", 0)
+        outcomes = [None] * count
+
+        def request(index):
+            try:
+                outcomes[index] = self._create_wrapper()._call_rpc("find_one", None)
+            except BaseException as e:
+                outcomes[index] = e
+
+        threads = [
+            threading.Thread(target=request, args=(index,)) for index in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        _wait_for(
+            lambda: SessionRenewal.get_stats().get(key, {}).get("waiters", 0)
+            == waiters + count - 1
+        )
+        handler.release.set()
+        for thread in threads:
+            thread.join(TIMEOUT)
+        return outcomes
+
+    def test_waiters_get_the_result(self):
+        """
+        Every request is retried with the session of the single renewal.
+        """
+        handler = _BlockingCredentialsHandler()
+
+        outcomes = self._run_requests(handler)
+
+        self.assertEqual(outcomes, ["result"] * 4)
+        self.assertEqual(handler.calls, 1)
+        self.assertEqual(self.user.get_session_token(), "new-token")
+
+    def test_waiters_get_the_exception(self):
+        """
+        Every request fails with the exception of the single renewal.
+        """
+        error = AuthenticationCancelled()
+        handler = _BlockingCredentialsHandler(error=error)
+
+        outcomes = self._run_requests(handler)
+
+        self.assertEqual(outcomes, [error] * 4)
+        self.assertEqual(handler.calls, 1)
+        self.assertEqual(self.user.get_session_token(), "old-token")
+        self.assertFalse(SessionRenewal.is_renewing(self.user))
+
+
+class ProactiveRenewalTests(ShotgunWrapperTestCase):
+    """
+    Sessions about to expire are renewed in the background.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user.set_session_metadata("metadata")
+
+        patcher = mock.patch.object(
+            shotgun_wrapper, "_renewal_coordinator", shotgun_wrapper._RenewalCoordinator()
+        )
+        self.coordinator = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.object(
+            interactive_authentication, "_get_ui_state", return_value=True
+        )
+        self.get_ui_state = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.renewed = threading.Event()
+        patcher = mock.patch.object(
+            interactive_authentication,
+            "renew_session",
+            side_effect=lambda user: self.renewed.set(),
+        )
+        self.renew_session = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _set_expiration(self, seconds):
+        patcher = mock.patch.object(
+            shotgun_wrapper.sso_saml2,
+            "get_saml_claims_expiration",
+            return_value=time.time() + seconds,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_renewed_ahead_of_expiry(self):
+        """
+        A session expiring within the margin is renewed once in the background.
+        """
+        self._set_expiration(shotgun_wrapper.PROACTIVE_RENEWAL_MARGIN / 2)
+
+        self.coordinator.renew_ahead_of_expiry(self.user)
+        self.assertTrue(self.renewed.wait(TIMEOUT))
+        # Not attempted again for the same session.
+        self.coordinator.renew_ahead_of_expiry(self.user)
+
+        self.assertEqual(self.renew_session.call_count, 1)
+
+    def test_not_renewed_before_margin(self):
+        """
+        A session expiring later than the margin is left alone.
+        """
+        self._set_expiration(shotgun_wrapper.PROACTIVE_RENEWAL_MARGIN * 2)
+
+        self.coordinator.renew_ahead_of_expiry(self.user)
+
+        self.assertFalse(self.renew_session.called)
+
+    def test_not_renewed_without_ui(self):
+        """
+        Sessions are not renewed in the background when that would prompt on
+        the console.
+        """
+        self._set_expiration(shotgun_wrapper.PROACTIVE_RENEWAL_MARGIN / 2)
+        self.get_ui_state.return_value = False
+
+        self.coordinator.renew_ahead_of_expiry(self.user)
+
+        self.assertFalse(self.renew_session.called)
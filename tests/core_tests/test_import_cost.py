@@ -0,0 +1,100 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Makes sure importing tank stays cheap, by checking that the heavy modules are
+only imported when they are needed.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+PYTHON_ROOT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "python"
+)
+
+# Modules that are slow to import and must not be imported by "import tank"
+# or "import tank.authentication".
+HEAVY_MODULES = [
+    "asyncio",
+    "http.client",
+    "shotgun_api3",
+    "ssl",
+    "urllib.request",
+    "tank.authentication.console_authentication",
+    "tank.authentication.interactive_authentication",
+    "tank.authentication.login_dialog",
+    "tank.authentication.session_cache",
+    "tank.authentication.ui",
+    "tank.authentication.ui_authentication",
+    "tank.authentication.user_impl",
+    "tank.util.qt_importer",
+    "PySide2",
+    "PySide6",
+    "PyQt5",
+    "PyQt6",
+]
+
+
+def _get_imported_heavy_modules(statement):
+    """
+    Runs a statement in a new interpreter with ``-X importtime``.
+
+    :returns: Dictionary mapping the heavy modules imported by the statement
+        to their cumulative import time, in microseconds.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = PYTHON_ROOT
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # Lines look like "import time:  self [us] | cumulative | imported package".
+    imported = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        try:
+            cumulative = int(fields[1])
+        except ValueError:
+            # Header line.
+            continue
+        module = fields[2].strip()
+        if module in HEAVY_MODULES:
+            imported[module] = cumulative
+    return imported
+
+
+class ImportCostTests(unittest.TestCase):
+    def test_import_tank(self):
+        self.assertEqual(_get_imported_heavy_modules("import tank"), {})
+
+    def test_import_authentication(self):
+        self.assertEqual(
+            _get_imported_heavy_modules("import tank.authentication"), {}
+        )
+
+    def test_lazy_attributes(self):
+        """
+        The public interface of tank.authentication is still available, and
+        imported on first access.
+        """
+        imported = _get_imported_heavy_modules(
+            "import tank.authentication\n"
+            "tank.authentication.ShotgunAuthenticator"
+        )
+        self.assertIn("tank.authentication.user_impl", imported)
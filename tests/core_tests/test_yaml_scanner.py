@@ -0,0 +1,266 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Checks that the fast paths of the vendored yaml reader and scanner produce
+exactly the tokens, events and errors of the original implementation, kept in
+the yaml_baseline folder.
+"""
+
+import importlib.util
+import io
+import os
+import random
+import unittest
+
+from tank_vendor import yaml
+from tank_vendor.yaml.composer import Composer
+from tank_vendor.yaml.constructor import SafeConstructor
+from tank_vendor.yaml.parser import Parser
+from tank_vendor.yaml.resolver import Resolver
+
+BASELINE_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "yaml_baseline")
+
+
+def _import_baseline(name):
+    """
+    Imports a baseline module as part of the vendored yaml package, so its
+    relative imports resolve to the vendored modules.
+    """
+    spec = importlib.util.spec_from_file_location(
+        "tank_vendor.yaml._baseline_%s" % name,
+        os.path.join(BASELINE_ROOT, "%s.py" % name),
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+_baseline_reader = _import_baseline("reader")
+_baseline_scanner = _import_baseline("scanner")
+
+
+class BaselineSafeLoader(
+    _baseline_reader.Reader,
+    _baseline_scanner.Scanner,
+    Parser,
+    Composer,
+    SafeConstructor,
+    Resolver,
+):
+    def __init__(self, stream):
+        _baseline_reader.Reader.__init__(self, stream)
+        _baseline_scanner.Scanner.__init__(self)
+        Parser.__init__(self)
+        Composer.__init__(self)
+        SafeConstructor.__init__(self)
+        Resolver.__init__(self)
+
+
+class _TrickleStream(io.StringIO):
+    """
+    Stream returning at most ``size`` characters per read, whatever is asked.
+    """
+
+    def __init__(self, text, size):
+        super().__init__(text)
+        self._size = size
+
+    def read(self, size=-1):
+        return super().read(self._size)
+
+
+def _describe_mark(mark):
+    return (mark.index, mark.line, mark.column)
+
+
+def _describe(items):
+    """
+    :returns: The attributes and marks of tokens or events, as a list of
+        tuples, followed by the error raised while producing them if any.
+    """
+    described = []
+    try:
+        for item in items:
+            attributes = sorted(
+                (name, value)
+                for name, value in vars(item).items()
+                if name not in ("start_mark", "end_mark")
+            )
+            described.append(
+                (
+                    type(item).__name__,
+                    attributes,
+                    _describe_mark(item.start_mark),
+                    _describe_mark(item.end_mark),
+                )
+            )
+    except yaml.YAMLError as e:
+        described.append(("error", type(e).__name__, str(e)))
+    return described
+
+
+def _make_streams(text):
+    """
+    :returns: (name, factory) tuples creating the different kinds of streams
+        the reader supports, all holding ``text``.
+    """
+    return [
+        ("str", lambda: text),
+        ("bytes", lambda: text.encode("utf-8")),
+        ("utf-16 bytes", lambda: text.encode("utf-16")),
+        ("text file", lambda: io.StringIO(text)),
+        ("binary file", lambda: io.BytesIO(text.encode("utf-8"))),
+        ("1 char reads", lambda: _TrickleStream(text, 1)),
+        ("3 char reads", lambda: _TrickleStream(text, 3)),
+    ]
+
+
+def _make_session_cache_documents(rng):
+    """
+    :returns: Documents laid out like the session cache files, with the values
+        it stores and a few the scanner has to be careful with.
+    """
+    documents = []
+    for index in range(10):
+        documents.append(
+            {
+                "current_host": "https://site%d.shotgunstudio.com:8080" % index,
+                "recent_hosts": ["https://site%d.shotgunstudio.com" % i for i in range(3)],
+                "current_user": "user%d" % index,
+                "users": [
+                    {
+                        "login": "user%d" % user,
+                        "session_token": "%032x" % rng.getrandbits(128),
+                        "session_metadata": "%x" % rng.getrandbits(rng.randint(8, 4000)),
+                        "note": "a: b # c",
+                        "quoted": "it's \"quoted\"\nline2\ttab",
+                        "unicode": "J\u00e9r\u00f4me \u2028 \x85 \ufeff x",
+                        "flow": {"a": [1, "b:c", "d e", None, True, 1.5]},
+                    }
+                    for user in range(rng.randint(1, 5))
+                ],
+            }
+        )
+    return documents
+
+
+# Hand written documents exercising the simple keys, plain scalars, quoted
+# scalars and line breaks the fast paths skip over.
+HAND_WRITTEN_DOCUMENTS = [
+    "",
+    "a: b:c\n",
+    "a:b: c\n",
+    "{a:b, c: d}\n",
+    "[a:, b]\n",
+    "key: value # comment\n",
+    "key: value#not a comment\n",
+    "x: 'a''b'\n",
+    "\ufeffa: 1\n",
+    "a: b\r\nc: d\r",
+    "a: b\x85c: d\u2028e: f\u2029",
+    "a: |\n  x\n  y\n",
+    "a: >-\n  x\n\n  y\n",
+    "? a\n: b\n",
+    "a: 'unterminated\n",
+    'a: "\\q"\n',
+    'a: "\\x41\\u00e9\\U0001F600 \\\n  continued"\n',
+    "a :b\n",
+    "- - a\n  - b\n",
+    "{? a: b}",
+    "[a?b, c:d:e]",
+    "a: b\n  c\n  d\n",
+    "a:\n\n  b",
+    "--- &anchor !!map\n? *alias\n: !tag value\n...\n",
+    "%YAML 1.1\n%TAG ! tag:example.com,2000:\n--- !foo bar\n",
+    "a: " + "x" * 5000 + "\n",
+    "'" + "y" * 3000 + "'\n",
+    "a: b\x00c\n",
+    "a: \x07\n",
+]
+
+# Characters random documents are built from, weighted towards the ones the
+# scanner treats specially.
+_RANDOM_PIECES = list("abcXYZ019 :#-?,[]{}'\"\\\t\n\r&*!|>%@`.") + [
+    "\u2028",
+    "\x85",
+    "\ufeff",
+    "\u00e9",
+    ": ",
+    "\n  ",
+    "\r\n",
+    "---\n",
+    "...\n",
+    "\\x41",
+    "\\u00e9",
+    "''",
+]
+
+
+class YamlScannerEquivalenceTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(20260412)
+        cls.documents = list(HAND_WRITTEN_DOCUMENTS)
+        for data in _make_session_cache_documents(rng):
+            for kwargs in (
+                {},
+                {"default_flow_style": False},
+                {"default_flow_style": True},
+                {"default_style": '"'},
+                {"default_style": "'"},
+                {"width": 20},
+                {"allow_unicode": True},
+            ):
+                cls.documents.append(yaml.safe_dump(data, **kwargs))
+        for _ in range(1000):
+            cls.documents.append(
+                "".join(rng.choice(_RANDOM_PIECES) for _ in range(rng.randint(0, 60)))
+            )
+
+    def _assert_equivalent(self, produce):
+        """
+        Checks that ``produce(stream, loader class)`` describes every document
+        the same way with the baseline and the vendored loaders, whatever the
+        kind of stream.
+        """
+        for text in self.documents:
+            expected = _describe(produce(text, BaselineSafeLoader))
+            for name, make_stream in _make_streams(text):
+                self.assertEqual(
+                    _describe(produce(make_stream(), yaml.SafeLoader)),
+                    expected
+                    if name == "str"
+                    else _describe(produce(make_stream(), BaselineSafeLoader)),
+                    "Mismatch for %r read as %s" % (text[:200], name),
+                )
+
+    def test_tokens(self):
+        """
+        The scanner produces the same tokens.
+        """
+        self._assert_equivalent(lambda stream, loader: yaml.scan(stream, Loader=loader))
+
+    def test_events(self):
+        """
+        The parser produces the same events.
+        """
+        self._assert_equivalent(lambda stream, loader: yaml.parse(stream, Loader=loader))
+
+    def test_session_cache_round_trip(self):
+        """
+        Session cache documents load back to the data that was dumped.
+        """
+        for data in _make_session_cache_documents(random.Random(1)):
+            text = yaml.safe_dump(data)
+            self.assertEqual(yaml.load(text, Loader=yaml.SafeLoader), data)
+            self.assertEqual(
+                yaml.load(_TrickleStream(text, 1), Loader=yaml.SafeLoader), data
+            )
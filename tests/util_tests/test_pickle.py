@@ -0,0 +1,170 @@
+# Copyright (c) 2026 Autodesk.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Tests for the payloads stored in environment variables by tank.util.pickle.
+"""
+
+import base64
+import os
+import pickle
+import unittest
+import zlib
+from unittest import mock
+
+from tank.util import pickle as sgtk_pickle
+
+ENV_VAR = "SGTK_TEST_PICKLE_PAYLOAD"
+
+# Data like the serialized contexts handed to child processes.
+CONTEXT = {
+    "project": {"type": "Project", "id": 122, "name": "Big Buck Bunny"},
+    "entity": {"type": "Shot", "id": 1234, "code": "bunny_010_0010"},
+    "step": {"type": "Step", "id": 5, "name": "Animation"},
+    "task": {"type": "Task", "id": 98765, "content": "Animation"},
+    "user": {"type": "HumanUser", "id": 42, "name": "Jérôme Doe"},
+    "additional_entities": [
+        {"type": "Asset", "id": index, "code": "asset_%03d" % index}
+        for index in range(50)
+    ],
+    "source_entity": None,
+}
+
+
+def _parse(payload):
+    """
+    :returns: The (version, flags, pickle) tuple of a payload.
+    """
+    prefix, version, flags, encoded = payload.split(":", 3)
+    assert prefix + ":" == sgtk_pickle.ENV_PAYLOAD_PREFIX
+    return version, flags, base64.b64decode(encoded)
+
+
+def _make_string(pickle_size):
+    """
+    :returns: A compressible string pickled to ``pickle_size`` bytes.
+    """
+    overhead = len(pickle.dumps("", protocol=sgtk_pickle.ENV_PICKLE_PROTOCOL))
+    data = "x" * (pickle_size - overhead)
+    assert (
+        len(pickle.dumps(data, protocol=sgtk_pickle.ENV_PICKLE_PROTOCOL))
+        == pickle_size
+    )
+    return data
+
+
+class EnvPayloadTests(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_round_trip(self):
+        """
+        Data stored in an environment variable is retrieved as is.
+        """
+        sgtk_pickle.store_env_var_pickled(ENV_VAR, CONTEXT)
+
+        self.assertTrue(os.environ[ENV_VAR].startswith(sgtk_pickle.ENV_PAYLOAD_PREFIX))
+        self.assertEqual(sgtk_pickle.retrieve_env_var_pickled(ENV_VAR), CONTEXT)
+
+    def test_bytes_are_converted(self):
+        """
+        bytes are retrieved as str, like with the legacy payloads.
+        """
+        payload = sgtk_pickle.dumps_env_payload({b"key": [b"value", ("t\xc3\xa9",)]})
+
+        self.assertEqual(
+            sgtk_pickle.loads_env_payload(payload), {"key": ["value", ("t\xc3\xa9",)]}
+        )
+
+    def test_small_payload_is_not_compressed(self):
+        """
+        Pickles below the compression threshold are stored as is.
+        """
+        data = _make_string(sgtk_pickle.ENV_COMPRESSION_THRESHOLD - 1)
+        payload = sgtk_pickle.dumps_env_payload(data)
+
+        version, flags, binary = _parse(payload)
+        self.assertEqual(version, str(sgtk_pickle.ENV_PAYLOAD_VERSION))
+        self.assertEqual(flags, "")
+        self.assertEqual(pickle.loads(binary), data)
+        self.assertEqual(sgtk_pickle.loads_env_payload(payload), data)
+
+    def test_payload_at_threshold_is_compressed(self):
+        """
+        Pickles from the compression threshold on are compressed when that
+        makes them smaller.
+        """
+        data = _make_string(sgtk_pickle.ENV_COMPRESSION_THRESHOLD)
+        payload = sgtk_pickle.dumps_env_payload(data)
+
+        _, flags, binary = _parse(payload)
+        self.assertEqual(flags, sgtk_pickle.ENV_PAYLOAD_COMPRESSED_FLAG)
+        self.assertEqual(pickle.loads(zlib.decompress(binary)), data)
+        self.assertEqual(sgtk_pickle.loads_env_payload(payload), data)
+
+    def test_incompressible_payload_is_not_compressed(self):
+        """
+        Pickles are stored as is when compressing them doesn't make them
+        smaller.
+        """
+        data = "x" * sgtk_pickle.ENV_COMPRESSION_THRESHOLD * 2
+        with mock.patch.object(
+            sgtk_pickle.zlib, "compress", side_effect=lambda binary: binary + b"\0"
+        ):
+            payload = sgtk_pickle.dumps_env_payload(data)
+
+        _, flags, binary = _parse(payload)
+        self.assertEqual(flags, "")
+        self.assertEqual(pickle.loads(binary), data)
+        self.assertEqual(sgtk_pickle.loads_env_payload(payload), data)
+
+    def test_legacy_payload(self):
+        """
+        Protocol 0 pickles stored by older versions are still retrieved.
+        """
+        data = {"entity": {"type": "Shot", "id": 1234, "code": "bunny_010_0010"}}
+        os.environ[ENV_VAR] = sgtk_pickle.dumps(data)
+        self.assertEqual(sgtk_pickle.retrieve_env_var_pickled(ENV_VAR), data)
+
+    def test_legacy_payload_with_fallback_encoding(self):
+        """
+        Protocol 0 pickles stored with the fallback encoding by older versions
+        are still retrieved.
+        """
+        legacy = sgtk_pickle.dumps(dict(CONTEXT))
+        self.assertIn(sgtk_pickle.FALLBACK_ENCODING_KEY, sgtk_pickle.loads(legacy))
+        os.environ[ENV_VAR] = legacy
+
+        data = sgtk_pickle.retrieve_env_var_pickled(ENV_VAR)
+        self.assertEqual(data["user"]["name"], "Jérôme Doe")
+        self.assertEqual(data, sgtk_pickle.loads(legacy))
+
+    def test_unsupported_version(self):
+        """
+        Payloads written with another version of the format are rejected.
+        """
+        payload = "%s9::%s" % (
+            sgtk_pickle.ENV_PAYLOAD_PREFIX,
+            base64.b64encode(pickle.dumps(CONTEXT)).decode("ascii"),
+        )
+
+        with self.assertRaisesRegex(ValueError, "version '9'"):
+            sgtk_pickle.loads_env_payload(payload)
+
+    def test_missing_variable(self):
+        """
+        Retrieving an unset environment variable raises a KeyError.
+        """
+        os.environ.pop(ENV_VAR, None)
+
+        with self.assertRaises(KeyError):
+            sgtk_pickle.retrieve_env_var_pickled(ENV_VAR)